@@ -2,12 +2,323 @@
 
 import requests
 from bs4 import BeautifulSoup
+import aiohttp
 import re
 import json
-from typing import Dict, List, Optional, Union, Any, Tuple
+from typing import Dict, List, Optional, Union, Any, Tuple, Iterator
+from collections import namedtuple, OrderedDict
 import logging
+import os
 import time
 import random
+import atexit
+import queue
+import threading
+import logging.handlers
+import hashlib
+import tempfile
+import copy
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bisect import bisect_left, bisect_right
+from functools import lru_cache, wraps
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+import asyncio
+from itertools import chain
+from string import Template
+
+try:
+    # Optional: guaranteed linear-time matching for untrusted vendor text
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    # Optional: YAML analysis rule files
+    import yaml
+except ImportError:
+    yaml = None
+
+# Library logging: importing this module attaches no handlers. Scripts call
+# configure_logging() to send records to the console and ai_review.log.
+logger = logging.getLogger("ai_review")
+logger.addHandler(logging.NullHandler())
+analysis_logger = logging.getLogger("ai_review.analysis")
+
+_log_listener = None
+
+def configure_logging(level=logging.INFO, log_file="ai_review.log", console=True):
+    """
+    Route ai_review log records through a queue-backed, non-blocking handler.
+    
+    Records are put on an in-memory queue by the calling thread and written
+    to the log file and console by a background listener thread, so logging
+    never blocks analysis on file or terminal I/O. Calling this again
+    replaces the previous configuration.
+    
+    Args:
+        level: Minimum level for ai_review loggers
+        log_file: Path of the log file, or None to skip file output
+        console: Whether to also log to stderr
+        
+    Returns:
+        The running QueueListener
+    """
+    global _log_listener
+    
+    shutdown_logging()
+    
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = []
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    return _log_listener
+
+@atexit.register
+def shutdown_logging():
+    """Flush queued log records and detach the handlers added by configure_logging()"""
+    global _log_listener
+    
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
+    for handler in [h for h in logger.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        logger.removeHandler(handler)
+    _log_listener = None
+
+# Regex backend for analyzer patterns: "auto" uses RE2 when it is installed,
+# "re2" requires it, "re" always uses Python's backtracking engine
+REGEX_ENGINE = os.environ.get("AI_REVIEW_REGEX_ENGINE", "auto")
+
+# Longest text a pattern may capture after its anchor words
+MAX_CAPTURE_CHARS = 300
+
+# Seconds of analysis allowed per document before its scan is cut short
+DOCUMENT_TIME_BUDGET = float(os.environ.get("AI_REVIEW_DOCUMENT_TIME_BUDGET", "20"))
+
+# Processes used to scan documents in parallel (0 uses one per CPU, 1 scans
+# in the calling process), and the total text below which a review is
+# scanned in process anyway because starting workers would cost more
+ANALYSIS_WORKERS = int(os.environ.get("AI_REVIEW_WORKERS", "0"))
+PARALLEL_MIN_CHARS = int(os.environ.get("AI_REVIEW_PARALLEL_MIN_CHARS", "200000"))
+
+# Seconds a triage analysis may spend on all of a vendor's documents together
+TRIAGE_TIME_BUDGET = float(os.environ.get("AI_REVIEW_TRIAGE_TIME_BUDGET", "5"))
+
+class AnalysisTimeout(Exception):
+    """Raised when a document exceeds its analysis time budget"""
+
+def set_regex_engine(engine: str):
+    """
+    Select the regex backend used for analyzer patterns.
+    
+    Args:
+        engine: "auto", "re2" or "re"
+    """
+    global REGEX_ENGINE, _execution_plan
+    
+    if engine not in ("auto", "re2", "re"):
+        raise ValueError(f"Unknown regex engine: {engine}")
+    if engine == "re2" and re2 is None:
+        raise ImportError("The re2 engine requires the google-re2 package")
+    REGEX_ENGINE = engine
+    compile_pattern.cache_clear()
+    # The execution plan holds patterns compiled by the previous engine
+    _execution_plan = None
+
+@lru_cache(maxsize=None)
+def compile_pattern(pattern: str, flags: int = re.IGNORECASE):
+    """
+    Compile an analyzer pattern with the configured regex backend.
+    
+    RE2 matches in time linear in the input, so a pathological page cannot
+    stall a batch run. Note that RE2 treats \\b and \\s as ASCII-only. Patterns
+    RE2 cannot express fall back to Python's engine.
+    
+    Args:
+        pattern: Regular expression source
+        flags: re.IGNORECASE or 0
+        
+    Returns:
+        A compiled pattern object with search/finditer methods
+    """
+    engine = REGEX_ENGINE
+    if engine == "auto":
+        engine = "re2" if re2 is not None else "re"
+    
+    if engine == "re2":
+        options = re2.Options()
+        options.case_sensitive = not (flags & re.IGNORECASE)
+        try:
+            return re2.compile(pattern, options)
+        except re2.error:
+            if REGEX_ENGINE == "re2":
+                raise
+            logger.debug("RE2 cannot compile %r, using Python re", pattern)
+    
+    return re.compile(pattern, flags)
+
+# Seconds the memoised results of each review stage stay fresh: the document
+# URLs found for a vendor, the text extracted from a URL, and the analysis of
+# unchanged text. 0 disables a stage.
+MEMO_TTLS = {
+    "discovery": float(os.environ.get("AI_REVIEW_MEMO_TTL_DISCOVERY", "86400")),
+    "extraction": float(os.environ.get("AI_REVIEW_MEMO_TTL_EXTRACTION", "3600")),
+    "analysis": float(os.environ.get("AI_REVIEW_MEMO_TTL_ANALYSIS", "604800")),
+}
+
+# Results each stage keeps in memory
+MEMO_MAX_ENTRIES = int(os.environ.get("AI_REVIEW_MEMO_ENTRIES", "256"))
+
+# Memoised results are also stored here, so later processes start warm, when
+# the variable is set
+MEMO_DIR = os.environ.get("AI_REVIEW_MEMO_DIR", "")
+
+class StageCache:
+    """
+    Memoised results of one review stage.
+    
+    Results are kept in an in-process LRU and, when a directory is given, in a
+    persistent tier of one JSON file per result. Both tiers expire results
+    after the stage's TTL. Callers get copies, so changing a result (as
+    direct_confidence_fix does) never changes the memoised one.
+    
+    Args:
+        name: Stage name, also the subdirectory of the persistent tier
+        ttl: Seconds a result stays fresh (0 disables the stage)
+        max_entries: Results kept in memory
+        directory: Persistent tier directory (empty keeps results in memory only)
+    """
+    
+    def __init__(self, name: str, ttl: float, max_entries: int = MEMO_MAX_ENTRIES, directory: str = ""):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Review pipeline stages share the caches between threads
+        self._lock = threading.Lock()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, self.name, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+    
+    def _remember(self, key: str, entry: Tuple[float, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (True, result) for a fresh memoised result, else (False, None)"""
+        if self.ttl <= 0:
+            return False, None
+        
+        entry = self._entries.get(key)
+        if entry is None and self.directory:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    stored = json.load(f)
+                if stored["key"] == key:
+                    entry = (stored["stored"], stored["value"])
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        if entry is None or time.time() - entry[0] >= self.ttl:
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return False, None
+        self._remember(key, entry)
+        with self._lock:
+            self.hits += 1
+        return True, copy.deepcopy(entry[1])
+    
+    def put(self, key: str, value: Any):
+        """Memoise a result under key"""
+        if self.ttl <= 0:
+            return
+        stored = time.time()
+        self._remember(key, (stored, copy.deepcopy(value)))
+        if not self.directory:
+            return
+        try:
+            os.makedirs(os.path.join(self.directory, self.name), exist_ok=True)
+            # Write then rename so concurrent processes never read a partial result
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.directory, self.name), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "stored": stored, "value": value}, f)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug("Could not store memoised %s result in %s: %s", self.name, self.directory, e)
+    
+    def clear(self):
+        """Forget every result, in both tiers, and reset the statistics"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        if self.directory and os.path.isdir(os.path.join(self.directory, self.name)):
+            for entry in os.scandir(os.path.join(self.directory, self.name)):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return the hits, misses, entries in memory and TTL of the stage"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "ttl": self.ttl}
+
+_memo = {stage: StageCache(stage, ttl, MEMO_MAX_ENTRIES, MEMO_DIR) for stage, ttl in MEMO_TTLS.items()}
+
+def memo_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the statistics of each memoised review stage"""
+    return {stage: cache.stats() for stage, cache in _memo.items()}
+
+def clear_memo(stage: Optional[str] = None):
+    """Forget the memoised results of one stage, or of all of them"""
+    for name, cache in _memo.items():
+        if stage is None or name == stage:
+            cache.clear()
+
+def _memoised(stage: str):
+    """
+    Memoise a function of a URL in a stage's cache. Empty results, which
+    is also how failures are reported, are not memoised and are retried.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(url):
+            found, result = _memo[stage].get(url)
+            if found:
+                logger.info("Reusing %s result for %s", stage, url)
+                return result
+            result = function(url)
+            if result:
+                _memo[stage].put(url, result)
+            return result
+        return wrapper
+    return decorator
+
+def _run_to_end(generator):
+    """Run a generator to the end and return its return value"""
+    while True:
+        try:
+            next(generator)
+        except StopIteration as stop:
+            return stop.value
 
 def scrape_vendor_documentation(vendor_url):
     """
@@ -79,146 +390,22 @@ def scrape_vendor_documentation(vendor_url):
                 
                 return response
             except Exception as e:
-                logger.warning(f"Attempt {attempt+1} failed for {url}: {str(e)}")
+                logger.warning("Attempt %d failed for %s: %s", attempt + 1, url, e)
                 time.sleep(random.uniform(1, 2))
         
         return None
     
-    # Create a known patterns dictionary for major vendors
-    # This directly maps vendor domains to known document URLs
-    known_vendor_documents = {
-        "microsoft.com": {
-            "privacy_policy": "https://privacy.microsoft.com/en-us",
-            "terms_of_service": "https://www.microsoft.com/licensing/terms/",
-            "data_processing": "https://www.microsoft.com/licensing/terms/product/PrivacyandSecurityTerms",
-            "ai_trust": "https://www.microsoft.com/ai/responsible-ai",
-            "ai_ethics": "https://www.microsoft.com/ai/responsible-ai-resources",
-            "responsible_ai": "https://www.microsoft.com/ai/responsible-ai",
-            "data_security": "https://www.microsoft.com/security",
-            "gdpr_compliance": "https://www.microsoft.com/en-us/trust-center/privacy/gdpr-overview",
-            "ccpa_compliance": "https://www.microsoft.com/en-us/trust-center/privacy/ccpa",
-            "acceptable_use": "https://www.microsoft.com/servicesagreement",
-            "data_retention": "https://privacy.microsoft.com/en-us/data-retention",
-            "subprocessors": "https://www.microsoft.com/licensing/terms/product/PrivacyandSecurityTerms/all",
-            "api_terms": "https://www.microsoft.com/licensing/terms/product/APITerms",
-            "developer_policy": "https://learn.microsoft.com/legal/developer-policies",
-            "admin_guide": "https://learn.microsoft.com/microsoft-365/admin/admin-overview/admin-center-overview",
-            "enterprise_controls": "https://learn.microsoft.com/microsoft-365/admin/add-users/about-admin-roles"
-        },
-        "google.com": {
-            "privacy_policy": "https://policies.google.com/privacy",
-            "terms_of_service": "https://policies.google.com/terms",
-            "data_processing": "https://cloud.google.com/terms/data-processing-terms",
-            "ai_trust": "https://ai.google/responsibility/",
-            "ai_ethics": "https://ai.google/principles/",
-            "responsible_ai": "https://ai.google/responsibility/",
-            "data_security": "https://safety.google/security/",
-            "gdpr_compliance": "https://cloud.google.com/privacy/gdpr",
-            "ccpa_compliance": "https://privacy.google.com/businesses/compliance/",
-            "acceptable_use": "https://cloud.google.com/terms/aup",
-            "data_retention": "https://policies.google.com/technologies/retention",
-            "subprocessors": "https://cloud.google.com/terms/subprocessors",
-            "api_terms": "https://developers.google.com/terms",
-            "developer_policy": "https://developers.google.com/terms/api-services-user-data-policy",
-            "admin_guide": "https://support.google.com/a/answer/182076",
-            "enterprise_controls": "https://support.google.com/a/answer/9050643"
-        },
-        "apple.com": {
-            "privacy_policy": "https://www.apple.com/privacy/",
-            "terms_of_service": "https://www.apple.com/legal/internet-services/terms/site.html",
-            "data_processing": "https://www.apple.com/legal/enterprise/data-transfer-agreements/",
-            "ai_trust": "https://www.apple.com/newsroom/2023/07/apples-new-ai-ethics-and-policy-team/",
-            "ai_ethics": "https://www.apple.com/newsroom/2023/07/apples-new-ai-ethics-and-policy-team/",
-            "data_security": "https://www.apple.com/privacy/features/",
-            "gdpr_compliance": "https://www.apple.com/legal/privacy/en-ww/",
-            "ccpa_compliance": "https://www.apple.com/legal/privacy/california/",
-            "developer_policy": "https://developer.apple.com/app-store/review/guidelines/"
-        },
-        "amazon.com": {
-            "privacy_policy": "https://www.amazon.com/gp/help/customer/display.html?nodeId=GX7NJQ4ZB8MHFRNJ",
-            "terms_of_service": "https://www.amazon.com/gp/help/customer/display.html?nodeId=508088",
-            "acceptable_use": "https://aws.amazon.com/aup/",
-            "data_security": "https://aws.amazon.com/security/",
-            "subprocessors": "https://aws.amazon.com/compliance/sub-processors/",
-            "developer_policy": "https://developer.amazon.com/support/legal/da"
-        },
-        "aws.amazon.com": {
-            "privacy_policy": "https://aws.amazon.com/privacy/",
-            "terms_of_service": "https://aws.amazon.com/service-terms/",
-            "data_processing": "https://aws.amazon.com/service-terms/data-processing-addendum/",
-            "ai_trust": "https://aws.amazon.com/machine-learning/responsible-machine-learning/",
-            "ai_ethics": "https://aws.amazon.com/machine-learning/responsible-machine-learning/",
-            "responsible_ai": "https://aws.amazon.com/machine-learning/responsible-machine-learning/",
-            "data_security": "https://aws.amazon.com/security/",
-            "gdpr_compliance": "https://aws.amazon.com/compliance/gdpr-center/",
-            "ccpa_compliance": "https://aws.amazon.com/compliance/california-consumer-privacy-act/",
-            "acceptable_use": "https://aws.amazon.com/aup/",
-            "subprocessors": "https://aws.amazon.com/compliance/sub-processors/",
-            "api_terms": "https://aws.amazon.com/service-terms/",
-            "developer_policy": "https://aws.amazon.com/service-terms/",
-            "admin_guide": "https://docs.aws.amazon.com/organizations/latest/userguide/orgs_manage_accounts.html",
-            "enterprise_controls": "https://aws.amazon.com/organizations/"
-        },
-        "salesforce.com": {
-            "privacy_policy": "https://www.salesforce.com/company/privacy/",
-            "terms_of_service": "https://www.salesforce.com/company/legal/sfdc-website-terms-of-service/",
-            "data_processing": "https://www.salesforce.com/content/dam/web/en_us/www/documents/legal/Agreements/data-processing-addendum.pdf",
-            "ai_trust": "https://www.salesforce.com/company/ethics/ai/",
-            "ai_ethics": "https://www.salesforce.com/company/ethics/ai/",
-            "responsible_ai": "https://www.salesforce.com/company/ethics/ai/",
-            "data_security": "https://www.salesforce.com/company/privacy/security/",
-            "gdpr_compliance": "https://www.salesforce.com/gdpr/overview/",
-            "acceptable_use": "https://www.salesforce.com/company/legal/acceptable-use-policy/",
-            "subprocessors": "https://www.salesforce.com/content/dam/web/en_us/www/documents/legal/Agreements/data-processing-addendum.pdf"
-        },
-        "adobe.com": {
-            "privacy_policy": "https://www.adobe.com/privacy/policy.html",
-            "terms_of_service": "https://www.adobe.com/legal/terms.html",
-            "data_processing": "https://www.adobe.com/privacy/data-processing-terms.html",
-            "ai_trust": "https://www.adobe.com/sensei/ethics.html",
-            "ai_ethics": "https://www.adobe.com/sensei/ethics.html",
-            "responsible_ai": "https://www.adobe.com/sensei/ethics.html",
-            "data_security": "https://www.adobe.com/security.html",
-            "gdpr_compliance": "https://www.adobe.com/privacy/general-data-protection-regulation.html",
-            "ccpa_compliance": "https://www.adobe.com/privacy/ccpa.html",
-            "acceptable_use": "https://www.adobe.com/legal/terms.html",
-            "subprocessors": "https://www.adobe.com/privacy/sub-processors.html",
-            "developer_policy": "https://www.adobe.io/policies/developer-terms.html"
-        },
-        "slack.com": {
-            "privacy_policy": "https://slack.com/trust/privacy/privacy-policy",
-            "terms_of_service": "https://slack.com/terms-of-service",
-            "data_processing": "https://slack.com/terms-of-service/data-processing",
-            "data_security": "https://slack.com/trust/security",
-            "gdpr_compliance": "https://slack.com/trust/compliance/gdpr",
-            "acceptable_use": "https://slack.com/policy-enforcement/acceptable-use-policy",
-            "subprocessors": "https://slack.com/trust/compliance/subprocessors",
-            "api_terms": "https://api.slack.com/terms-of-service",
-            "developer_policy": "https://api.slack.com/developer-policy",
-            "admin_guide": "https://slack.com/help/articles/115004071768-What-is-Slack-Enterprise-Grid-"
-        },
-        "snowflake.com": {
-            "privacy_policy": "https://www.snowflake.com/privacy-policy/",
-            "terms_of_service": "https://www.snowflake.com/legal/terms-of-service/",
-            "data_processing": "https://www.snowflake.com/legal/dpaa/",
-            "data_security": "https://www.snowflake.com/security/",
-            "gdpr_compliance": "https://www.snowflake.com/wp-content/uploads/2023/01/gdprwhitepaper-snowflakedpaa.pdf",
-            "acceptable_use": "https://www.snowflake.com/legal/acceptable-use-policy/",
-            "subprocessors": "https://www.snowflake.com/legal/subprocessors/"
-        }
-    }
-    
     # Check if this is a known vendor - direct mapping approach
-    for domain, docs in known_vendor_documents.items():
-        if domain in vendor_url:
-            logger.info(f"Found known vendor: {domain}")
-            # Copy known URLs to our results
-            for doc_type, doc_url in docs.items():
-                documentation_urls[doc_type] = doc_url
-                logger.info(f"Set {doc_type}: {doc_url}")
-            
-            # For known vendors, still continue with normal scraping to find any missing documents
-            break
+    known = get_vendor_registry().lookup(vendor_url)
+    if known:
+        domain, docs = known
+        logger.info("Found known vendor: %s", domain)
+        # Copy known URLs to our results
+        for doc_type, doc_url in docs.items():
+            documentation_urls[doc_type] = doc_url
+            logger.debug("Set %s: %s", doc_type, doc_url)
+        
+        # For known vendors, still continue with normal scraping to find any missing documents
     
     # Dictionary of document patterns - used to identify document types from links
     document_patterns = {
@@ -372,11 +559,11 @@ def scrape_vendor_documentation(vendor_url):
             continue
             
         visited_pages.add(page_url)
-        logger.info(f"Checking page: {page_url}")
+        logger.info("Checking page: %s", page_url)
         
         response = make_request(page_url)
         if not response or response.status_code != 200:
-            logger.info(f"Skipping - status: {response.status_code if response else 'No response'}")
+            logger.info("Skipping - status: %s", response.status_code if response else 'No response')
             continue
             
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -397,7 +584,7 @@ def scrape_vendor_documentation(vendor_url):
             doc_type = get_doc_type(normalized_url, link_text)
             if doc_type and not documentation_urls[doc_type]:
                 documentation_urls[doc_type] = normalized_url
-                logger.info(f"Found {doc_type}: {normalized_url}")
+                logger.info("Found %s: %s", doc_type, normalized_url)
             
             # Save potentially important links to check later
             lower_href = href.lower()
@@ -417,7 +604,7 @@ def scrape_vendor_documentation(vendor_url):
             continue
             
         visited_pages.add(link_url)
-        logger.info(f"Checking important link: {link_url}")
+        logger.info("Checking important link: %s", link_url)
         
         response = make_request(link_url)
         if not response or response.status_code != 200:
@@ -441,7 +628,7 @@ def scrape_vendor_documentation(vendor_url):
             doc_type = get_doc_type(normalized_url, link_text)
             if doc_type and not documentation_urls[doc_type]:
                 documentation_urls[doc_type] = normalized_url
-                logger.info(f"Found {doc_type}: {normalized_url}")
+                logger.info("Found %s: %s", doc_type, normalized_url)
     
     # Try common paths for missing documents
     common_path_patterns = {
@@ -526,20 +713,20 @@ def scrape_vendor_documentation(vendor_url):
                 continue
                 
             visited_pages.add(test_url)
-            logger.info(f"Trying common path for {doc_type}: {test_url}")
+            logger.debug("Trying common path for %s: %s", doc_type, test_url)
             
             response = make_request(test_url, method='head')
             if response and response.status_code < 400:
                 documentation_urls[doc_type] = test_url
-                logger.info(f"Found {doc_type} through common path: {test_url}")
+                logger.info("Found %s through common path: %s", doc_type, test_url)
                 break
     
     # Get only the populated document URLs
     found_docs = {k: v for k, v in documentation_urls.items() if v}
     
-    logger.info(f"\nFound {len(found_docs)} document URLs for {vendor_url}:")
+    logger.info("Found %d document URLs for %s:", len(found_docs), vendor_url)
     for doc_type, url in found_docs.items():
-        logger.info(f"  {doc_type}: {url}")
+        logger.info("  %s: %s", doc_type, url)
     
     return documentation_urls
 
@@ -566,125 +753,17 @@ def extract_document_text(url):
     return text
 
 def analyze_ai_capabilities(texts):
-    analysis = {
-        "opt_out_available": False,
-        "enterprise_opt_out": False,
-        "native_ai": None,  # True/False/Unknown
-        "third_party_providers": [],
-        "data_retention": False,
-        "model_training": False,
-        "model_sharing": False,
-        "contractual_protections": False,
-        "concerns": []
-    }
-    
-    # Keywords and patterns to look for
-    patterns = {
-        "opt_out": r'opt[-\s]?out|disable|turn off|deactivate',
-        "enterprise": r'enterprise|admin|administrator|organization|tenant',
-        "ai_native": r'built[-\s]?in|native|proprietary|our (own|model)',
-        "third_party": r'third[-\s]?party|partner|OpenAI|Azure|Google|AWS|Amazon',
-        "data_retention": r'retain|store|save|keep|preserve',
-        "model_training": r'train|learn|improve|enhance',
-        "model_sharing": r'share|distribute|provide to|made available',
-        "contractual": r'contract|agreement|prohibit|restrict|prevent|not (allowed|permitted)',
-    }
+    """
+    Original, coarser analysis of the vendor documents.
     
-    # Analyze each document
-    for doc_type, text in texts.items():
-        if not text:
-            continue
-        
-        # Check for opt-out options
-        opt_out_matches = re.finditer(patterns["opt_out"], text, re.IGNORECASE)
-        for match in opt_out_matches:
-            analysis["opt_out_available"] = True
-            # Check context around opt-out (100 chars before and after)
-            start = max(0, match.start() - 100)
-            end = min(len(text), match.end() + 100)
-            context = text[start:end]
-            
-            if re.search(patterns["enterprise"], context, re.IGNORECASE):
-                analysis["enterprise_opt_out"] = True
-        
-        # Check for AI implementation details
-        if re.search(patterns["ai_native"], text, re.IGNORECASE):
-            analysis["native_ai"] = True
-            
-        third_party_matches = re.finditer(patterns["third_party"], text, re.IGNORECASE)
-        for match in third_party_matches:
-            # Extract the third-party name from context
-            start = max(0, match.start() - 20)
-            end = min(len(text), match.end() + 20)
-            context = text[start:end]
-            
-            # Try to identify the specific third party
-            for provider in ["OpenAI", "Azure", "Google", "AWS", "Amazon"]:
-                if provider.lower() in context.lower() and provider not in analysis["third_party_providers"]:
-                    analysis["third_party_providers"].append(provider)
-        
-        if analysis["third_party_providers"]:
-            analysis["native_ai"] = False
-        
-        # Check data retention and model training
-        if re.search(patterns["data_retention"], text, re.IGNORECASE):
-            analysis["data_retention"] = True
-            
-        if re.search(patterns["model_training"], text, re.IGNORECASE):
-            analysis["model_training"] = True
-        
-        # Check model sharing
-        if re.search(patterns["model_sharing"], text, re.IGNORECASE):
-            model_sharing_context = []
-            for match in re.finditer(patterns["model_sharing"], text, re.IGNORECASE):
-                start = max(0, match.start() - 100)
-                end = min(len(text), match.end() + 100)
-                model_sharing_context.append(text[start:end])
-            
-            # If we find model sharing context, analyze it
-            if model_sharing_context:
-                if any("not" in ctx.lower() for ctx in model_sharing_context):
-                    analysis["model_sharing"] = False
-                else:
-                    analysis["model_sharing"] = True
-        
-        # Check contractual protections
-        if analysis["third_party_providers"] and re.search(patterns["contractual"], text, re.IGNORECASE):
-            for match in re.finditer(patterns["contractual"], text, re.IGNORECASE):
-                start = max(0, match.start() - 100)
-                end = min(len(text), match.end() + 100)
-                context = text[start:end]
-                
-                if any(provider.lower() in context.lower() for provider in analysis["third_party_providers"]):
-                    analysis["contractual_protections"] = True
-        
-        # Look for potential concerns
-        concern_keywords = [
-            "data breach", "privacy risk", "leakage", "unauthorized access",
-            "sensitive data", "personal information", "compliance", "regulation"
-        ]
+    Args:
+        texts: Dictionary mapping document types to their text content
         
-        for keyword in concern_keywords:
-            if keyword in text.lower():
-                start_idx = text.lower().find(keyword)
-                start = max(0, start_idx - 50)
-                end = min(len(text), start_idx + len(keyword) + 50)
-                concern_context = text[start:end]
-                analysis["concerns"].append(f"Potential concern: {concern_context}")
-    
-    return analysis
-
+    Returns:
+        Dictionary with the opt-out, provider, data usage and concern flags
+    """
+    return analyze_documents(texts, ("legacy",))["legacy"]
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("ai_review.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger("ai_review")
 
 def get_vendor_documentation(vendor_url):
     """
@@ -697,7 +776,120 @@ def get_vendor_documentation(vendor_url):
     Returns:
         Dictionary of document types mapped to their URLs
     """
-    import re
+    return _run_to_end(iter_vendor_documentation(vendor_url))
+
+def iter_vendor_documentation(vendor_url):
+    """
+    Find a vendor's documents like get_vendor_documentation, passing each
+    one on as soon as it is found.
+    
+    Args:
+        vendor_url: The vendor's URL
+    
+    Yields:
+        (document type, URL) for each document found
+    
+    Returns:
+        The get_vendor_documentation dictionary, once every document is found
+    """
+    return (yield from _fetch_steps(_vendor_documentation_steps(vendor_url)))
+
+# Default known-vendor registry shipped next to this module
+VENDOR_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "known_vendors.json")
+
+def _registry_host(url: str) -> str:
+    """The lowercase host of a URL (or of a bare domain), without port or trailing dot"""
+    if "://" not in url:
+        url = "https://" + url
+    return (urlparse(url).hostname or "").rstrip(".")
+
+class VendorRegistry:
+    """
+    Known document URLs of vendors, by domain.
+    
+    Domains are indexed by their labels in reverse ("aws.amazon.com" under
+    com → amazon → aws), and a host resolves to the deepest registered
+    domain that is the host itself or one of its parents. A lookup costs
+    one dictionary probe per label of the host, whatever the size of the
+    registry, and only whole labels match: "aws.amazon.com" resolves to its
+    own entry rather than to "amazon.com", and "notmicrosoft.com" to none.
+    
+    Args:
+        vendors: Dictionary mapping domains to {document type: URL}
+    """
+    
+    def __init__(self, vendors: Dict[str, Dict[str, str]]):
+        self.vendors: Dict[str, Dict[str, str]] = {}
+        self._index: Dict[str, Any] = {}
+        for domain, documents in vendors.items():
+            domain = _registry_host(domain)
+            self.vendors[domain] = dict(documents)
+            node = self._index
+            for label in reversed(domain.split(".")):
+                node = node.setdefault(label, {})
+            # Labels are never empty, so "" marks a registered domain
+            node[""] = domain
+    
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "VendorRegistry":
+        """Load a registry from a JSON file with a "vendors" mapping"""
+        with open(path or VENDOR_REGISTRY_PATH, encoding="utf-8") as f:
+            return cls(json.load(f)["vendors"])
+    
+    def match(self, url: str) -> Optional[str]:
+        """Return the registered domain a URL or host belongs to, or None"""
+        node, domain = self._index, None
+        for label in reversed(_registry_host(url).split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            domain = node.get("", domain)
+        return domain
+    
+    def lookup(self, url: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Find the known documents of the vendor a URL or host belongs to.
+        
+        Returns:
+            (registered domain, {document type: URL}), or None for an
+            unknown vendor
+        """
+        domain = self.match(url)
+        return (domain, dict(self.vendors[domain])) if domain else None
+
+_vendor_registry = None
+
+def get_vendor_registry() -> VendorRegistry:
+    """Return the shared known-vendor registry, loading it on first use"""
+    global _vendor_registry
+    if _vendor_registry is None:
+        _vendor_registry = VendorRegistry.load()
+    return _vendor_registry
+
+def set_vendor_registry(registry: Union[VendorRegistry, str, None]):
+    """
+    Replace the shared known-vendor registry.
+    
+    Discovery results memoised with the previous registry are forgotten.
+    
+    Args:
+        registry: A VendorRegistry, a path to a registry JSON file, or None
+            to reload the default registry on next use
+    """
+    global _vendor_registry
+    if isinstance(registry, str):
+        registry = VendorRegistry.load(registry)
+    _vendor_registry = registry
+    _memo["discovery"].clear()
+
+def _vendor_documentation_steps(vendor_url):
+    """Discovery steps of get_vendor_documentation (see _fetch_steps)"""
+    found, documentation_urls = _memo["discovery"].get(vendor_url)
+    if found:
+        logger.info("Reusing discovery result for %s", vendor_url)
+        yield from (("found", doc_type, doc_url) for doc_type, doc_url in documentation_urls.items() if doc_url)
+        return documentation_urls
+    memo_key = vendor_url
     
     # Normalize the vendor URL
     if not vendor_url.startswith(('http://', 'https://')):
@@ -707,150 +899,10 @@ def get_vendor_documentation(vendor_url):
     vendor_url = vendor_url.rstrip('/')
     
     # Extract the domain from the URL
-    domain_match = re.search(r'https?://(?:www\.)?([^/]+)', vendor_url)
-    if domain_match:
-        domain = domain_match.group(1)
-    else:
-        domain = None
-    
-    # Pre-defined document URLs for common vendors
-    known_vendors = {
-        # Microsoft
-        "microsoft.com": {
-            "privacy_policy": "https://privacy.microsoft.com/en-us",
-            "terms_of_service": "https://www.microsoft.com/licensing/terms/",
-            "data_processing": "https://www.microsoft.com/licensing/terms/product/PrivacyandSecurityTerms",
-            "ai_trust": "https://www.microsoft.com/ai/responsible-ai",
-            "ai_ethics": "https://www.microsoft.com/ai/responsible-ai-resources",
-            "responsible_ai": "https://www.microsoft.com/ai/responsible-ai",
-            "data_security": "https://www.microsoft.com/security",
-            "gdpr_compliance": "https://www.microsoft.com/en-us/trust-center/privacy/gdpr-overview",
-            "ccpa_compliance": "https://www.microsoft.com/en-us/trust-center/privacy/ccpa",
-            "acceptable_use": "https://www.microsoft.com/servicesagreement",
-            "data_retention": "https://privacy.microsoft.com/en-us/data-retention",
-            "subprocessors": "https://www.microsoft.com/licensing/terms/product/PrivacyandSecurityTerms/all",
-            "api_terms": "https://www.microsoft.com/licensing/terms/product/APITerms",
-            "developer_policy": "https://learn.microsoft.com/legal/developer-policies",
-            "admin_guide": "https://learn.microsoft.com/microsoft-365/admin/admin-overview/admin-center-overview",
-            "enterprise_controls": "https://learn.microsoft.com/microsoft-365/admin/add-users/about-admin-roles"
-        },
-        
-        # Google
-        "google.com": {
-            "privacy_policy": "https://policies.google.com/privacy",
-            "terms_of_service": "https://policies.google.com/terms",
-            "data_processing": "https://cloud.google.com/terms/data-processing-terms",
-            "ai_trust": "https://ai.google/responsibility/",
-            "ai_ethics": "https://ai.google/principles/",
-            "responsible_ai": "https://ai.google/responsibility/",
-            "data_security": "https://safety.google/security/",
-            "gdpr_compliance": "https://cloud.google.com/privacy/gdpr",
-            "ccpa_compliance": "https://privacy.google.com/businesses/compliance/",
-            "acceptable_use": "https://cloud.google.com/terms/aup",
-            "data_retention": "https://policies.google.com/technologies/retention",
-            "subprocessors": "https://cloud.google.com/terms/subprocessors",
-            "api_terms": "https://developers.google.com/terms",
-            "developer_policy": "https://developers.google.com/terms/api-services-user-data-policy",
-            "admin_guide": "https://support.google.com/a/answer/182076",
-            "enterprise_controls": "https://support.google.com/a/answer/9050643"
-        },
-        
-        # Amazon AWS
-        "aws.amazon.com": {
-            "privacy_policy": "https://aws.amazon.com/privacy/",
-            "terms_of_service": "https://aws.amazon.com/service-terms/",
-            "data_processing": "https://aws.amazon.com/service-terms/data-processing-addendum/",
-            "ai_trust": "https://aws.amazon.com/machine-learning/responsible-machine-learning/",
-            "ai_ethics": "https://aws.amazon.com/machine-learning/responsible-machine-learning/",
-            "responsible_ai": "https://aws.amazon.com/machine-learning/responsible-machine-learning/",
-            "data_security": "https://aws.amazon.com/security/",
-            "gdpr_compliance": "https://aws.amazon.com/compliance/gdpr-center/",
-            "ccpa_compliance": "https://aws.amazon.com/compliance/california-consumer-privacy-act/",
-            "acceptable_use": "https://aws.amazon.com/aup/",
-            "subprocessors": "https://aws.amazon.com/compliance/sub-processors/",
-            "api_terms": "https://aws.amazon.com/service-terms/",
-            "developer_policy": "https://aws.amazon.com/service-terms/",
-            "admin_guide": "https://docs.aws.amazon.com/organizations/latest/userguide/orgs_manage_accounts.html",
-            "enterprise_controls": "https://aws.amazon.com/organizations/"
-        },
-        
-        # Salesforce
-        "salesforce.com": {
-            "privacy_policy": "https://www.salesforce.com/company/privacy/",
-            "terms_of_service": "https://www.salesforce.com/company/legal/sfdc-website-terms-of-service/",
-            "data_processing": "https://www.salesforce.com/content/dam/web/en_us/www/documents/legal/Agreements/data-processing-addendum.pdf",
-            "ai_trust": "https://www.salesforce.com/company/ethics/ai/",
-            "ai_ethics": "https://www.salesforce.com/company/ethics/ai/",
-            "responsible_ai": "https://www.salesforce.com/company/ethics/ai/",
-            "data_security": "https://www.salesforce.com/company/privacy/security/",
-            "gdpr_compliance": "https://www.salesforce.com/gdpr/overview/",
-            "acceptable_use": "https://www.salesforce.com/company/legal/acceptable-use-policy/",
-            "subprocessors": "https://www.salesforce.com/content/dam/web/en_us/www/documents/legal/Agreements/data-processing-addendum.pdf",
-            "admin_guide": "https://help.salesforce.com/s/articleView?id=sf.admin_overview.htm",
-            "enterprise_controls": "https://help.salesforce.com/s/articleView?id=sf.admin_adminroles.htm"
-        },
-        
-        # Adobe
-        "adobe.com": {
-            "privacy_policy": "https://www.adobe.com/privacy/policy.html",
-            "terms_of_service": "https://www.adobe.com/legal/terms.html",
-            "data_processing": "https://www.adobe.com/privacy/data-processing-terms.html",
-            "ai_trust": "https://www.adobe.com/sensei/ethics.html",
-            "ai_ethics": "https://www.adobe.com/sensei/ethics.html",
-            "responsible_ai": "https://www.adobe.com/sensei/ethics.html",
-            "data_security": "https://www.adobe.com/security.html",
-            "gdpr_compliance": "https://www.adobe.com/privacy/general-data-protection-regulation.html",
-            "ccpa_compliance": "https://www.adobe.com/privacy/ccpa.html",
-            "acceptable_use": "https://www.adobe.com/legal/terms.html",
-            "subprocessors": "https://www.adobe.com/privacy/sub-processors.html",
-            "developer_policy": "https://www.adobe.io/policies/developer-terms.html",
-            "admin_guide": "https://helpx.adobe.com/enterprise/using/admin-console.html",
-            "enterprise_controls": "https://helpx.adobe.com/enterprise/using/admin-console.html"
-        },
-        
-        # Slack
-        "slack.com": {
-            "privacy_policy": "https://slack.com/trust/privacy/privacy-policy",
-            "terms_of_service": "https://slack.com/terms-of-service",
-            "data_processing": "https://slack.com/terms-of-service/data-processing",
-            "data_security": "https://slack.com/trust/security",
-            "gdpr_compliance": "https://slack.com/trust/compliance/gdpr",
-            "acceptable_use": "https://slack.com/policy-enforcement/acceptable-use-policy",
-            "subprocessors": "https://slack.com/trust/compliance/subprocessors",
-            "api_terms": "https://api.slack.com/terms-of-service",
-            "developer_policy": "https://api.slack.com/developer-policy",
-            "admin_guide": "https://slack.com/help/articles/115004071768-What-is-Slack-Enterprise-Grid-",
-            "enterprise_controls": "https://slack.com/help/articles/115004071768-What-is-Slack-Enterprise-Grid-"
-        },
-        
-        # Snowflake
-        "snowflake.com": {
-            "privacy_policy": "https://www.snowflake.com/privacy-policy/",
-            "terms_of_service": "https://www.snowflake.com/legal/terms-of-service/",
-            "data_processing": "https://www.snowflake.com/legal/dpaa/",
-            "ai_trust": "https://www.snowflake.com/blog/responsible-ai-framework/",
-            "data_security": "https://www.snowflake.com/security/",
-            "gdpr_compliance": "https://www.snowflake.com/wp-content/uploads/2023/01/gdprwhitepaper-snowflakedpaa.pdf",
-            "acceptable_use": "https://www.snowflake.com/legal/acceptable-use-policy/",
-            "subprocessors": "https://www.snowflake.com/legal/subprocessors/"
-        },
-        
-        # Zoom
-        "zoom.us": {
-            "privacy_policy": "https://zoom.us/privacy",
-            "terms_of_service": "https://zoom.us/terms",
-            "data_processing": "https://zoom.us/data-processing",
-            "ai_trust": "https://explore.zoom.us/docs/en-us/trust/ai-ethics.html",
-            "data_security": "https://zoom.us/security",
-            "gdpr_compliance": "https://zoom.us/gdpr",
-            "subprocessors": "https://zoom.us/subprocessors",
-            "developer_policy": "https://marketplace.zoom.us/docs/guides/guidelines/developer-policies",
-            "admin_guide": "https://support.zoom.us/hc/en-us/categories/201146643",
-            "enterprise_controls": "https://support.zoom.us/hc/en-us/articles/115005756143-Creating-changing-and-locking-account-settings"
-        },
-        
-        # Add more vendors as needed
-    }
+    domain = _registry_host(vendor_url)
+    
+    # Pre-defined document URLs for known vendors
+    known = get_vendor_registry().lookup(vendor_url)
     
     # Create the standard documentation_urls dictionary with all document types
     documentation_urls = {
@@ -883,25 +935,25 @@ def get_vendor_documentation(vendor_url):
         "enterprise_controls": None
     }
     
-    # If we found a domain and it's in our known vendors list,
-    # use the pre-defined document URLs
-    if domain:
-        for known_domain, known_docs in known_vendors.items():
-            if known_domain in domain:
-                print(f"Using known document URLs for {domain}")
-                
-                # Copy the known document URLs to our results
-                for doc_type, doc_url in known_docs.items():
-                    documentation_urls[doc_type] = doc_url
-                
-                # We found a match, no need to continue checking
-                break
+    # If the vendor is in the registry, use its pre-defined document URLs
+    if known:
+        print(f"Using known document URLs for {known[0]}")
+        
+        # Copy the known document URLs to our results
+        for doc_type, doc_url in known[1].items():
+            documentation_urls[doc_type] = doc_url
     
     # If we don't have pre-defined URLs for this vendor,
     # fall back to the web scraping approach
-    if not any(documentation_urls.values()):
+    if any(documentation_urls.values()):
+        yield from (("found", doc_type, doc_url) for doc_type, doc_url in documentation_urls.items() if doc_url)
+    else:
         print(f"No pre-defined URLs for {domain}, using web scraping")
-        documentation_urls = scrape_vendor_documentation(vendor_url)
+        documentation_urls = yield from _scrape_steps(vendor_url)
+    
+    # A discovery that found nothing is how fetch failures show up, so it is retried next time
+    if any(documentation_urls.values()):
+        _memo["discovery"].put(memo_key, documentation_urls)
     
     # Return the documentation URLs
     return documentation_urls
@@ -950,7 +1002,101 @@ def scrape_vendor_documentation(vendor_url: str) -> Dict[str, Optional[str]]:
     Returns:
         Dictionary mapping document types to URLs
     """
-    logger.info(f"Scraping documentation from {vendor_url}")
+    return _run_to_end(iter_scraped_documentation(vendor_url))
+
+def iter_scraped_documentation(vendor_url: str):
+    """
+    Scrape a vendor's website like scrape_vendor_documentation, passing each
+    document on as soon as it is found.
+    
+    Args:
+        vendor_url: The base URL for the vendor's website
+    
+    Yields:
+        (document type, URL) for each document found
+    
+    Returns:
+        The scrape_vendor_documentation dictionary
+    """
+    return (yield from _fetch_steps(_scrape_steps(vendor_url)))
+
+# Requests sent to any one host at once; 0 leaves them unbounded
+HOST_CONCURRENCY = int(os.environ.get("AI_REVIEW_HOST_CONCURRENCY", "0"))
+
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+def set_host_concurrency(limit: int):
+    """Bound the requests sent to any one host at once (0 leaves them unbounded)"""
+    global HOST_CONCURRENCY
+    with _host_slots_lock:
+        HOST_CONCURRENCY = limit
+        _host_slots.clear()
+
+@contextmanager
+def _host_slot(url: str):
+    """Hold one of the HOST_CONCURRENCY request slots of a URL's host"""
+    with _host_slots_lock:
+        limit = HOST_CONCURRENCY
+        host = urlparse(url).netloc.lower()
+        slot = _host_slots.get(host) if limit else None
+        if limit and slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(limit)
+    if slot is None:
+        yield
+        return
+    with slot:
+        yield
+
+# Session whose connection pool blocking fetches share; None connects per request
+_http_session: Optional[requests.Session] = None
+
+def set_http_session(session: Optional[requests.Session]):
+    """
+    Send blocking fetches through a shared session, keeping connections to
+    vendor sites open between reviews (None connects per request again).
+    """
+    global _http_session
+    _http_session = session
+
+def _http_get(url: str, **kwargs) -> requests.Response:
+    """requests.get, waiting for a slot of the URL's host first"""
+    with _host_slot(url):
+        return (_http_session or requests).get(url, **kwargs)
+
+def _fetch_steps(steps):
+    """
+    Run discovery steps with blocking requests.
+    
+    Discovery is written as a generator of steps so that the sync and async
+    APIs share it: a ("fetch", url, timeout) step is sent back the response,
+    or has the exception the request raised thrown in, and a ("found",
+    document type, URL) step reports a document.
+    
+    Yields:
+        (document type, URL) for each document found
+    
+    Returns:
+        The result of the steps
+    """
+    reply, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(reply)
+        except StopIteration as end:
+            return end.value
+        reply, error = None, None
+        if step[0] == "found":
+            yield step[1], step[2]
+            continue
+        try:
+            reply = _http_get(step[1], timeout=step[2])
+        except Exception as e:
+            error = e
+
+def _scrape_steps(vendor_url: str):
+    """Discovery steps of scrape_vendor_documentation (see _fetch_steps)"""
+    logger.info("Scraping documentation from %s", vendor_url)
     
     # Normalize the vendor URL
     if not vendor_url.startswith(('http://', 'https://')):
@@ -974,12 +1120,12 @@ def scrape_vendor_documentation(vendor_url: str) -> Dict[str, Optional[str]]:
     
     # First try the main page
     try:
-        response = requests.get(vendor_url, timeout=10)
+        response = yield "fetch", vendor_url, 10
         response.raise_for_status()
         
         # Check if we were redirected
         if response.url != vendor_url:
-            logger.info(f"Redirected to {response.url}")
+            logger.info("Redirected to %s", response.url)
             vendor_url = response.url
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -989,6 +1135,7 @@ def scrape_vendor_documentation(vendor_url: str) -> Dict[str, Optional[str]]:
         for doc_type, url in found_urls.items():
             if url:
                 documentation_urls[doc_type] = url
+                yield "found", doc_type, url
         
         # Check common footer links
         footer_elements = soup.select("footer, .footer, #footer, [class*='footer']")
@@ -997,6 +1144,7 @@ def scrape_vendor_documentation(vendor_url: str) -> Dict[str, Optional[str]]:
             for doc_type, url in footer_urls.items():
                 if url and not documentation_urls[doc_type]:
                     documentation_urls[doc_type] = url
+                    yield "found", doc_type, url
         
         # Check for a sitemap or legal page
         legal_links = _find_legal_or_sitemap_links(soup, vendor_url)
@@ -1007,14 +1155,15 @@ def scrape_vendor_documentation(vendor_url: str) -> Dict[str, Optional[str]]:
                 # Try legal pages first
                 for legal_url in legal_links:
                     try:
-                        legal_response = requests.get(legal_url, timeout=10)
+                        legal_response = yield "fetch", legal_url, 10
                         legal_soup = BeautifulSoup(legal_response.text, 'html.parser')
                         legal_urls = _extract_doc_links(legal_soup, vendor_url)
                         if legal_urls[doc_type]:
                             documentation_urls[doc_type] = legal_urls[doc_type]
+                            yield "found", doc_type, legal_urls[doc_type]
                             break
                     except Exception as e:
-                        logger.warning(f"Error checking legal page {legal_url}: {str(e)}")
+                        logger.warning("Error checking legal page %s: %s", legal_url, e)
                 
                 # If still not found, try common paths
                 if not documentation_urls[doc_type]:
@@ -1022,21 +1171,22 @@ def scrape_vendor_documentation(vendor_url: str) -> Dict[str, Optional[str]]:
                         if _is_relevant_path(path, doc_type):
                             try:
                                 test_url = f"{vendor_url.rstrip('/')}{path}"
-                                test_response = requests.get(test_url, timeout=5)
+                                test_response = yield "fetch", test_url, 5
                                 if test_response.status_code == 200:
                                     documentation_urls[doc_type] = test_url
+                                    yield "found", doc_type, test_url
                                     break
                             except Exception:
                                 continue
     except Exception as e:
-        logger.error(f"Error scraping {vendor_url}: {str(e)}")
+        logger.error("Error scraping %s: %s", vendor_url, e)
     
     # Log the results
     found_docs = sum(1 for v in documentation_urls.values() if v)
-    logger.info(f"Found {found_docs} documents for {vendor_url}")
+    logger.info("Found %d documents for %s", found_docs, vendor_url)
     for doc_type, url in documentation_urls.items():
         if url:
-            logger.info(f"  {doc_type}: {url}")
+            logger.info("  %s: %s", doc_type, url)
     
     return documentation_urls
 
@@ -1136,6 +1286,37 @@ def _is_relevant_path(path: str, doc_type: str) -> bool:
         return True
     return False
 
+def _main_content(html: str):
+    """
+    Parse a document and return its main content element, with scripts,
+    navigation and other non-content areas removed.
+    
+    Args:
+        html: HTML of the document
+    
+    Returns:
+        The main content element (the body or whole document if none is marked)
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove script, style, and hidden elements
+    for element in soup(['script', 'style', 'header', 'footer', 'nav']):
+        element.decompose()
+    
+    # Remove elements with classes that suggest non-content areas
+    for element in soup.select('[class*="banner"], [class*="cookie"], [class*="advertisement"], [class*="sidebar"], [class*="widget"]'):
+        element.decompose()
+    
+    # Extract main content - first try to find a main content area
+    for selector in ['main', 'article', '.content', '#content', '[role="main"]']:
+        content_area = soup.select_one(selector)
+        if content_area:
+            return content_area
+    
+    # If no main content area found, use the entire body
+    return soup.body if soup.body else soup
+
+@_memoised("extraction")
 def extract_document_text(url: str) -> str:
     """
     Extract and clean text content from a document URL.
@@ -1146,54 +1327,101 @@ def extract_document_text(url: str) -> str:
     Returns:
         Cleaned text content
     """
-    logger.info(f"Extracting text from {url}")
+    logger.info("Extracting text from %s", url)
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script, style, and hidden elements
-        for element in soup(['script', 'style', 'header', 'footer', 'nav']):
-            element.decompose()
-        
-        # Remove elements with classes that suggest non-content areas
-        for element in soup.select('[class*="banner"], [class*="cookie"], [class*="advertisement"], [class*="sidebar"], [class*="widget"]'):
-            element.decompose()
-        
-        # Extract main content - first try to find a main content area
-        main_content = None
-        for selector in ['main', 'article', '.content', '#content', '[role="main"]']:
-            content_area = soup.select_one(selector)
-            if content_area:
-                main_content = content_area
-                break
-        
-        # If no main content area found, use the entire body
-        if not main_content:
-            main_content = soup.body if soup.body else soup
-        
-        # Get text
-        text = main_content.get_text(separator=' ')
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text)
-        
-        logger.info(f"Extracted {len(text)} characters from {url}")
+        text = _document_text(_fetch_document(url))
+        logger.info("Extracted %d characters from %s", len(text), url)
         return text
     except Exception as e:
-        logger.error(f"Error extracting text from {url}: {str(e)}")
+        logger.error("Error extracting text from %s: %s", url, e)
         return ""
 
+# Request headers for fetching documents
+_FETCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def _fetch_document(url: str) -> str:
+    """Fetch a document's HTML, raising on HTTP errors"""
+    response = _http_get(url, headers=_FETCH_HEADERS, timeout=15)
+    response.raise_for_status()
+    return response.text
+
+def _document_text(html: str) -> str:
+    """Extract the cleaned text of a document's main content"""
+    main_content = _main_content(html)
+    
+    # Get text
+    text = main_content.get_text(separator=' ')
+    
+    # Clean up whitespace
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    
+    # Replace multiple spaces with a single space
+    return re.sub(r'\s+', ' ', text)
+
+def iter_document_text(url: str, chunk_chars: int = 65536) -> Iterator[str]:
+    """
+    Extract and clean text content from a document URL as a stream of chunks.
+    
+    The chunks join up to the text extract_document_text() returns, and can
+    be passed to analyze_documents() to be analyzed as they are produced.
+    
+    Args:
+        url: URL of the document to extract text from
+        chunk_chars: Approximate size of each chunk
+    
+    Yields:
+        Consecutive pieces of the cleaned text content
+    """
+    # Text extracted before, by either function, is replayed from the memo
+    found, text = _memo["extraction"].get(url)
+    if found:
+        logger.info("Reusing extraction result for %s", url)
+        for start in range(0, len(text), chunk_chars):
+            yield text[start:start + chunk_chars]
+        return
+    
+    logger.info("Extracting text from %s", url)
+    
+    try:
+        main_content = _main_content(_fetch_document(url))
+    except Exception as e:
+        logger.error("Error extracting text from %s: %s", url, e)
+        return
+    
+    # Collapse whitespace runs into single spaces, as extract_document_text does
+    words = []
+    size = 0
+    total = 0
+    kept = []
+    for string in main_content.strings:
+        for word in string.split():
+            words.append(word)
+            size += len(word) + 1
+            if size >= chunk_chars:
+                chunk = (' ' if total else '') + ' '.join(words)
+                total += len(chunk)
+                if total <= ANALYSIS_CACHE_MAX_CHARS:
+                    kept.append(chunk)
+                yield chunk
+                words = []
+                size = 0
+    if words:
+        chunk = (' ' if total else '') + ' '.join(words)
+        total += len(chunk)
+        if total <= ANALYSIS_CACHE_MAX_CHARS:
+            kept.append(chunk)
+        yield chunk
+    
+    logger.info("Extracted %d characters from %s", total, url)
+    # Documents too long to hold are not memoised
+    if total and total <= ANALYSIS_CACHE_MAX_CHARS:
+        _memo["extraction"].put(url, "".join(kept))
+
 def debug_document_extraction(doc_urls):
     """
     Helper function to debug document extraction issues
@@ -1252,43 +1480,1550 @@ def debug_document_extraction(doc_urls):
 
     debug_document_extraction(doc_urls)
 
-def fix_analyze_ai_capabilities(texts):
+# Whitespace the normalised view replaces: runs, and single characters other than a space
+_WHITESPACE_RUN = re.compile(r'\s{2,}|[^\S ]')
+
+class FoldedText:
     """
-    Fixed version of analyze_ai_capabilities function to correctly calculate confidence levels
+    Casefolded, whitespace-collapsed view of a text, with offsets mapped
+    back to the original.
+    
+    Literal checks run against the view, which is built once per text, so
+    "Data\n\nBreach" reads as "data breach". The offset map only stores the
+    points where the view and the original stop lining up (whitespace runs
+    and characters that fold to several), so clean text needs no map.
     
     Args:
-        texts: Dictionary mapping document types to their text content
+        text: The original text
+    """
+    
+    def __init__(self, text: str):
+        self._view_breaks = [0]
+        self._text_breaks = [0]
+        pieces = []
+        length = 0
         
-    Returns:
-        Dictionary containing comprehensive analysis results
+        folded = text.casefold()
+        if len(folded) == len(text):
+            # Every character folds to one, so only whitespace runs move offsets
+            position = 0
+            for run in _WHITESPACE_RUN.finditer(folded):
+                pieces.append(folded[position:run.start()])
+                length += run.start() - position
+                if run.end() - run.start() > 1:
+                    self._add_break(length, run.start())
+                    self._add_break(length + 1, run.end())
+                pieces.append(" ")
+                length += 1
+                position = run.end()
+            pieces.append(folded[position:])
+        else:
+            # Fold character by character, noting the ones that grow
+            position = 0
+            while position < len(text):
+                run_end = position + 1
+                if text[position].isspace():
+                    while run_end < len(text) and text[run_end].isspace():
+                        run_end += 1
+                    piece = " "
+                else:
+                    piece = text[position].casefold()
+                if len(piece) != run_end - position:
+                    self._add_break(length, position)
+                    self._add_break(length + len(piece), run_end)
+                pieces.append(piece)
+                length += len(piece)
+                position = run_end
+        
+        self.text = "".join(pieces)
+    
+    def _add_break(self, view_offset: int, text_offset: int):
+        if (view_offset, text_offset) != (self._view_breaks[-1], self._text_breaks[-1]):
+            self._view_breaks.append(view_offset)
+            self._text_breaks.append(text_offset)
+    
+    def to_text(self, offset: int) -> int:
+        """Offset in the original text of a view offset"""
+        if len(self._view_breaks) == 1:
+            return offset
+        i = bisect_right(self._view_breaks, offset) - 1
+        text_offset = self._text_breaks[i] + offset - self._view_breaks[i]
+        if i + 1 < len(self._text_breaks):
+            # Inside a folded character: point at the character
+            text_offset = min(text_offset, self._text_breaks[i + 1] - 1)
+        return text_offset
+    
+    def to_view(self, offset: int, end: bool = False) -> int:
+        """
+        View offset of an offset in the original text. Inside a whitespace
+        run, a start maps to the run's space and an end to just after it.
+        """
+        if len(self._text_breaks) == 1:
+            return offset
+        i = bisect_right(self._text_breaks, offset) - 1
+        view_offset = self._view_breaks[i] + offset - self._text_breaks[i]
+        if i + 1 < len(self._view_breaks):
+            view_offset = min(view_offset, self._view_breaks[i + 1] - (0 if end else 1))
+        return view_offset
+    
+    def slice(self, start: int, end: int) -> str:
+        """The view of the original text between two offsets"""
+        if start >= end:
+            return ""
+        return self.text[self.to_view(start):self.to_view(end, end=True)]
+
+# Sentence boundaries: terminal punctuation followed by whitespace
+_SENTENCE_BOUNDARY = re.compile(r'[.!?]\s+')
+# Paragraph boundaries: one or more blank lines
+_PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+
+class SentenceIndex:
     """
-    import re
-    import logging
+    Sentence and paragraph boundary offsets for a single document.
     
-    # Configure logging if not already configured
-    if not logging.getLogger().hasHandlers():
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-    logger = logging.getLogger("ai_analysis")
+    Boundaries are computed once per document. Any character offset can then
+    be mapped to its enclosing sentence or paragraph by binary search, so
+    extracting a sentence only costs a slice of the original text.
     
-    # Debug information about input
-    doc_lengths = {doc_type: len(text) for doc_type, text in texts.items() if text}
-    logger.info(f"Analyzing {len(doc_lengths)} non-empty documents: {doc_lengths}")
+    A document that arrives in pieces is indexed incrementally with extend()
+    and discard_before() drops the boundaries that are no longer needed, so
+    sentence ids stay global while the index only covers a sliding window.
     
-    # For tracking which documents provided which insights
-    document_insights = {doc_type: [] for doc_type in texts.keys() if texts[doc_type]}
+    Args:
+        text: The document text to index, or its first piece
+        final: Whether text is the whole document
+    """
     
-    # Create analysis structure with expanded fields
-    analysis = {
-        # Opt-out information
-        "opt_out_available": False,
-        "enterprise_opt_out": False,
+    def __init__(self, text: str = "", final: bool = True):
+        self.length = 0
+        # A sentence ends just after its terminal punctuation and the next one
+        # starts after the whitespace that follows it
+        self._sentences = self._boundaries(_SENTENCE_BOUNDARY, lambda match: match.start() + 1)
+        self._paragraphs = self._boundaries(_PARAGRAPH_BOUNDARY, lambda match: match.start())
+        self.extend(text, 0, final)
+    
+    @staticmethod
+    def _boundaries(pattern, end_of):
+        # The last unit's end is open: it ends where the indexed text ends
+        return {"pattern": pattern, "end_of": end_of, "starts": [0], "ends": [],
+                "first": 0, "scanned": 0, "pending": False}
+    
+    @property
+    def sentence_starts(self) -> List[int]:
+        return self._sentences["starts"]
+    
+    @property
+    def sentence_ends(self) -> List[int]:
+        return self._sentences["ends"] + [self.length]
+    
+    @property
+    def paragraph_starts(self) -> List[int]:
+        return self._paragraphs["starts"]
+    
+    @property
+    def paragraph_ends(self) -> List[int]:
+        return self._paragraphs["ends"] + [self.length]
+    
+    def extend(self, text: str, offset: int = 0, final: bool = True):
+        """
+        Index the document received so far.
+        
+        Args:
+            text: The document from offset to the end of what has arrived;
+                it must include everything after the last call's text that
+                discard_before() has not released
+            offset: Document offset of text[0]
+            final: Whether text reaches the end of the document
+        """
+        self.length = offset + len(text)
+        for units in (self._sentences, self._paragraphs):
+            if units["pending"]:
+                # Reopen a boundary that touched the end of the last piece
+                units["starts"].pop()
+                units["ends"].pop()
+                units["pending"] = False
+            
+            for match in units["pattern"].finditer(text, units["scanned"] - offset):
+                units["ends"].append(offset + units["end_of"](match))
+                units["starts"].append(offset + match.end())
+                units["scanned"] = offset + match.end()
+                if match.end() == len(text) and not final:
+                    # More whitespace may follow: the end is known, the next start is not
+                    units["pending"] = True
+                    units["scanned"] = offset + match.start()
+                    break
+            else:
+                if not final:
+                    # A boundary can only start in the trailing whitespace
+                    units["scanned"] = max(units["scanned"], offset + len(text.rstrip()) - 1)
+    
+    def discard_before(self, offset: int):
+        """Forget the boundaries of units that end before an offset"""
+        for units in (self._sentences, self._paragraphs):
+            count = max(0, bisect_right(units["starts"], offset) - 1)
+            if count:
+                del units["starts"][:count]
+                del units["ends"][:count]
+                units["first"] += count
+    
+    def earliest_needed(self) -> int:
+        """Smallest offset a later extend() call still needs text from"""
+        return min(self._sentences["scanned"], self._paragraphs["scanned"])
+    
+    def _span(self, units, offset, lo, hi):
+        i = max(0, bisect_right(units["starts"], offset) - 1)
+        start = units["starts"][i]
+        end = units["ends"][i] if i < len(units["ends"]) else self.length
+        if hi is None:
+            hi = end
+        return max(start, lo), min(end, hi)
+    
+    def sentence_id(self, offset: int) -> int:
+        """Return the position of the sentence enclosing an offset"""
+        units = self._sentences
+        return units["first"] + max(0, bisect_right(units["starts"], offset) - 1)
+    
+    def sentence_span(self, offset: int, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Return the (start, end) offsets of the sentence enclosing an offset,
+        optionally clipped to the window [lo, hi).
+        """
+        return self._span(self._sentences, offset, lo, hi)
+    
+    def paragraph_span(self, offset: int, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Return the (start, end) offsets of the paragraph enclosing an offset,
+        optionally clipped to the window [lo, hi).
+        """
+        return self._span(self._paragraphs, offset, lo, hi)
+
+_WORD = re.compile(r'\w+')
+
+# How far a negation cue reaches: words, and characters (which must stay
+# within the context radius of the rules for streamed scans to agree)
+NEGATION_SCOPE_TOKENS = 8
+NEGATION_SCOPE_CHARS = 100
+
+class NegationIndex:
+    """
+    Negation scopes in a stretch of a document.
+    
+    A cue such as "not" or "never" negates the words after it, up to the end
+    of its clause; a trailing cue such as "prohibited" negates the words
+    before it, back to the start of its clause. Either way a scope reaches at
+    most max_tokens words and max_chars characters. Cues inside a
+    pseudo-negation ("not limited to") are ignored. The cues are found in one
+    pass and their scopes kept sorted, so whether a match is negated is a
+    binary search.
+    
+    Args:
+        text: The text to index
+        patterns: Compiled "negation", "negation_trailing", "negation_pseudo"
+            and "clause_break" patterns
+        offset: Document offset of text[0]
+        max_tokens: Most words a scope reaches
+        max_chars: Most characters a scope reaches
+    """
+    
+    def __init__(self, text: str, patterns: Dict[str, Any], offset: int = 0,
+                 max_tokens: int = NEGATION_SCOPE_TOKENS, max_chars: int = NEGATION_SCOPE_CHARS):
+        self.max_chars = max_chars
+        pseudo = [(match.start(), match.end()) for match in patterns["negation_pseudo"].finditer(text)]
+        pseudo_starts = [start for start, _ in pseudo]
+        
+        def in_pseudo(position):
+            i = bisect_right(pseudo_starts, position) - 1
+            return i >= 0 and position < pseudo[i][1]
+        
+        scopes = []
+        clause_break = patterns["clause_break"]
+        for match in patterns["negation"].finditer(text):
+            if in_pseudo(match.start()):
+                continue
+            # Forward: to the clause break or the last word in reach
+            window = text[match.end():match.end() + max_chars]
+            end = len(window)
+            found = clause_break.search(window)
+            if found:
+                end = found.start()
+            for count, word in enumerate(_WORD.finditer(window, 0, end), 1):
+                if count == max_tokens:
+                    end = word.end()
+                    break
+            scopes.append((offset + match.end(), offset + match.end() + end, offset + match.start(), offset + match.end()))
+        
+        for match in patterns["negation_trailing"].finditer(text):
+            if in_pseudo(match.start()):
+                continue
+            # Backward: from the last clause break or the first word in reach
+            window_start = max(0, match.start() - max_chars)
+            window = text[window_start:match.start()]
+            start = 0
+            for found in clause_break.finditer(window):
+                start = found.end()
+            words = [word.start() for word in _WORD.finditer(window, start)]
+            if len(words) > max_tokens:
+                start = words[-max_tokens]
+            scopes.append((offset + window_start + start, offset + match.start(), offset + match.start(), offset + match.end()))
+        
+        scopes.sort()
+        self._scopes = scopes
+        self._starts = [scope[0] for scope in scopes]
+    
+    def negation(self, offset: int) -> Optional[Tuple[int, int]]:
+        """Return the (start, end) of the cue whose scope covers an offset, or None"""
+        # No scope is longer than max_chars, so only those starting that
+        # close can reach the offset
+        first = bisect_left(self._starts, offset - self.max_chars)
+        last = bisect_right(self._starts, offset)
+        for scope_start, scope_end, cue_start, cue_end in reversed(self._scopes[first:last]):
+            if offset < scope_end:
+                return cue_start, cue_end
+        return None
+    
+    def is_negated(self, offset: int) -> bool:
+        """Whether an offset lies in a negation scope"""
+        return self.negation(offset) is not None
+
+# Default provider catalog shipped next to this module
+PROVIDER_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_providers.json")
+
+class ProviderCatalog:
+    """
+    Multi-literal matcher for AI provider names, model names and aliases.
+    
+    Every name is indexed by its first word, casefolded. Matching walks the
+    words of a text once and only compares the aliases that start with each
+    word, so the cost depends on the text length and not on the number of
+    providers in the catalog. Matches respect word boundaries and report the
+    canonical provider name.
+    
+    Args:
+        providers: List of {"name": canonical name, "aliases": [other names]}
+    """
+    
+    def __init__(self, providers: List[Dict[str, Any]]):
+        self.names = []
+        self._index: Dict[str, List[Tuple[str, str]]] = {}
+        
+        for provider in providers:
+            name = provider["name"]
+            if name in self.names:
+                continue
+            self.names.append(name)
+            for alias in [name] + list(provider.get("aliases", [])):
+                first_word = _WORD.match(alias)
+                if not first_word:
+                    continue
+                candidates = self._index.setdefault(first_word.group(0).casefold(), [])
+                if (alias.casefold(), name) not in candidates:
+                    candidates.append((alias.casefold(), name))
+        
+        self._order = {name: i for i, name in enumerate(self.names)}
+        # Identifies what the catalog matches, for caches of its results
+        self.fingerprint = hashlib.sha256(json.dumps([self.names, self._index], sort_keys=True).encode("utf-8")).hexdigest()
+    
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "ProviderCatalog":
+        """Load a catalog from a JSON file with a "providers" list"""
+        with open(path or PROVIDER_CATALOG_PATH, encoding="utf-8") as f:
+            return cls(json.load(f)["providers"])
+    
+    def finditer(self, text: str, pos: int = 0):
+        """
+        Yield (start, end, canonical name) for every provider mention in text,
+        starting with the word that contains pos.
+        """
+        while pos > 0 and _WORD.match(text, pos - 1):
+            pos -= 1
+        for word in _WORD.finditer(text, pos):
+            candidates = self._index.get(word.group(0).casefold())
+            if not candidates:
+                continue
+            start = word.start()
+            for alias, name in candidates:
+                end = start + len(alias)
+                if end > len(text) or text[start:end].casefold() != alias:
+                    continue
+                # The alias must end on a word boundary
+                if end < len(text) and alias[-1:].isalnum() and (text[end].isalnum() or text[end] == '_'):
+                    continue
+                yield start, end, name
+    
+    def find(self, text: str) -> List[str]:
+        """Return the canonical names mentioned in text, in catalog order"""
+        found = {name for _, _, name in self.finditer(text)}
+        return sorted(found, key=self._order.get)
+
+_provider_catalog = None
+
+def get_provider_catalog() -> ProviderCatalog:
+    """Return the shared provider catalog, loading it on first use"""
+    global _provider_catalog
+    if _provider_catalog is None:
+        _provider_catalog = ProviderCatalog.load()
+    return _provider_catalog
+
+def set_provider_catalog(catalog: Union[ProviderCatalog, str, None]):
+    """
+    Replace the shared provider catalog.
+    
+    Args:
+        catalog: A ProviderCatalog, a path to a catalog JSON file, or None to
+            reload the default catalog on next use
+    """
+    global _provider_catalog
+    if isinstance(catalog, str):
+        catalog = ProviderCatalog.load(catalog)
+    _provider_catalog = catalog
+
+# Default analysis rules shipped next to this module. A rule file names the
+# patterns once and lists, per view, the aspects that refer to them: the
+# document types each aspect runs over (all documents when "doc_types" is
+# null), its context window, its requirements and the handler that turns
+# qualifying matches into findings.
+ANALYSIS_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_rules.json")
+
+# Compiled plans are cached here, one file per rule set; set the variable to
+# an empty string to disable the cache
+PLAN_CACHE_DIR = os.environ.get("AI_REVIEW_PLAN_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ai_review"))
+
+# Bump when the compiled plan layout changes
+PLAN_FORMAT = 3
+
+# Values available to rule patterns as $NAME
+RULE_CONSTANTS = {"MAX_CAPTURE_CHARS": MAX_CAPTURE_CHARS}
+
+# Views built by analyze_documents when none are named
+ANALYSIS_VIEWS = ("full", "legacy")
+
+# Views built from another view's scan rather than aspects of their own
+_DERIVED_VIEWS = {"features": "full"}
+
+# Layout version of the document feature vectors
+FEATURE_FORMAT = 1
+
+# A match that passed its aspect's requirements, with its context window
+Hit = namedtuple("Hit", "start end match context_start context_end context")
+
+_ASPECT_HANDLERS = {}
+_ASPECT_COLLECTORS = {}
+
+def _aspect_handler(name: str, *patterns: str):
+    """Register an aspect handler and the named patterns it uses"""
+    def register(func):
+        _ASPECT_HANDLERS[name] = (func, patterns)
+        return func
+    return register
+
+def _aspect_collector(name: str):
+    """
+    Register the collector of a document-scoped handler. Collectors see each
+    match (or, for aspects without a pattern, each scanned stretch of text)
+    and keep what the handler needs in scan.state; the handler then runs
+    once the whole document has been scanned.
+    """
+    def register(func):
+        _ASPECT_COLLECTORS[name] = func
+        return func
+    return register
+
+# Patterns behind DocumentScan.negations
+_NEGATION_PATTERNS = ("negation", "negation_trailing", "negation_pseudo", "clause_break")
+
+def _is_negated(scan, rule, hit) -> bool:
+    """Whether a negatable aspect's match is negated"""
+    return hit is not None and rule.get("negatable", False) and scan.negations.is_negated(hit.start)
+
+def _flag_events(scan, rule, hit=None):
+    """Evidence, insight and flag findings shared by most aspects"""
+    if hit is not None and "evidence" in rule:
+        yield ("evidence", rule["evidence"], scan.prefix + hit.context.strip())
+    if "insight" in rule:
+        yield ("insight", rule["insight"])
+    if _is_negated(scan, rule, hit):
+        # "We do not train models on your data" is evidence, not a finding
+        return
+    for field, value in rule.get("sets", {}).items():
+        yield ("set", field, value)
+
+@_aspect_handler("flag", *_NEGATION_PATTERNS)
+def _flag_handler(scan, rule, hit=None):
+    yield from _flag_events(scan, rule, hit)
+
+@_aspect_handler("opt_out", "enterprise", "admin_controls", "granularity", *_NEGATION_PATTERNS)
+def _opt_out_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    if _is_negated(scan, rule, hit):
+        # "You cannot opt out" says nothing about how
+        return
+    context = hit.context
+    
+    # Check for enterprise-level controls
+    if scan.plan.patterns["enterprise"].search(context):
+        yield ("evidence", "enterprise", scan.prefix + context.strip())
+        yield ("set", "enterprise_opt_out", True)
+    
+    # Look for opt-out method
+    context_folded = scan.folded(hit.context_start, hit.context_end)
+    if scan.plan.patterns["admin_controls"].search(context):
+        yield ("set", "opt_out_method", "admin_console")
+    elif "api" in context_folded:
+        yield ("set", "opt_out_method", "api")
+    elif "contact" in context_folded or "request" in context_folded:
+        yield ("set", "opt_out_method", "contact_vendor")
+    
+    # Check granularity
+    granularity_match = scan.plan.patterns["granularity"].search(context)
+    if granularity_match:
+        granularity_text = granularity_match.group(0).lower()
+        if "user" in granularity_text:
+            yield ("set", "opt_out_granularity", "user_level")
+        elif "feature" in granularity_text:
+            yield ("set", "opt_out_granularity", "feature_level")
+        elif "organization" in granularity_text or "tenant" in granularity_text:
+            yield ("set", "opt_out_granularity", "organization_level")
+
+_FEATURE_SEPARATOR = re.compile(r',|\band\b')
+
+@_aspect_handler("features")
+def _features_handler(scan, rule, hit):
+    features_text = hit.match.group(rule["group"]).strip()
+    for feature in _FEATURE_SEPARATOR.split(features_text):
+        feature = feature.strip()
+        if feature and len(feature) > 3:
+            yield ("add", rule["field"], feature, rule.get("insight"))
+
+@_aspect_handler("collect")
+def _collect_handler(scan, rule, hit):
+    yield ("add", rule["field"], hit.match.group(rule["group"]), rule.get("insight"))
+
+@_aspect_handler("third_party")
+def _third_party_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    
+    # Try to identify specific providers
+    providers = scan.provider_catalog.find(hit.context)
+    for provider in providers:
+        yield ("add", "third_party_providers", provider, None)
+    if providers:
+        yield ("set", "native_ai", False)
+
+@_aspect_handler("retention_period", "period")
+def _retention_period_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    
+    # Look for retention period
+    period_match = scan.plan.patterns["period"].search(hit.context)
+    if period_match:
+        # Get 10 chars before and after the period mention,
+        # without crossing into a neighbouring sentence
+        period_offset = hit.context_start + period_match.start()
+        sentence_start, sentence_end = scan.sentences.sentence_span(period_offset, hit.context_start, hit.context_end)
+        period_start = max(sentence_start, period_offset - 10)
+        period_end = min(sentence_end, hit.context_start + period_match.end() + 10)
+        yield ("set", "retention_period", scan.slice(period_start, period_end).strip())
+
+@_aspect_handler("model_sharing", *_NEGATION_PATTERNS)
+def _model_sharing_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    
+    # Check whether the sharing term is in a negation's scope
+    negation = scan.negations.negation(hit.start)
+    if negation:
+        yield ("set", "model_sharing", False)
+        # Extract limitations on sharing from the negated sentence
+        negation_offset, negation_end = negation
+        sentence_start, sentence_end = scan.sentences.sentence_span(negation_offset, hit.context_start, hit.context_end)
+        limit_start = max(sentence_start, negation_offset - 20)
+        limit_end = min(sentence_end, negation_end + 50)
+        yield ("set", "model_sharing_limitations", scan.slice(limit_start, limit_end).strip())
+    else:
+        yield ("set", "model_sharing", True)
+
+@_aspect_handler("contractual", "third_party_generic")
+def _contractual_handler(scan, rule, hit):
+    # Whether a provider found so far is mentioned is only known once the
+    # earlier documents are merged, so the findings are made conditional
+    mentioned = scan.provider_catalog.find(hit.context)
+    generic = scan.plan.patterns["third_party_generic"].search(hit.context) is not None
+    
+    # Use the sentence containing the contractual term as the details
+    sentence_start, sentence_end = scan.sentences.sentence_span(hit.start, hit.context_start, hit.context_end)
+    findings = list(_flag_events(scan, rule, hit))
+    findings.append(("set_default", "contractual_details", scan.slice(sentence_start, sentence_end).strip()))
+    yield ("if_providers", mentioned, generic, findings)
+
+@_aspect_handler("compliance", "compliant")
+def _compliance_handler(scan, rule):
+    yield ("insight", rule["insight"])
+    if scan.found("compliant"):
+        for field, value in rule["sets"].items():
+            yield ("set", field, value)
+
+@_aspect_handler("security_measures")
+def _security_measures_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    
+    context_folded = scan.folded(hit.context_start, hit.context_end)
+    for measure in rule["measures"]:
+        if measure.casefold() in context_folded:
+            yield ("add", "security_measures", measure, None)
+
+@_aspect_handler("ethical")
+def _ethical_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    
+    # Extract the sentence containing the ethical consideration,
+    # once per sentence even when it holds several ethical terms
+    seen_sentences = scan.state.setdefault(rule["key"], set())
+    sentence_id = scan.sentences.sentence_id(hit.start)
+    if sentence_id in seen_sentences:
+        return
+    seen_sentences.add(sentence_id)
+    
+    sentence_start, sentence_end = scan.sentences.sentence_span(hit.start, hit.context_start, hit.context_end)
+    yield ("add", "ethical_considerations", scan.slice(sentence_start, sentence_end).strip(), None)
+
+@_aspect_handler("legacy_opt_out", "legacy_enterprise")
+def _legacy_opt_out_handler(scan, rule, hit):
+    yield from _flag_events(scan, rule, hit)
+    if scan.plan.patterns["legacy_enterprise"].search(hit.context):
+        yield ("set", "enterprise_opt_out", True)
+
+@_aspect_handler("legacy_providers")
+def _legacy_providers_handler(scan, rule, hit):
+    context_folded = scan.folded(hit.context_start, hit.context_end)
+    for provider in rule["providers"]:
+        if provider.casefold() in context_folded:
+            yield ("add", "third_party_providers", provider, None)
+
+@_aspect_handler("if_providers")
+def _if_providers_handler(scan, rule):
+    yield ("if_providers", [], True, list(_flag_events(scan, rule)))
+
+@_aspect_collector("legacy_sharing")
+def _legacy_sharing_collector(scan, rule, hit):
+    if "not" in scan.folded(hit.context_start, hit.context_end):
+        scan.state[rule["key"]] = True
+
+@_aspect_handler("legacy_sharing")
+def _legacy_sharing_handler(scan, rule):
+    yield ("set", "model_sharing", not scan.state.get(rule["key"], False))
+
+@_aspect_collector("legacy_contractual")
+def _legacy_contractual_collector(scan, rule, hit):
+    mentioned = scan.state.setdefault(rule["key"], [])
+    context_folded = scan.folded(hit.context_start, hit.context_end)
+    for provider in rule["providers"]:
+        if provider.casefold() in context_folded and provider not in mentioned:
+            mentioned.append(provider)
+
+@_aspect_handler("legacy_contractual")
+def _legacy_contractual_handler(scan, rule):
+    mentioned = scan.state.get(rule["key"], [])
+    if mentioned:
+        yield ("if_providers", mentioned, False, list(_flag_events(scan, rule)))
+
+@_aspect_collector("keyword_concerns")
+def _keyword_concerns_collector(scan, rule, hit=None):
+    # Keep the context of each keyword's first occurrence
+    first_seen = scan.state.setdefault(rule["key"], {})
+    resume = scan.state.setdefault(rule["key"] + ".resume", {})
+    chars_before, chars_after = rule["context"]
+    for keyword in rule["keywords"]:
+        if keyword in first_seen:
+            continue
+        start_idx, end_idx = scan.find_folded(keyword.casefold(), resume.get(keyword, 0))
+        if start_idx == -1:
+            resume[keyword] = max(resume.get(keyword, 0), scan.limit)
+            continue
+        if not scan.final and (start_idx >= scan.limit or end_idx + chars_after >= scan.end):
+            # Look again once more text has arrived
+            resume[keyword] = start_idx
+            scan.hold(start_idx)
+            continue
+        start = max(0, start_idx - chars_before)
+        end = min(scan.end, end_idx + chars_after)
+        first_seen[keyword] = scan.slice(start, end)
+
+@_aspect_handler("keyword_concerns")
+def _keyword_concerns_handler(scan, rule):
+    first_seen = scan.state.get(rule["key"], {})
+    for keyword in rule["keywords"]:
+        if keyword in first_seen:
+            yield ("append", "concerns", f"Potential concern: {first_seen[keyword]}")
+
+def load_analysis_rules(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Load an analysis rule set from a JSON or YAML file.
+    
+    Args:
+        path: Rule file path (defaults to ANALYSIS_RULES_PATH). Files ending in
+            .yaml or .yml are read with PyYAML.
+    
+    Returns:
+        The rule set as a dictionary
+    """
+    path = path or ANALYSIS_RULES_PATH
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("YAML rule files require the pyyaml package")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def rules_hash(rules: Dict[str, Any]) -> str:
+    """Return the cache key of a rule set: a hash of its canonical JSON form"""
+    canonical = json.dumps({"format": PLAN_FORMAT, "constants": RULE_CONSTANTS, "rules": rules},
+                           sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def compile_rules(rules: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a rule set and normalise it into a compiled plan.
+    
+    The compiled plan has its pattern constants expanded, requirements parsed
+    and aspects indexed by view and document type. It is plain JSON, so it
+    can be cached on disk by rules_hash().
+    
+    Args:
+        rules: Rule set in the analysis_rules.json format
+    
+    Returns:
+        The compiled plan as a dictionary
+    """
+    for key in ("version", "ai_terms", "summary_terms", "patterns", "evidence_keys", "priority_map", "views"):
+        if key not in rules:
+            raise ValueError(f"Analysis rules are missing {key!r}")
+    
+    patterns = {name: Template(pattern).safe_substitute(RULE_CONSTANTS)
+                for name, pattern in rules["patterns"].items()}
+    
+    def requirement(where, spec):
+        # "ai" needs an AI term in the context, "literal:<text>" the text in any
+        # case and "pattern:<name>" a named pattern; a list needs any
+        if isinstance(spec, list):
+            members = [requirement(where, member) for member in spec]
+            return {"kind": "any", "label": " or ".join(m["label"] for m in members), "of": members}
+        if spec == "ai":
+            return {"kind": "ai", "label": spec}
+        if isinstance(spec, str) and spec.startswith("literal:"):
+            return {"kind": "literal", "label": spec, "text": spec[len("literal:"):]}
+        if isinstance(spec, str) and spec.startswith("pattern:"):
+            name = spec[len("pattern:"):]
+            if name not in patterns:
+                raise ValueError(f"{where}: unknown pattern {name!r}")
+            return {"kind": "pattern", "label": spec, "name": name}
+        raise ValueError(f"{where}: unknown requirement {spec!r}")
+    
+    # The literal text of each AI term and whether it needs a word boundary
+    # on the left and right, for the pre-filter; None if any term is a
+    # pattern with no literal form
+    ai_literals = []
+    for term in rules["ai_terms"]:
+        core = term[2 if term.startswith(r"\b") else 0:len(term) - 2 if term.endswith(r"\b") else None]
+        if not re.fullmatch(r"[\w' -]+", core):
+            ai_literals = None
+            break
+        ai_literals.append([core.casefold(), term.startswith(r"\b"), term.endswith(r"\b")])
+    
+    views = {}
+    aspect_index = {}
+    for view, aspects in rules["views"].items():
+        compiled_aspects = []
+        for aspect in aspects:
+            where = f"{view} aspect {aspect.get('name')!r}"
+            if aspect.get("handler") not in _ASPECT_HANDLERS:
+                raise ValueError(f"{where}: unknown handler {aspect.get('handler')!r}")
+            _, handler_patterns = _ASPECT_HANDLERS[aspect["handler"]]
+            for name in (aspect.get("pattern"),) + handler_patterns:
+                if name is not None and name not in patterns:
+                    raise ValueError(f"{where}: unknown pattern {name!r}")
+            if aspect.get("evidence") is not None and aspect["evidence"] not in rules["evidence_keys"]:
+                raise ValueError(f"{where}: unknown evidence key {aspect['evidence']!r}")
+            if aspect.get("scope", "match") == "match" and aspect.get("pattern") is None:
+                raise ValueError(f"{where}: match-scoped aspects need a pattern")
+            saturation = aspect.get("saturation")
+            if saturation is not None:
+                for key in saturation.get("evidence", []):
+                    if key not in rules["evidence_keys"]:
+                        raise ValueError(f"{where}: unknown saturation evidence key {key!r}")
+                if not saturation.get("evidence") or not 0 < saturation.get("confidence", 1.0) <= 1:
+                    raise ValueError(f"{where}: saturation needs evidence keys and a confidence in (0, 1]")
+            
+            compiled = dict(aspect)
+            compiled["key"] = f"{view}.{aspect['name']}"
+            compiled["requires"] = [requirement(where, spec) for spec in aspect.get("requires", [])]
+            if saturation is not None:
+                compiled["saturation"] = {"evidence": list(saturation["evidence"]),
+                                          "confidence": saturation.get("confidence", 1.0)}
+            compiled_aspects.append(compiled)
+        views[view] = compiled_aspects
+        
+        # Aspect positions per document type, in rule order; "*" holds the
+        # aspects that run on every document
+        doc_types = {doc_type for aspect in aspects for doc_type in aspect.get("doc_types") or []}
+        index = {"*": [i for i, aspect in enumerate(aspects) if aspect.get("doc_types") is None]}
+        for doc_type in sorted(doc_types):
+            index[doc_type] = [i for i, aspect in enumerate(aspects)
+                               if aspect.get("doc_types") is None or doc_type in aspect["doc_types"]]
+        aspect_index[view] = index
+    
+    return {
+        "format": PLAN_FORMAT,
+        "rule_hash": rules_hash(rules),
+        "version": rules["version"],
+        "patterns": patterns,
+        # One alternation finds any AI term in a single search
+        "ai_pattern": "|".join(f"(?:{term})" for term in rules["ai_terms"]),
+        "ai_literals": ai_literals,
+        "summary_terms": rules["summary_terms"],
+        "evidence_keys": rules["evidence_keys"],
+        "priority_map": rules["priority_map"],
+        "views": views,
+        "aspect_index": aspect_index,
+        # Streamed documents keep this much text around each match
+        "overlap": max([1] + [radius for aspects in views.values() for aspect in aspects
+                              for radius in aspect.get("context", ())])
+    }
+
+class ExecutionPlan:
+    """
+    A compiled rule set ready to run.
+    
+    Holds the compiled plan's patterns compiled with the configured regex
+    backend and its requirements resolved to checks, so the per-document scan
+    only runs the matching and the handlers.
+    
+    Args:
+        compiled: Compiled plan from compile_rules()
+    """
+    
+    def __init__(self, compiled: Dict[str, Any]):
+        self.compiled = compiled
+        self.version = compiled["version"]
+        self.rule_hash = compiled["rule_hash"]
+        self.summary_terms = compiled["summary_terms"]
+        self.evidence_keys = compiled["evidence_keys"]
+        self.priority_map = compiled["priority_map"]
+        self.overlap = compiled["overlap"]
+        self.patterns = {name: compile_pattern(pattern) for name, pattern in compiled["patterns"].items()}
+        self.ai_pattern = compile_pattern(compiled["ai_pattern"])
+        self.ai_literals = compiled["ai_literals"]
+        self.longest_ai_literal = max((len(literal) for literal, _, _ in self.ai_literals or ()), default=0)
+        
+        self.views = {}
+        for view, aspects in compiled["views"].items():
+            self.views[view] = [dict(aspect, requires=[(spec["label"], self._check(spec)) for spec in aspect["requires"]],
+                                     skip_without_ai=self._skips_without_ai(aspect))
+                                for aspect in aspects]
+        self._aspect_index = compiled["aspect_index"]
+    
+    @classmethod
+    def from_rules(cls, rules: Dict[str, Any], cache_dir: Optional[str] = None) -> "ExecutionPlan":
+        """
+        Compile a rule set, reusing a compiled plan cached under its hash.
+        
+        Python's re module has no serialisable compiled form, so the cache
+        holds the normalised plan and patterns are compiled when it is loaded.
+        
+        Args:
+            rules: Rule set in the analysis_rules.json format
+            cache_dir: Plan cache directory (defaults to PLAN_CACHE_DIR, an
+                empty string disables the cache)
+        """
+        if cache_dir is None:
+            cache_dir = PLAN_CACHE_DIR
+        if not cache_dir:
+            return cls(compile_rules(rules))
+        
+        key = rules_hash(rules)
+        cache_path = os.path.join(cache_dir, f"plan-{key}.json")
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                compiled = json.load(f)
+            if compiled.get("format") == PLAN_FORMAT and compiled.get("rule_hash") == key:
+                return cls(compiled)
+        except (OSError, ValueError):
+            pass
+        
+        compiled = compile_rules(rules)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write then rename so concurrent processes never read a partial plan
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(compiled, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug("Could not cache compiled plan in %s: %s", cache_dir, e)
+        return cls(compiled)
+    
+    def _skips_without_ai(self, aspect: Dict[str, Any]) -> bool:
+        """
+        Whether an aspect can be skipped on a document with no AI terms: every
+        match needs an AI term in its context, and the context is wider than
+        any term, so a word merely containing one (like "ai" in "email")
+        cannot be cut out of it by the window edges.
+        """
+        if self.ai_literals is None or "context" not in aspect:
+            return False
+        return (any(spec["kind"] == "ai" for spec in aspect["requires"])
+                and sum(aspect["context"]) > self.longest_ai_literal)
+    
+    def _check(self, spec: Dict[str, Any]):
+        """Resolve a compiled requirement to a check(scan, hit) callable"""
+        kind = spec["kind"]
+        if kind == "any":
+            checks = [self._check(member) for member in spec["of"]]
+            return lambda scan, hit: any(check(scan, hit) for check in checks)
+        if kind == "ai":
+            return lambda scan, hit: scan.is_ai_related(hit.context_start, hit.context_end)
+        if kind == "literal":
+            literal = spec["text"].casefold()
+            return lambda scan, hit: literal in scan.folded(hit.context_start, hit.context_end)
+        pattern = self.patterns[spec["name"]]
+        return lambda scan, hit: pattern.search(hit.context) is not None
+    
+    def aspects(self, view: str, doc_type: str) -> List[Dict[str, Any]]:
+        """Return the aspects of a view that apply to a document type, in order"""
+        index = self._aspect_index[view]
+        positions = index.get(doc_type, index["*"])
+        return [self.views[view][i] for i in positions]
+
+_analysis_rules = None
+_execution_plan = None
+
+def get_execution_plan() -> ExecutionPlan:
+    """Return the shared execution plan, compiling the rules on first use"""
+    global _execution_plan
+    if _execution_plan is None:
+        rules = _analysis_rules if _analysis_rules is not None else load_analysis_rules()
+        _execution_plan = ExecutionPlan.from_rules(rules)
+    return _execution_plan
+
+def set_analysis_rules(rules: Union[Dict[str, Any], str, None]):
+    """
+    Replace the shared analysis rules.
+    
+    Args:
+        rules: A rule set dictionary, a path to a JSON or YAML rule file, or
+            None to use the default rules on next use
+    """
+    global _analysis_rules, _execution_plan
+    if isinstance(rules, str):
+        rules = load_analysis_rules(rules)
+    _analysis_rules = rules
+    _execution_plan = None
+
+_ASCII_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_")
+
+class DocumentScan:
+    """
+    Per-document state shared by every aspect and view.
+    
+    The scan holds a window of the document rather than all of it. Text
+    arrives through feed(), and each round processes the matches that start
+    before `limit`, far enough from the end of the text received so far for
+    their context windows to be complete; later matches wait for the next
+    round. compact() then releases the text no pending match can reach. A
+    document passed as one string is scanned in a single final round.
+    
+    Offsets are document offsets throughout; slice() maps them into the window.
+    
+    Args:
+        plan: The ExecutionPlan being run
+        doc_type: Document type of the text
+        provider_catalog: ProviderCatalog for third-party provider mentions
+    """
+    
+    def __init__(self, plan: ExecutionPlan, doc_type: str, provider_catalog: ProviderCatalog):
+        self.plan = plan
+        self.doc_type = doc_type
+        self.prefix = f"[{doc_type}] "
+        self.provider_catalog = provider_catalog
+        self.buffer = ""
+        self.view = FoldedText("")
+        self.base = 0
+        self.end = 0
+        self.final = False
+        self.round_start = 0
+        self.limit = 0
+        self.deadline = None
+        self.state = {}
+        self.sentences = SentenceIndex("", final=False)
+        self._cursors = {}
+        self._found = set()
+        self._holds = []
+        self._ai_related = {}
+        self._ai_mentions = None
+        self._ai_mention_starts = []
+        self._negations = None
+    
+    def feed(self, chunk: str, final: bool = False) -> bool:
+        """
+        Add text to the window. Returns whether a round should run now: at
+        the end of the document, or once a full overlap of new text is ready.
+        """
+        self.buffer += chunk
+        self.end = self.base + len(self.buffer)
+        self.final = final
+        limit = self.end if final else self.end - self.plan.overlap
+        if not final and limit - self.round_start < self.plan.overlap:
+            return False
+        
+        self.limit = limit
+        self.view = FoldedText(self.buffer)
+        self.sentences.extend(self.buffer, self.base, final)
+        self._holds = []
+        self._ai_related = {}
+        self._negations = None
+        self._find_ai_mentions()
+        return True
+    
+    def _find_ai_mentions(self):
+        """
+        Pre-filter for AI terms: find every occurrence of their literal text
+        in the normalised window, noting whether each has the word boundaries
+        its term needs. A context without an occurrence cannot match an AI
+        term, so it is rejected without running the AI pattern.
+        """
+        self._ai_mentions = None
+        self._ai_mention_starts = []
+        if self.plan.ai_literals is None:
+            return
+        # Dotless i folds to itself but matches "i" case-insensitively
+        folded = self.view.text.replace("ı", "i")
+        
+        # Occurrences inside a longer word (such as "ai" in "email") can only
+        # match a window no wider than themselves, so they are left out
+        text = self.buffer
+        mentions = []
+        for literal, left, right in self.plan.ai_literals:
+            at = folded.find(literal)
+            while at != -1:
+                start = self.view.to_text(at)
+                end = self.view.to_text(at + len(literal))
+                # The window edges may be word boundaries; RE2 only treats
+                # ASCII characters as word characters, so others may be too
+                left_ok = not left or start == 0 or text[start - 1] not in _ASCII_WORD_CHARS
+                right_ok = not right or end == len(text) or text[end] not in _ASCII_WORD_CHARS
+                if left_ok or right_ok:
+                    mentions.append((self.base + start, self.base + end, left_ok, right_ok))
+                at = folded.find(literal, at + 1)
+        mentions.sort()
+        self._ai_mentions = mentions
+        self._ai_mention_starts = [mention[0] for mention in mentions]
+    
+    @property
+    def negations(self) -> NegationIndex:
+        """Negation scopes of the window, indexed on first use in a round"""
+        if self._negations is None:
+            self._negations = NegationIndex(self.buffer, self.plan.patterns, self.base)
+        return self._negations
+    
+    def ai_mention_count(self) -> int:
+        """Number of AI term occurrences starting in this round"""
+        stop = self.limit - self.base
+        if self._ai_mentions is None:
+            count = 0
+            for match in self.plan.ai_pattern.finditer(self.buffer, self.round_start - self.base):
+                if match.start() >= stop:
+                    break
+                count += 1
+            return count
+        first = bisect_left(self._ai_mention_starts, self.round_start)
+        last = bisect_left(self._ai_mention_starts, self.limit)
+        return sum(1 for _, _, left, right in self._ai_mentions[first:last] if left and right)
+    
+    @property
+    def ai_free(self) -> bool:
+        """
+        Whether the document, seen whole in this round, has no AI term that
+        a context window wider than the longest term could match
+        """
+        return self.final and self.base == 0 and self.round_start == 0 and self._ai_mentions == []
+    
+    def compact(self):
+        """Finish a round and drop the text that later rounds cannot reach"""
+        self.round_start = self.limit
+        if self.final:
+            return
+        keep_from = min(self._holds + [self.limit, self.sentences.earliest_needed()])
+        # Context windows and word-boundary checks look back from there
+        keep_from = max(self.base, keep_from - self.plan.overlap - 1)
+        self.buffer = self.buffer[keep_from - self.base:]
+        self.base = keep_from
+        self.sentences.discard_before(keep_from)
+    
+    def slice(self, start: int, end: int) -> str:
+        """Document text between two offsets"""
+        return self.buffer[start - self.base:end - self.base]
+    
+    def folded(self, start: int, end: int) -> str:
+        """Casefolded, whitespace-collapsed document text between two offsets"""
+        return self.view.slice(start - self.base, end - self.base)
+    
+    def find_folded(self, literal: str, start: int = 0) -> Tuple[int, int]:
+        """
+        Document span of the first occurrence of a casefolded literal in the
+        normalised text from an offset on, or (-1, -1)
+        """
+        found = self.view.text.find(literal, self.view.to_view(max(0, start - self.base)))
+        if found == -1:
+            return -1, -1
+        return self.base + self.view.to_text(found), self.base + self.view.to_text(found + len(literal))
+    
+    def hold(self, offset: int):
+        """Keep the window from an offset until the next round"""
+        self._holds.append(offset)
+    
+    def _complete(self, start: int, reach: int) -> bool:
+        # A match is processed once it starts before the round limit and the
+        # text it needs has fully arrived
+        return self.final or (start < self.limit and reach < self.end)
+    
+    def found(self, name: str) -> bool:
+        """Whether a named pattern has been found in the document so far"""
+        return name in self._found
+    
+    def mark_found(self, name: str):
+        """Record that a named pattern occurs in the document"""
+        self._found.add(name)
+    
+    def track(self, name: str):
+        """Look for the first occurrence of a named pattern"""
+        if name in self._found:
+            return
+        cursor = self._cursors.get(name, 0)
+        match = self.plan.patterns[name].search(self.buffer, max(0, cursor - self.base))
+        if match and self._complete(match.start() + self.base, match.end() + self.base):
+            self._found.add(name)
+            return
+        cursor = match.start() + self.base if match else max(cursor, self.limit)
+        self._cursors[name] = cursor
+        self.hold(cursor)
+    
+    def context_span(self, match_start: int, match_end: int, chars_before: int = 100, chars_after: int = 100) -> Tuple[int, int]:
+        # Every per-match step passes through here, so enforce the budget too
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise AnalysisTimeout()
+        start = max(0, match_start - chars_before)
+        end = min(self.end, match_end + chars_after)
+        return start, end
+    
+    def is_ai_related(self, start: int, end: int) -> bool:
+        """Whether the text between two offsets mentions an AI term"""
+        if (start, end) not in self._ai_related:
+            related = True
+            if self._ai_mentions is not None and end - start > self.plan.longest_ai_literal:
+                # Only occurrences inside the window, with their boundaries
+                # or cut off at its edges, can match
+                first = bisect_left(self._ai_mention_starts, start)
+                last = bisect_left(self._ai_mention_starts, end)
+                related = any(mention_end <= end and (left or mention_start == start) and (right or mention_end == end)
+                              for mention_start, mention_end, left, right in self._ai_mentions[first:last])
+            if related:
+                related = self.plan.ai_pattern.search(self.slice(start, end)) is not None
+            self._ai_related[(start, end)] = related
+        return self._ai_related[(start, end)]
+    
+    def triggers(self, aspect: Dict[str, Any], chars_after: int = 0) -> List[Tuple[int, int, Any]]:
+        """
+        (start, end, match) for this round's occurrences of an aspect's
+        pattern, plus provider catalog mentions (with no match object) for
+        catalog aspects, in document order.
+        """
+        cursor = self._cursors.setdefault(aspect["key"], {"regex": 0, "catalog": 0})
+        spans = {}
+        cut = None
+        
+        last_end = cursor["regex"]
+        for match in self.plan.patterns[aspect["pattern"]].finditer(self.buffer, max(0, cursor["regex"] - self.base)):
+            start, end = match.start() + self.base, match.end() + self.base
+            if not self._complete(start, end + chars_after):
+                cut = start
+                break
+            spans[start] = (end, match)
+            last_end = end
+        
+        if aspect.get("catalog"):
+            for start, end, _ in self.provider_catalog.finditer(self.buffer, max(0, cursor["catalog"] - self.base)):
+                start, end = start + self.base, end + self.base
+                if start < cursor["catalog"]:
+                    continue
+                if cut is not None and start >= cut:
+                    break
+                if not self._complete(start, end + chars_after):
+                    cut = start
+                    break
+                spans.setdefault(start, (end, None))
+        
+        if cut is None:
+            cut = self.limit
+        else:
+            spans = {start: span for start, span in spans.items() if start < cut}
+            last_end = max([cursor["regex"]] + [end for end, match in spans.values() if match is not None])
+        cursor["regex"] = max(last_end, cut)
+        cursor["catalog"] = cut
+        self.hold(min(cursor["regex"], cursor["catalog"]))
+        
+        return [(start,) + spans[start] for start in sorted(spans)]
+
+def _evidence_confidence(evidence_count: int, doc_count: int) -> float:
+    """Confidence from the number of evidence items and the document types they came from"""
+    # More evidence and more document types = higher confidence
+    return min(1.0, (0.3 * evidence_count + 0.7 * doc_count) / 3)
+
+def count_confidence(counts: Dict[str, int], formula=_evidence_confidence) -> Optional[float]:
+    """
+    Confidence of one evidence key from its per-document-type counts.
+    
+    Args:
+        counts: Row of an evidence count matrix, mapping document types to
+            the number of evidence items found in them (None for items of
+            unknown type)
+        formula: Function of (evidence count, document type count)
+    
+    Returns:
+        The confidence, or None if there is no evidence
+    """
+    evidence_count = sum(counts.values())
+    return formula(evidence_count, len(counts) - (None in counts)) if evidence_count else None
+
+class TriageState:
+    """
+    Saturation state of a triage analysis, shared by all of its documents.
+    
+    Aspects with a "saturation" rule name the evidence keys that decide them.
+    Evidence is counted per key along with the document types it came from,
+    as the confidence levels are. Once every named key has reached the rule's
+    confidence, the aspect's flags are set and its confidence can't grow, so
+    it is not scanned any further, in this document or the ones after it.
+    
+    Args:
+        deadline: time.monotonic() value at which every scan stops (None for
+            no global limit)
+    """
+    
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.evidence_counts = {}
+        self.decided = {}
+    
+    def expired(self) -> bool:
+        """Whether the global time budget has been spent"""
+        return self.deadline is not None and time.monotonic() > self.deadline
+    
+    def confidence(self, key: str) -> float:
+        """Confidence reached so far by an evidence key"""
+        return count_confidence(self.evidence_counts.get(key, {})) or 0.0
+    
+    def record(self, aspect: Dict[str, Any], doc_type: str, events) -> bool:
+        """
+        Count the evidence of one hit of a saturating aspect.
+        
+        Args:
+            aspect: The compiled aspect, with a "saturation" rule
+            doc_type: Document type the hit was found in
+            events: The hit's findings
+        
+        Returns:
+            True if this hit decided the aspect
+        """
+        for event in events:
+            if event[0] == "evidence":
+                counts = self.evidence_counts.setdefault(event[1], {})
+                counts[doc_type] = counts.get(doc_type, 0) + 1
+        
+        saturation = aspect["saturation"]
+        if all(self.confidence(key) >= saturation["confidence"] for key in saturation["evidence"]):
+            self.decided[aspect["key"]] = doc_type
+            return True
+        return False
+    
+    def decided_in(self, view: str) -> Dict[str, str]:
+        """Aspects of a view decided early, with the document that decided them"""
+        prefix = f"{view}."
+        return {key[len(prefix):]: doc_type for key, doc_type in self.decided.items() if key.startswith(prefix)}
+
+def _count_features(scan: DocumentScan, aspect: Dict[str, Any], triggers, counters: Dict[str, Any]):
+    """Count an aspect's matches, those near an AI term and those negated"""
+    chars_before, chars_after = aspect.get("context", (0, 0))
+    counts = counters["aspects"].setdefault(aspect["name"], [0, 0, 0])
+    counts[0] += len(triggers)
+    for start, end, _ in triggers:
+        context_start, context_end = scan.context_span(start, end, chars_before, chars_after)
+        if scan.is_ai_related(context_start, context_end):
+            counts[1] += 1
+        if scan.negations.is_negated(start):
+            counts[2] += 1
+
+def _scan_round(scan: DocumentScan, view: str, run: Dict[str, Any], partial: Dict[str, Any], debug: bool,
+                triage: Optional[TriageState] = None, counters: Optional[Dict[str, Any]] = None):
+    """Run one view's aspects over the part of the document ready this round"""
+    logger = analysis_logger
+    
+    for i, aspect in enumerate(scan.plan.aspects(view, scan.doc_type)):
+        events = run["events"][i]
+        handler, handler_patterns = _ASPECT_HANDLERS[aspect["handler"]]
+        chars_before, chars_after = aspect.get("context", (0, 0))
+        
+        if aspect.get("scope") == "document":
+            # Document-scoped aspects only collect here and run at the end
+            for name in handler_patterns:
+                scan.track(name)
+            collector = _ASPECT_COLLECTORS.get(aspect["handler"])
+            if aspect["pattern"] is None:
+                if collector is not None:
+                    collector(scan, aspect)
+            elif collector is None:
+                scan.track(aspect["pattern"])
+            else:
+                for start, end, match in scan.triggers(aspect, chars_after):
+                    scan.mark_found(aspect["pattern"])
+                    context_start, context_end = scan.context_span(start, end, chars_before, chars_after)
+                    collector(scan, aspect, Hit(start, end, match, context_start, context_end,
+                                                scan.slice(context_start, context_end)))
+            continue
+        
+        if triage is not None and aspect["key"] in triage.decided:
+            # Decided earlier in the triage; more matches can't change it
+            continue
+        
+        if aspect["skip_without_ai"] and scan.ai_free and counters is None:
+            # No match could pass the AI requirement, so skip the pattern scan
+            if debug:
+                logger.debug("Skipping %s in %s: no AI terms in the document", aspect["name"], scan.doc_type)
+            continue
+        
+        triggers = scan.triggers(aspect, chars_after)
+        if counters is not None:
+            _count_features(scan, aspect, triggers, counters)
+            if aspect["skip_without_ai"] and scan.ai_free:
+                # Counted, but no match could pass the AI requirement
+                continue
+        # Evidence-backed aspects report their match counts
+        if "evidence" in aspect:
+            partial["match_counts"][aspect["name"]] = partial["match_counts"].get(aspect["name"], 0) + len(triggers)
+            if debug:
+                label = aspect["name"].replace("_", "-").capitalize()
+                locations = partial["locations"].setdefault(aspect["name"], [])
+                for start, end, _ in triggers[:max(0, 3 - len(locations))]:
+                    context_start, context_end = scan.context_span(start, end, 50, 50)
+                    logger.debug("%s match %d in %s: '%s' - Context: '%s'", label, len(locations) + 1, scan.doc_type,
+                                 scan.slice(start, end), scan.slice(context_start, context_end))
+                    locations.append((start, scan.slice(start, end)))
+        
+        saturating = triage is not None and "saturation" in aspect
+        for start, end, match in triggers:
+            if "context" not in aspect:
+                hit = Hit(start, end, match, None, None, None)
+            else:
+                context_start, context_end = scan.context_span(start, end, chars_before, chars_after)
+                hit = Hit(start, end, match, context_start, context_end, scan.slice(context_start, context_end))
+                
+                unmet = next((label for label, check in aspect["requires"] if not check(scan, hit)), None)
+                if unmet is not None:
+                    if debug:
+                        reason = "non-AI-related" if unmet == "ai" else f"unmatched ({unmet})"
+                        logger.debug("Skipping %s %s context in %s at offset %d", reason,
+                                     aspect["name"].replace("_", "-"), scan.doc_type, start)
+                    continue
+            
+            if not saturating:
+                events.extend(handler(scan, aspect, hit))
+                continue
+            
+            found = list(handler(scan, aspect, hit))
+            events.extend(found)
+            if triage.record(aspect, scan.doc_type, found):
+                logger.info("Triage decided %s in %s at offset %d", aspect["name"], scan.doc_type, start,
+                            extra={"event": "aspect_decided", "aspect": aspect["name"], "doc_type": scan.doc_type})
+                break
+
+def _new_partial(doc_type: str, views) -> Dict[str, Any]:
+    """An empty per-document scan result"""
+    return {
+        "doc_type": doc_type,
+        "chars": 0,
+        "sample": "",
+        "ai_terms": [],
+        "match_counts": {},
+        "locations": {},
+        "events": {view: [] for view in views},
+        "timed_out": [],
+        "elapsed_ms": 0.0
+    }
+
+def scan_document_stream(plan: ExecutionPlan, doc_type: str, chunks, views=ANALYSIS_VIEWS,
+                         time_budget: float = 0, provider_catalog: Optional[ProviderCatalog] = None,
+                         triage: Optional[TriageState] = None) -> Dict[str, Any]:
+    """
+    Scan one document, given as an iterable of text chunks, for every requested view.
+    
+    Chunks are scanned as they arrive, keeping only a window of the text:
+    the largest context radius of the rules as overlap, plus whatever a match
+    still waiting for more text needs. The findings are the same as scanning
+    the joined text at once. The "features" view counts matches while the
+    full view's aspects are scanned.
+    
+    Args:
+        plan: The ExecutionPlan to run
+        doc_type: Document type of the text
+        chunks: Iterable of text pieces, in document order
+        views: Names of the views to collect findings for
+        time_budget: Seconds of analysis allowed per view (0 disables the limit)
+        provider_catalog: ProviderCatalog used to identify third-party AI providers
+        triage: TriageState of a triage analysis, whose decided aspects are
+            skipped and whose deadline also stops the scan
+    
+    Returns:
+        Dictionary with the document's events per view, match counts and timings
+    """
+    logger = analysis_logger
+    doc_started = time.perf_counter()
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    scan = DocumentScan(plan, doc_type, provider_catalog or get_provider_catalog())
+    scanned = list(dict.fromkeys(_DERIVED_VIEWS.get(view, view) for view in views))
+    partial = _new_partial(doc_type, scanned)
+    runs = {view: {"events": [[] for _ in plan.aspects(view, doc_type)], "spent": 0.0} for view in scanned}
+    counters = None
+    if "features" in views:
+        counters = partial["features"] = {"aspects": {}, "ai_mentions": 0}
+    ai_terms_found = set()
+    
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+    while chunk is not None:
+        following = next(chunks, None)
+        if len(partial["sample"]) < 100:
+            partial["sample"] += chunk[:100 - len(partial["sample"])]
+        if not scan.feed(chunk, final=following is None):
+            chunk = following
+            continue
+        
+        # Debug: Check for AI-related terms in general
+        ai_terms_found.update(term for term in plan.summary_terms if term not in ai_terms_found and term in scan.view.text)
+        if counters is not None:
+            counters["ai_mentions"] += scan.ai_mention_count()
+        
+        for view, run in runs.items():
+            if view in partial["timed_out"]:
+                continue
+            round_started = time.monotonic()
+            scan.deadline = round_started + time_budget - run["spent"] if time_budget else None
+            if triage is not None and triage.deadline is not None:
+                scan.deadline = min(scan.deadline or triage.deadline, triage.deadline)
+            try:
+                _scan_round(scan, view, run, partial, debug, triage,
+                            counters if view == _DERIVED_VIEWS["features"] else None)
+            except AnalysisTimeout:
+                # Keep what was found so far and move on
+                partial["timed_out"].append(view)
+                if triage is not None and triage.expired():
+                    logger.warning("Triage time budget ran out in %s; findings may be incomplete", doc_type)
+                else:
+                    logger.warning("Analysis of %s exceeded its %.1fs time budget; findings may be incomplete",
+                                   doc_type, time_budget)
+            run["spent"] += time.monotonic() - round_started
+        
+        scan.compact()
+        chunk = following
+    
+    # Document-scoped aspects report once the whole document has been seen
+    for view, run in runs.items():
+        aspects = plan.aspects(view, doc_type)
+        if view not in partial["timed_out"]:
+            for i, aspect in enumerate(aspects):
+                if aspect.get("scope") == "document" and (aspect["pattern"] is None or scan.found(aspect["pattern"])):
+                    run["events"][i].extend(_ASPECT_HANDLERS[aspect["handler"]][0](scan, aspect))
+        partial["events"][view] = [event for events in run["events"] for event in events]
+    
+    partial["chars"] = scan.end
+    partial["ai_terms"] = [term for term in plan.summary_terms if term in ai_terms_found]
+    partial["elapsed_ms"] = (time.perf_counter() - doc_started) * 1000
+    return partial
+
+def scan_document(plan: ExecutionPlan, doc_type: str, text: str, views=ANALYSIS_VIEWS,
+                  time_budget: float = 0, provider_catalog: Optional[ProviderCatalog] = None) -> Dict[str, Any]:
+    """
+    Scan one document for every requested view.
+    
+    The scan only records findings as events; merging them across documents
+    is left to each view's reducer, so documents can be scanned independently.
+    
+    Args:
+        plan: The ExecutionPlan to run
+        doc_type: Document type of the text
+        text: The document text
+        views: Names of the views to collect findings for
+        time_budget: Seconds allowed per view (0 disables the limit)
+        provider_catalog: ProviderCatalog used to identify third-party AI providers
+    
+    Returns:
+        Dictionary with the document's events per view, match counts and timings
+    """
+    return scan_document_stream(plan, doc_type, [text], views, time_budget, provider_catalog)
+
+def _apply_event(analysis: Dict[str, Any], insights: List[str], event: tuple, doc_type: Optional[str] = None):
+    """Merge one finding of a document into a view's result"""
+    kind = event[0]
+    if kind == "evidence":
+        analysis["_evidence"][event[1]].append(event[2])
+        counts = analysis["_evidence_counts"][event[1]]
+        counts[doc_type] = counts.get(doc_type, 0) + 1
+    elif kind == "insight":
+        insights.append(event[1])
+    elif kind == "set":
+        analysis[event[1]] = event[2]
+    elif kind == "set_default":
+        if not analysis[event[1]]:
+            analysis[event[1]] = event[2]
+    elif kind == "add":
+        if event[2] not in analysis[event[1]]:
+            analysis[event[1]].append(event[2])
+            if event[3]:
+                insights.append(event[3])
+    elif kind == "append":
+        analysis[event[1]].append(event[2])
+    elif kind == "if_providers":
+        # Findings that need a third-party provider found so far, and one
+        # mentioned in their context unless they mention providers generically
+        _, mentioned, generic, findings = event
+        providers = analysis["third_party_providers"]
+        if providers and (generic or any(provider in providers for provider in mentioned)):
+            for finding in findings:
+                _apply_event(analysis, insights, finding, doc_type)
+    else:
+        raise ValueError(f"Unknown analysis event: {kind}")
+
+def _reduce_full(plan: ExecutionPlan, scans: Dict[str, Optional[Dict[str, Any]]], started: float) -> Dict[str, Any]:
+    """Build the fix_analyze_ai_capabilities result from the document scans"""
+    logger = analysis_logger
+    
+    # Per-match detail is only built when DEBUG logging is enabled; INFO gets
+    # one summary event per document and one for the whole analysis
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    # Debug information about input
+    doc_lengths = {doc_type: partial["chars"] for doc_type, partial in scans.items() if partial}
+    logger.info("Analyzing %d non-empty documents: %s", len(doc_lengths), doc_lengths)
+    
+    # For tracking which documents provided which insights
+    document_insights = {doc_type: [] for doc_type in scans.keys() if scans[doc_type]}
+    
+    # Create analysis structure with expanded fields
+    analysis = {
+        # Opt-out information
+        "opt_out_available": False,
+        "enterprise_opt_out": False,
         "opt_out_method": None,  # How to opt out (admin console, API, etc.)
         "opt_out_granularity": None,  # User-level, feature-level, etc.
         
-        # AI implementation 
+        # AI implementation
         "native_ai": None,  # True/False/None (unknown)
         "third_party_providers": [],
         "ai_features": [],  # List of AI features mentioned
@@ -1321,451 +3056,726 @@ def fix_analyze_ai_capabilities(texts):
         "confidence_levels": {},  # Confidence in each finding
         
         # Raw evidence for debugging/validation
-        "_evidence": {}
+        "_evidence": {key: [] for key in plan.evidence_keys},
+        
+        # Evidence items per evidence key and document type, which confidence
+        # and priority resolution work from
+        "_evidence_counts": {key: {} for key in plan.evidence_keys}
     }
+    evidence_counts = analysis["_evidence_counts"]
     
     # Track which documents were analyzed
-    for doc_type in texts.keys():
-        if texts[doc_type]:
+    for doc_type in scans.keys():
+        if scans[doc_type]:
             analysis["document_coverage"][doc_type] = True
             # Quick debug check for content
-            first_100_chars = texts[doc_type][:100].replace('\n', ' ')
-            logger.info(f"Document {doc_type} sample: {first_100_chars}...")
+            if debug:
+                logger.debug("Document %s sample: %s...", doc_type, scans[doc_type]["sample"].replace('\n', ' '))
         else:
             analysis["document_coverage"][doc_type] = False
     
-    # Helper function to get context around a match
-    def get_context(text, match, chars_before=100, chars_after=100):
-        start = max(0, match.start() - chars_before)
-        end = min(len(text), match.end() + chars_after)
-        return text[start:end]
-    
-    # Helper function to check if a context is AI-related
-    def is_ai_related(context):
-        ai_terms = [
-            r'\bai\b', r'artificial intelligence', r'machine learning', r'ml\b', 
-            r'generative', r'llm', r'large language model', r'neural network',
-            r'intelligent assistant', r'smart feature', r'automated', r'algorithm',
-            r'chat', r'copilot', r'insight', r'analytics', r'prediction'
-        ]
-        return any(re.search(term, context, re.IGNORECASE) for term in ai_terms)
-    
-    # Base patterns for different analyses
-    patterns = {
-        "opt_out": r'opt[-\s]?out|disable|turn off|deactivate|disable|toggle|switch off',
-        "enterprise": r'enterprise|admin|administrator|organization|tenant|company-wide|organizational',
-        "ai_native": r'built[-\s]?in|native|proprietary|our (own|model)|in-house|developed by us|internal',
-        "third_party": r'third[-\s]?party|partner|OpenAI|Azure|Google|AWS|Amazon|Anthropic|Claude',
-        "data_retention": r'retain|store|save|keep|preserve|hold|maintain',
-        "model_training": r'train|learn|improve|enhance|develop|refine|optimize',
-        "model_sharing": r'share|distribute|provide to|made available|transfer|transmit',
-        "contractual": r'contract|agreement|prohibit|restrict|prevent|not (allowed|permitted)|obligate',
-        "security": r'security|encrypt|protect|safeguard|secure|confidential',
-        "ethical": r'ethical|fair|bias|transparent|explainable|interpretable|accountability',
-        "admin_controls": r'admin (console|portal|dashboard|settings)|settings|configuration|preferences',
-        "granularity": r'per[ -]?(user|feature|organization|tenant)|individual|specific',
-        "compliance": r'comply|compliance|regulation|regulatory|requirement',
-        "period": r'day|week|month|year|days|weeks|months|years|\d+[\s-]days|\d+[\s-]months'
-    }
-    
-    # Initialize evidence containers for each pattern
-    analysis["_evidence"] = {key: [] for key in patterns.keys()}
-    
-    # Document type priority for each analysis aspect
-    priority_map = {
-        "opt_out_available": ["admin_guide", "enterprise_controls", "terms_of_service", "privacy_policy"],
-        "enterprise_opt_out": ["admin_guide", "enterprise_controls", "terms_of_service"],
-        "native_ai": ["ai_trust", "ai_ethics", "responsible_ai", "privacy_policy"],
-        "third_party_providers": ["subprocessors", "data_processing", "privacy_policy"],
-        "data_retention": ["data_retention", "privacy_policy", "data_processing"],
-        "model_training": ["ai_trust", "ai_ethics", "privacy_policy", "terms_of_service"],
-        "model_sharing": ["terms_of_service", "privacy_policy", "data_processing"],
-        "contractual_protections": ["data_processing", "terms_of_service", "api_terms"],
-        "security_measures": ["data_security", "data_processing", "privacy_policy"]
-    }
+    priority_map = plan.priority_map
     
     # Note specific pattern locations to help debug
     pattern_locations = {}
+    timed_out = []
     
-    # Step 1: Analyze each document for each aspect
-    for doc_type, text in texts.items():
-        if not text:
-            continue
+    # Step 1: Merge each document's findings in document order
+    for partial in filter(None, scans.values()):
+        doc_type = partial["doc_type"]
+        for event in partial["events"]["full"]:
+            _apply_event(analysis, document_insights[doc_type], event, doc_type)
+        for pattern, locations in partial["locations"].items():
+            pattern_locations.setdefault(pattern, []).extend((doc_type, *location) for location in locations)
+        if "full" in partial["timed_out"]:
+            timed_out.append(doc_type)
         
-        doc_prefix = f"[{doc_type}] "
-        logger.info(f"Analyzing {doc_type} ({len(text)} chars)")
-        
-        # Debug: Check for AI-related terms in general
-        ai_terms_found = []
-        for term in ['ai', 'artificial intelligence', 'machine learning', 'model', 'algorithm']:
-            if term in text.lower():
-                ai_terms_found.append(term)
-        
-        if ai_terms_found:
-            logger.info(f"AI terms found in {doc_type}: {ai_terms_found}")
-        else:
-            logger.info(f"No AI terms found in {doc_type}")
-        
-        # --- Opt-out Analysis ---
-        if doc_type in ["admin_guide", "enterprise_controls", "privacy_policy", "terms_of_service", "acceptable_use"]:
-            opt_out_matches = list(re.finditer(patterns["opt_out"], text, re.IGNORECASE))
-            logger.info(f"Found {len(opt_out_matches)} opt_out pattern matches in {doc_type}")
-            
-            # Debug: Log the first few matches
-            for i, match in enumerate(opt_out_matches[:3]):
-                match_text = match.group(0)
-                context = get_context(text, match, 50, 50)
-                logger.info(f"Opt-out match {i+1} in {doc_type}: '{match_text}' - Context: '{context}'")
-                
-                # Store location for debugging
-                if "opt_out" not in pattern_locations:
-                    pattern_locations["opt_out"] = []
-                pattern_locations["opt_out"].append((doc_type, match.start(), match_text))
-            
-            for match in opt_out_matches:
-                context = get_context(text, match)
-                
-                # Debug: Check if context is AI-related
-                is_ai = is_ai_related(context)
-                if not is_ai:
-                    logger.info(f"Skipping non-AI-related opt-out context in {doc_type}")
-                    continue
-                
-                # Only consider if related to AI
-                if is_ai:
-                    analysis["_evidence"]["opt_out"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("opt_out_info")
-                    
-                    analysis["opt_out_available"] = True
-                    
-                    # Check for enterprise-level controls
-                    if re.search(patterns["enterprise"], context, re.IGNORECASE):
-                        analysis["_evidence"]["enterprise"].append(doc_prefix + context.strip())
-                        analysis["enterprise_opt_out"] = True
-                    
-                    # Look for opt-out method
-                    admin_console_match = re.search(patterns["admin_controls"], context, re.IGNORECASE)
-                    if admin_console_match:
-                        analysis["opt_out_method"] = "admin_console"
-                    elif "api" in context.lower():
-                        analysis["opt_out_method"] = "api"
-                    elif "contact" in context.lower() or "request" in context.lower():
-                        analysis["opt_out_method"] = "contact_vendor"
-                    
-                    # Check granularity
-                    granularity_match = re.search(patterns["granularity"], context, re.IGNORECASE)
-                    if granularity_match:
-                        granularity_text = granularity_match.group(0).lower()
-                        if "user" in granularity_text:
-                            analysis["opt_out_granularity"] = "user_level"
-                        elif "feature" in granularity_text:
-                            analysis["opt_out_granularity"] = "feature_level"
-                        elif "organization" in granularity_text or "tenant" in granularity_text:
-                            analysis["opt_out_granularity"] = "organization_level"
-        
-        # --- AI Implementation Analysis ---
-        if doc_type in ["ai_trust", "ai_ethics", "responsible_ai", "privacy_policy", "terms_of_service"]:
-            # Look for native AI mentions
-            ai_native_matches = list(re.finditer(patterns["ai_native"], text, re.IGNORECASE))
-            logger.info(f"Found {len(ai_native_matches)} native AI pattern matches in {doc_type}")
-            
-            for match in ai_native_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context):
-                    analysis["_evidence"]["ai_native"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("native_ai_info")
-                    analysis["native_ai"] = True
-            
-            # Identify AI features
-            ai_feature_pattern = r'(feature|capability|functionality|tool)s?\s+(?:includ(?:es?|ing)|such as|like)([^.]+)'
-            ai_feature_matches = list(re.finditer(ai_feature_pattern, text, re.IGNORECASE))
-            
-            for match in ai_feature_matches:
-                context = get_context(text, match, 50, 150)
-                
-                if is_ai_related(context):
-                    features_text = match.group(2).strip()
-                    features = [f.strip() for f in re.split(r',|\band\b', features_text)]
-                    for feature in features:
-                        if feature and feature not in analysis["ai_features"] and len(feature) > 3:
-                            analysis["ai_features"].append(feature)
-                            document_insights[doc_type].append("ai_features")
-        
-        # --- Third Party Provider Analysis ---
-        if doc_type in ["subprocessors", "privacy_policy", "data_processing", "terms_of_service"]:
-            # Look for third-party providers
-            third_party_matches = list(re.finditer(patterns["third_party"], text, re.IGNORECASE))
-            logger.info(f"Found {len(third_party_matches)} third-party pattern matches in {doc_type}")
-            
-            for match in third_party_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context):
-                    analysis["_evidence"]["third_party"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("third_party_info")
-                    
-                    # Try to identify specific providers
-                    provider_match = None
-                    for provider in ["OpenAI", "Azure", "Google", "AWS", "Amazon", "Anthropic", "Claude", "HuggingFace", "Cohere"]:
-                        if re.search(r'\b' + re.escape(provider) + r'\b', context, re.IGNORECASE):
-                            provider_match = provider
-                            if provider not in analysis["third_party_providers"]:
-                                analysis["third_party_providers"].append(provider)
-                    
-                    if provider_match:
-                        analysis["native_ai"] = False
-        
-        # --- Data Usage Analysis ---
-        if doc_type in ["data_retention", "privacy_policy", "data_processing", "terms_of_service"]:
-            # Check data retention
-            data_retention_matches = list(re.finditer(patterns["data_retention"], text, re.IGNORECASE))
-            logger.info(f"Found {len(data_retention_matches)} data retention pattern matches in {doc_type}")
-            
-            for match in data_retention_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context) and "data" in context.lower():
-                    analysis["_evidence"]["data_retention"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("data_retention_info")
-                    analysis["data_retention"] = True
-                    
-                    # Look for retention period
-                    period_matches = list(re.finditer(patterns["period"], context, re.IGNORECASE))
-                    if period_matches:
-                        # Get 10 chars before and after the period mention
-                        period_match = period_matches[0]
-                        period_start = max(0, period_match.start() - 10)
-                        period_end = min(len(context), period_match.end() + 10)
-                        period_context = context[period_start:period_end]
-                        analysis["retention_period"] = period_context.strip()
-            
-            # Check model training
-            model_training_matches = list(re.finditer(patterns["model_training"], text, re.IGNORECASE))
-            logger.info(f"Found {len(model_training_matches)} model training pattern matches in {doc_type}")
-            
-            for match in model_training_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context) and "data" in context.lower():
-                    analysis["_evidence"]["model_training"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("model_training_info")
-                    analysis["model_training"] = True
-            
-            # Check model sharing
-            model_sharing_matches = list(re.finditer(patterns["model_sharing"], text, re.IGNORECASE))
-            logger.info(f"Found {len(model_sharing_matches)} model sharing pattern matches in {doc_type}")
-            
-            for match in model_sharing_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context) and re.search(r'model|algorithm', context, re.IGNORECASE):
-                    analysis["_evidence"]["model_sharing"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("model_sharing_info")
-                    
-                    # Look for negation near the sharing term
-                    negations = re.search(r'not|never|isn\'t|doesn\'t|won\'t|wouldn\'t|prohibited|forbidden', context, re.IGNORECASE)
-                    
-                    if negations:
-                        analysis["model_sharing"] = False
-                        # Extract limitations on sharing
-                        limit_start = max(0, negations.start() - 20)
-                        limit_end = min(len(context), negations.end() + 50)
-                        limit_text = context[limit_start:limit_end]
-                        analysis["model_sharing_limitations"] = limit_text.strip()
-                    else:
-                        analysis["model_sharing"] = True
-        
-        # --- Contractual Protections Analysis ---
-        if doc_type in ["data_processing", "terms_of_service", "privacy_policy", "api_terms"]:
-            # Check for contractual protections
-            contractual_matches = list(re.finditer(patterns["contractual"], text, re.IGNORECASE))
-            logger.info(f"Found {len(contractual_matches)} contractual pattern matches in {doc_type}")
-            
-            for match in contractual_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context) and analysis["third_party_providers"]:
-                    # Check if the context mentions any of the third-party providers
-                    provider_mentioned = False
-                    for provider in analysis["third_party_providers"]:
-                        if re.search(r'\b' + re.escape(provider) + r'\b', context, re.IGNORECASE):
-                            provider_mentioned = True
+        # One aggregated event per document
+        logger.info(
+            "Analyzed %s: %d chars, %d pattern matches, %d insights, AI terms %s (%.1f ms)",
+            doc_type, partial["chars"], sum(partial["match_counts"].values()), len(document_insights[doc_type]),
+            partial["ai_terms"] or "none", partial["elapsed_ms"],
+            extra={
+                "event": "document_analyzed",
+                "doc_type": doc_type,
+                "chars": partial["chars"],
+                "match_counts": partial["match_counts"],
+                "insights": len(document_insights[doc_type]),
+                "ai_terms": partial["ai_terms"]
+            }
+        )
+    
+    # Step 2: Log the authoritative source of findings backed by several
+    # documents; findings are not changed, so this only runs when debugging
+    if debug:
+        for key, doc_priorities in priority_map.items():
+            if key in analysis and analysis[key] is not None:
+                # Check if we have conflicting evidence
+                evidence_key = key.split("_")[0] if "_" in key else key
+                if evidence_key in evidence_counts and sum(evidence_counts[evidence_key].values()) > 1:
+                    # Get the document type with the highest priority that has evidence
+                    for doc_type in doc_priorities:
+                        if evidence_counts[evidence_key].get(doc_type):
+                            logger.debug("Using %s as authoritative source for %s", doc_type, key)
                             break
-                    
-                    # If no specific provider is mentioned, check for generic third-party terms
-                    if not provider_mentioned:
-                        provider_mentioned = re.search(r'third[\s-]party|partner|provider|vendor', context, re.IGNORECASE) is not None
-                    
-                    if provider_mentioned:
-                        analysis["_evidence"]["contractual"].append(doc_prefix + context.strip())
-                        document_insights[doc_type].append("contractual_protection_info")
-                        analysis["contractual_protections"] = True
-                        
-                        # Extract details about the protections
-                        if not analysis["contractual_details"]:
-                            # Find a sentence containing the contractual term
-                            sentences = re.split(r'(?<=[.!?])\s+', context)
-                            for sentence in sentences:
-                                if re.search(patterns["contractual"], sentence, re.IGNORECASE):
-                                    analysis["contractual_details"] = sentence.strip()
-                                    break
+    
+    # Step 3: Look for contradictions or uncertainties
+    concerns = []
+    
+    if analysis["opt_out_available"] and not analysis["opt_out_method"]:
+        concerns.append("Opt-out is mentioned but the method is not clearly specified")
+    
+    if analysis["third_party_providers"] and not analysis["contractual_protections"]:
+        concerns.append("Third-party AI providers are used without explicit contractual protections mentioned")
+    
+    if analysis["model_training"] and not analysis["data_retention"]:
+        concerns.append("Model training is mentioned without clear data retention policy")
+    
+    if analysis["data_retention"] and not analysis["retention_period"]:
+        concerns.append("Data retention is mentioned without specifying the retention period")
+    
+    if analysis["model_sharing"] and not analysis["model_sharing_limitations"]:
+        concerns.append("Models may be shared without clear limitations")
+    
+    for doc_type in timed_out:
+        concerns.append(f"Analysis of {doc_type} stopped at its time budget; findings may be incomplete")
+    
+    # Add discovered concerns
+    for concern in concerns:
+        if concern not in analysis["concerns"]:
+            analysis["concerns"].append(concern)
+    
+    # Step 4: Calculate confidence levels
+    confidence_map = {
+        "opt_out_available": 0.0,
+        "enterprise_opt_out": 0.0,
+        "native_ai": 0.0,
+        "third_party_providers": 0.0,
+        "data_retention": 0.0,
+        "model_training": 0.0,
+        "model_sharing": 0.0,
+        "contractual_protections": 0.0
+    }
+    
+    # Base confidence on number of pieces of evidence and document types
+    for key in confidence_map.keys():
+        evidence_key = key.split("_")[0] if "_" in key else key
+        confidence = count_confidence(evidence_counts.get(evidence_key, {}))
+        if confidence is not None:
+            confidence_map[key] = confidence
+            logger.debug("Confidence for %s: %.2f (based on %d evidence items from %d document types)",
+                         key, confidence, sum(evidence_counts[evidence_key].values()),
+                         len(evidence_counts[evidence_key]))
+    
+    analysis["confidence_levels"] = confidence_map
+    
+    # Summary of the whole analysis
+    evidence_totals = {key: sum(counts.values()) for key, counts in evidence_counts.items() if counts}
+    logger.info(
+        "Analysis complete: %d documents, %d evidence items %s (%.1f ms)",
+        len(doc_lengths), sum(evidence_totals.values()), evidence_totals,
+        (time.perf_counter() - started) * 1000,
+        extra={
+            "event": "analysis_complete",
+            "documents": len(doc_lengths),
+            "evidence_counts": evidence_totals,
+            "confidence_levels": confidence_map
+        }
+    )
+    
+    # If we found no evidence at all, there might be an extraction problem
+    if not evidence_totals:
+        logger.warning("No evidence found in any document! This suggests an extraction or pattern matching problem.")
+        analysis["concerns"].append("Analysis could not find relevant information in the provided documents.")
+    
+    # Log pattern locations for debugging
+    if pattern_locations:
+        logger.debug("Pattern locations for debugging:")
+        for pattern, locations in pattern_locations.items():
+            logger.debug("  %s: %s", pattern, locations[:5])
+    
+    # Add document insights summary to output
+    analysis["_document_insights"] = document_insights
+    if timed_out:
+        analysis["_timed_out_documents"] = timed_out
+    
+    return analysis
+
+def _reduce_legacy(plan: ExecutionPlan, scans: Dict[str, Optional[Dict[str, Any]]], started: float) -> Dict[str, Any]:
+    """Build the analyze_ai_capabilities result from the document scans"""
+    analysis = {
+        "opt_out_available": False,
+        "enterprise_opt_out": False,
+        "native_ai": None,  # True/False/Unknown
+        "third_party_providers": [],
+        "data_retention": False,
+        "model_training": False,
+        "model_sharing": False,
+        "contractual_protections": False,
+        "concerns": []
+    }
+    
+    for partial in filter(None, scans.values()):
+        for event in partial["events"]["legacy"]:
+            _apply_event(analysis, [], event)
+        if "legacy" in partial["timed_out"]:
+            analysis["concerns"].append(f"Analysis of {partial['doc_type']} stopped at its time budget; findings may be incomplete")
+    
+    return analysis
+
+def feature_schema(plan: Optional[ExecutionPlan] = None) -> Dict[str, Any]:
+    """
+    Layout of the document feature vectors built by a plan.
+    
+    For each match-scoped aspect of the full view, in rule order, the vector
+    holds its pattern matches ("hits."), those with an AI term in their
+    context ("ai_hits.") and those in a negation's scope ("negated."),
+    followed by the document-wide statistics. Aspects that do
+    not apply to a document's type count zero.
+    
+    Args:
+        plan: ExecutionPlan the vectors come from (defaults to the shared plan)
+    
+    Returns:
+        Dictionary with the layout format, the rule hash and the feature names
+    """
+    if plan is None:
+        plan = get_execution_plan()
+    aspects = [aspect["name"] for aspect in plan.views[_DERIVED_VIEWS["features"]]
+               if aspect.get("scope", "match") == "match"]
+    features = [f"{kind}.{name}" for kind in ("hits", "ai_hits", "negated") for name in aspects]
+    features += ["chars", "ai_mentions", "ai_density", "hit_density", "ai_hit_share", "negated_share"]
+    return {"format": FEATURE_FORMAT, "rule_hash": plan.compiled["rule_hash"], "aspects": aspects,
+            "features": features}
+
+def save_feature_schema(path: str, plan: Optional[ExecutionPlan] = None) -> Dict[str, Any]:
+    """
+    Write the feature vector layout to a JSON file.
+    
+    Args:
+        path: File to write
+        plan: ExecutionPlan the vectors come from (defaults to the shared plan)
+    
+    Returns:
+        The schema written
+    """
+    schema = feature_schema(plan)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+    return schema
+
+def _reduce_features(plan: ExecutionPlan, scans: Dict[str, Optional[Dict[str, Any]]], started: float) -> Dict[str, Any]:
+    """Build each document's feature vector from its scan"""
+    # Imported on first use, so that reviews without feature vectors start without it
+    import numpy as np
+    
+    aspects = feature_schema(plan)["aspects"]
+    vectors = {}
+    for doc_type, partial in scans.items():
+        counts = np.zeros((3, len(aspects)))
+        chars = ai_mentions = 0
+        if partial and "features" in partial:
+            for i, name in enumerate(aspects):
+                counts[:, i] = partial["features"]["aspects"].get(name, (0, 0, 0))
+            chars = partial["chars"]
+            ai_mentions = partial["features"]["ai_mentions"]
         
-        # --- Compliance Analysis ---
-        if doc_type in ["gdpr_compliance", "ccpa_compliance", "privacy_policy", "data_processing"]:
-            # Check GDPR compliance
-            if re.search(r'\bgdpr\b|general data protection regulation', text, re.IGNORECASE):
-                document_insights[doc_type].append("gdpr_info")
-                if re.search(r'comply|compliant|compliance|adhere', text, re.IGNORECASE):
-                    analysis["gdpr_compliant"] = True
-            
-            # Check CCPA compliance
-            if re.search(r'\bccpa\b|california consumer privacy', text, re.IGNORECASE):
-                document_insights[doc_type].append("ccpa_info")
-                if re.search(r'comply|compliant|compliance|adhere', text, re.IGNORECASE):
-                    analysis["ccpa_compliant"] = True
-        
-        # --- Security Analysis ---
-        if doc_type in ["data_security", "privacy_policy", "data_processing"]:
-            # Look for security measures
-            security_matches = list(re.finditer(patterns["security"], text, re.IGNORECASE))
-            logger.info(f"Found {len(security_matches)} security pattern matches in {doc_type}")
-            
-            for match in security_matches:
-                context = get_context(text, match)
-                
-                if is_ai_related(context) or "data" in context.lower():
-                    analysis["_evidence"]["security"].append(doc_prefix + context.strip())
-                    document_insights[doc_type].append("security_info")
-                    
-                    # Extract security measures
-                    security_measures = [
-                        "encryption", "access controls", "authentication", "monitoring",
-                        "auditing", "data minimization", "anonymization", "pseudonymization"
-                    ]
-                    
-                    for measure in security_measures:
-                        if measure in context.lower() and measure not in analysis["security_measures"]:
-                            analysis["security_measures"].append(measure)
-            
-            # Look for security certifications
-            cert_pattern = r'\b(ISO|SOC|HITRUST|FedRAMP|PCI DSS)[- ]\d+\b|\b(ISO|SOC|HITRUST|FedRAMP|PCI DSS)\b'
-            cert_matches = list(re.finditer(cert_pattern, text, re.IGNORECASE))
-            
-            for match in cert_matches:
-                cert = match.group(0)
-                if cert not in analysis["security_certifications"]:
-                    analysis["security_certifications"].append(cert)
-                    document_insights[doc_type].append("security_certification_info")
-        
-        # --- Ethical Considerations Analysis ---
-        if doc_type in ["ai_ethics", "responsible_ai", "ai_trust"]:
-            # Look for ethical considerations
-            ethical_matches = list(re.finditer(patterns["ethical"], text, re.IGNORECASE))
-            logger.info(f"Found {len(ethical_matches)} ethical pattern matches in {doc_type}")
-            
-            for match in ethical_matches:
-                context = get_context(text, match)
-                
-                analysis["_evidence"]["ethical"].append(doc_prefix + context.strip())
-                document_insights[doc_type].append("ethical_consideration_info")
-                
-                # Extract the sentence containing the ethical consideration
-                sentences = re.split(r'(?<=[.!?])\s+', context)
-                for sentence in sentences:
-                    if re.search(patterns["ethical"], sentence, re.IGNORECASE):
-                        if sentence.strip() not in analysis["ethical_considerations"]:
-                            analysis["ethical_considerations"].append(sentence.strip())
-    
-    # Step 2: Resolve conflicting information based on document priority
-    for key, doc_priorities in priority_map.items():
-        if key in analysis and analysis[key] is not None:
-            # Check if we have conflicting evidence
-            evidence_key = key.split("_")[0] if "_" in key else key
-            if evidence_key in analysis["_evidence"] and len(analysis["_evidence"][evidence_key]) > 1:
-                # Get the document type with the highest priority that has evidence
-                for doc_type in doc_priorities:
-                    if doc_type in document_insights and any(evidence_key in insight for insight in document_insights[doc_type]):
-                        # Use this document's evidence as the most authoritative
-                        logger.info(f"Using {doc_type} as authoritative source for {key}")
-                        break
+        hits, ai_hits, negated = counts.sum(axis=1)
+        per_kchar = 1000 / chars if chars else 0.0
+        statistics = [chars, ai_mentions, ai_mentions * per_kchar, hits * per_kchar,
+                      ai_hits / hits if hits else 0.0, negated / hits if hits else 0.0]
+        vectors[doc_type] = np.concatenate([counts.ravel(), statistics])
+    return vectors
+
+_VIEW_REDUCERS = {
+    "full": _reduce_full,
+    "legacy": _reduce_legacy,
+    "features": _reduce_features
+}
+
+_analysis_pool = None
+_analysis_pool_workers = 0
+_analysis_pool_lock = threading.Lock()
+
+def _get_analysis_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared scan pool, starting it with the given number of workers"""
+    global _analysis_pool, _analysis_pool_workers
+    # Concurrent reviews (the pipeline, the review service) must not start two pools
+    with _analysis_pool_lock:
+        if _analysis_pool is None or _analysis_pool_workers != workers:
+            shutdown_analysis_pool()
+            _analysis_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker)
+            _analysis_pool_workers = workers
+        return _analysis_pool
+
+@atexit.register
+def shutdown_analysis_pool():
+    """Stop the worker processes started for parallel analysis"""
+    global _analysis_pool
+    if _analysis_pool is not None:
+        _analysis_pool.shutdown()
+        _analysis_pool = None
+
+_worker_log_queue = None
+_worker_plans = {}
+
+def _init_scan_worker():
+    """
+    Collect a pool worker's log records so they can be returned with its
+    scans; the parent's queue listener does not exist in the worker.
+    """
+    global _worker_log_queue
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    _worker_log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(_worker_log_queue))
+
+# Per-document scans are cached here, keyed by content hash, when the variable
+# is set; scans accumulate with every document reviewed, so it is off by default
+ANALYSIS_CACHE_DIR = os.environ.get("AI_REVIEW_ANALYSIS_CACHE", "")
+
+# Longest streamed document read whole so that its scan can be cached
+ANALYSIS_CACHE_MAX_CHARS = 4_000_000
+
+@lru_cache(maxsize=None)
+def _code_hash() -> str:
+    """Hash of this module's source, so that cached scans expire with the code that made them"""
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class ScanCache:
+    """
+    Per-document scans stored on disk, one JSON file per scan.
+    
+    A scan depends only on its document's text and type, the compiled rules,
+    the regex engine, the provider catalog and the analyzer code, so it is
+    stored under a hash of all of them. A later review reuses the scans of
+    documents whose text has not changed and rescans the rest; the merge
+    then gives the same result as scanning everything. Scans cut short by a
+    time budget are never stored.
+    
+    Args:
+        directory: Cache directory (an empty string disables the cache)
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+    
+    def key(self, plan: ExecutionPlan, provider_catalog: ProviderCatalog, doc_type: str, text: str,
+            views) -> str:
+        """Return the cache key of a document's scan"""
+        digest = hashlib.sha256()
+        for part in (_code_hash(), plan.compiled["rule_hash"], REGEX_ENGINE, provider_catalog.fingerprint,
+                     doc_type, ",".join(sorted(views)),
+                     hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()):
+            digest.update(part.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached scan stored under key, or None"""
+        try:
+            with open(os.path.join(self.directory, f"scan-{key}.json"), encoding="utf-8") as f:
+                partial = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return partial
+    
+    def put(self, key: str, partial: Optional[Dict[str, Any]]):
+        """Store a document's scan under key, unless it is empty or was cut short"""
+        if not partial or partial["timed_out"]:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write then rename so concurrent reviews never read a partial scan
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(partial, f)
+            os.replace(tmp_path, os.path.join(self.directory, f"scan-{key}.json"))
+        except OSError as e:
+            logger.debug("Could not cache document scan in %s: %s", self.directory, e)
+
+def _scan_in_worker(compiled: Dict[str, Any], engine: str, level: int, provider_catalog: ProviderCatalog,
+                    doc_type: str, text: str, views, time_budget: float):
+    """Scan one document in a pool worker; returns the scan and its log records"""
+    if REGEX_ENGINE != engine:
+        set_regex_engine(engine)
+    plan = _worker_plans.get((compiled["rule_hash"], engine))
+    if plan is None or plan.compiled != compiled:
+        plan = _worker_plans[(compiled["rule_hash"], engine)] = ExecutionPlan(compiled)
+    logger.setLevel(level)
+    
+    partial = scan_document(plan, doc_type, text, views, time_budget, provider_catalog)
+    records = []
+    while not _worker_log_queue.empty():
+        records.append(_worker_log_queue.get_nowait())
+    return partial, records
+
+def analyze_documents(texts, views=ANALYSIS_VIEWS, time_budget=None, provider_catalog=None, plan=None, workers=None,
+                      triage=False, triage_budget=None, cache_dir=None):
+    """
+    Analyze vendor documents in a single scan and build each requested view.
+    
+    Every document is scanned once by the compiled rule set. Each view then
+    merges the per-document findings in document order into its own result
+    shape, so asking for several views costs one scan. Scans do not depend
+    on each other, so large reviews scan their documents in a process pool;
+    findings that depend on other documents (such as contractual protections
+    covering a provider named elsewhere) are resolved in the merge.
+    
+    Args:
+        texts: Dictionary mapping document types to their text content, either
+            as a string or as an iterable of text chunks to stream
+        views: View names to build: "full" (fix_analyze_ai_capabilities),
+            "legacy" (analyze_ai_capabilities) and/or "features"
+            (document_features)
+        time_budget: Seconds allowed per document and view (defaults to
+            DOCUMENT_TIME_BUDGET, 0 disables the limit)
+        provider_catalog: ProviderCatalog used to identify third-party AI
+            providers (defaults to the shared catalog)
+        plan: ExecutionPlan to run (defaults to the shared plan)
+        workers: Processes to scan documents with (defaults to ANALYSIS_WORKERS
+            for reviews of at least PARALLEL_MIN_CHARS, 1 scans in process)
+        triage: Stop scanning each aspect with a "saturation" rule once it is
+            decided, and the whole analysis once triage_budget is spent. The
+            documents are scanned in order, in process, and each result
+            lists the aspects decided early in "_decided_early".
+        triage_budget: Seconds a triage may spend on all documents together
+            (defaults to TRIAGE_TIME_BUDGET, 0 disables the limit)
+        cache_dir: ScanCache directory reused for unchanged documents
+            (defaults to ANALYSIS_CACHE_DIR, an empty string disables it)
+    
+    Returns:
+        Dictionary mapping each view name to its analysis result
+    """
+    started = time.perf_counter()
+    
+    if plan is None:
+        plan = get_execution_plan()
+    if time_budget is None:
+        time_budget = DOCUMENT_TIME_BUDGET
+    if provider_catalog is None:
+        provider_catalog = get_provider_catalog()
+    for view in views:
+        if _DERIVED_VIEWS.get(view, view) not in plan.views or view not in _VIEW_REDUCERS:
+            raise ValueError(f"Unknown analysis view: {view}")
     
-    # Step 3: Look for contradictions or uncertainties
-    concerns = []
+    if triage:
+        return _triage_documents(plan, texts, views, time_budget, provider_catalog, triage_budget, started)
     
-    if analysis["opt_out_available"] and not analysis["opt_out_method"]:
-        concerns.append("Opt-out is mentioned but the method is not clearly specified")
+    # Map: scan documents independently
+    scans = _scan_documents(plan, {doc_type: (doc_type, text) for doc_type, text in texts.items()},
+                            views, time_budget, provider_catalog, workers, cache_dir)
     
-    if analysis["third_party_providers"] and not analysis["contractual_protections"]:
-        concerns.append("Third-party AI providers are used without explicit contractual protections mentioned")
+    # Reduce: merge the scans in document order, whichever finished first
+    return {view: _VIEW_REDUCERS[view](plan, scans, started) for view in views}
+
+def _scan_documents(plan, documents, views, time_budget, provider_catalog, workers, cache_dir=None):
+    """
+    Scan documents independently, in worker processes when there are several.
     
-    if analysis["model_training"] and not analysis["data_retention"]:
-        concerns.append("Model training is mentioned without clear data retention policy")
+    Args:
+        plan: The ExecutionPlan to run
+        documents: Dictionary mapping keys to (doc_type, text) pairs, the text
+            either a string or an iterable of text chunks
+        views: Names of the views to collect findings for
+        time_budget: Seconds of analysis allowed per document and view
+        provider_catalog: ProviderCatalog used to identify third-party AI providers
+        workers: Processes to scan with (None uses ANALYSIS_WORKERS when the
+            text adds up to PARALLEL_MIN_CHARS)
+        cache_dir: ScanCache directory (defaults to ANALYSIS_CACHE_DIR, an
+            empty string disables the cache)
     
-    if analysis["data_retention"] and not analysis["retention_period"]:
-        concerns.append("Data retention is mentioned without specifying the retention period")
+    Returns:
+        Dictionary mapping the same keys, in order, to each document's scan
+        (None for empty documents)
+    """
+    scans = dict.fromkeys(documents)
     
-    if analysis["model_sharing"] and not analysis["model_sharing_limitations"]:
-        concerns.append("Models may be shared without clear limitations")
+    # Unchanged documents reuse their cached scan. Debug logging reports each
+    # match as it is found, so it always rescans.
+    cache = ScanCache(ANALYSIS_CACHE_DIR if cache_dir is None else cache_dir)
+    cache_keys = {}
+    if cache.directory and not analysis_logger.isEnabledFor(logging.DEBUG):
+        documents = dict(documents)
+        for key, (doc_type, text) in documents.items():
+            if text and not isinstance(text, str):
+                # Streams are hashed once read, if they are short enough to hold
+                text = _read_stream(text, ANALYSIS_CACHE_MAX_CHARS)
+                documents[key] = (doc_type, text)
+            if isinstance(text, str) and text:
+                cache_keys[key] = cache.key(plan, provider_catalog, doc_type, text, views)
+                scans[key] = cache.get(cache_keys[key])
+        if cache_keys:
+            analysis_logger.info("Reusing %d of %d cached document scans", cache.hits, len(cache_keys))
+        documents = {key: document for key, document in documents.items() if scans[key] is None}
+    pooled = {key: (doc_type, text) for key, (doc_type, text) in documents.items() if isinstance(text, str) and text}
+    if workers is None:
+        workers = ANALYSIS_WORKERS or os.cpu_count() or 1
+        if sum(len(text) for _, text in pooled.values()) < PARALLEL_MIN_CHARS:
+            workers = 1
+    workers = min(workers, len(pooled))
     
-    # Add discovered concerns
-    for concern in concerns:
-        if concern not in analysis["concerns"]:
-            analysis["concerns"].append(concern)
+    # Documents go to worker processes when there are several; streamed
+    # documents are scanned here while the workers run
+    futures = {}
+    if workers > 1:
+        pool = _get_analysis_pool(workers)
+        level = analysis_logger.getEffectiveLevel()
+        for key, (doc_type, text) in pooled.items():
+            futures[key] = pool.submit(_scan_in_worker, plan.compiled, REGEX_ENGINE, level, provider_catalog,
+                                       doc_type, text, views, time_budget)
     
-    # Step 4: Calculate confidence levels
-    confidence_map = {
-        "opt_out_available": 0.0,
-        "enterprise_opt_out": 0.0,
-        "native_ai": 0.0,
-        "third_party_providers": 0.0,
-        "data_retention": 0.0,
-        "model_training": 0.0,
-        "model_sharing": 0.0,
-        "contractual_protections": 0.0
-    }
+    for key, (doc_type, text) in documents.items():
+        if not text or key in futures:
+            continue
+        if isinstance(text, str):
+            scans[key] = scan_document(plan, doc_type, text, views, time_budget, provider_catalog)
+        else:
+            partial = scan_document_stream(plan, doc_type, text, views, time_budget, provider_catalog)
+            # A stream that produced no text counts as an empty document
+            scans[key] = partial if partial["chars"] else None
     
-    # Base confidence on number of pieces of evidence and document types
-    for key in confidence_map.keys():
-        evidence_key = key.split("_")[0] if "_" in key else key
-        if evidence_key in analysis["_evidence"]:
-            evidence_count = len(analysis["_evidence"][evidence_key])
-            doc_types = set()
-            for evidence in analysis["_evidence"][evidence_key]:
-                if evidence.startswith('[') and ']' in evidence:
-                    doc_type = evidence[1:evidence.find(']')]
-                    doc_types.add(doc_type)
-            
-            doc_count = len(doc_types)
-            
-            # More evidence and more document types = higher confidence
-            if evidence_count > 0:
-                confidence_map[key] = min(1.0, (0.3 * evidence_count + 0.7 * doc_count) / 3)
-                logger.info(f"Confidence for {key}: {confidence_map[key]:.2f} (based on {evidence_count} evidence items from {doc_count} document types)")
+    for key, future in futures.items():
+        scans[key], records = future.result()
+        for record in records:
+            logging.getLogger(record.name).handle(record)
     
-    analysis["confidence_levels"] = confidence_map
+    for key in documents.keys() & cache_keys.keys():
+        cache.put(cache_keys[key], scans[key])
+    return scans
+
+def _read_stream(chunks, max_chars: int):
+    """
+    Read a stream of text chunks whole if it ends within max_chars; otherwise
+    return an iterator over all of its chunks, the ones read included.
+    """
+    chunks = iter(chunks)
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size > max_chars:
+            return chain(head, chunks)
+    return "".join(head)
+
+def _triage_documents(plan, texts, views, time_budget, provider_catalog, triage_budget, started):
+    """Scan documents in order for a triage analysis and build each view"""
+    if triage_budget is None:
+        triage_budget = TRIAGE_TIME_BUDGET
+    triage = TriageState(time.monotonic() + triage_budget if triage_budget else None)
+    
+    # What one document decides stops the scan of the next, so the documents
+    # are scanned one after another, in this process
+    scans = dict.fromkeys(texts)
+    for doc_type, text in texts.items():
+        if not text:
+            continue
+        if triage.expired():
+            # Out of time: list the document as cut short without reading it
+            partial = _new_partial(doc_type, views)
+            if isinstance(text, str):
+                partial["chars"] = len(text)
+                partial["sample"] = text[:100]
+            partial["timed_out"] = list(views)
+            scans[doc_type] = partial
+            analysis_logger.warning("Triage time budget spent before %s; it was not analyzed", doc_type)
+            continue
+        partial = scan_document_stream(plan, doc_type, [text] if isinstance(text, str) else text, views,
+                                       time_budget, provider_catalog, triage)
+        scans[doc_type] = partial if partial["chars"] else None
     
-    # Debugging information
-    logger.info(f"Evidence collected: {sum(len(v) for v in analysis['_evidence'].values())} items")
-    for key, evidence_list in analysis["_evidence"].items():
-        if evidence_list:
-            logger.info(f"  {key}: {len(evidence_list)} items")
+    results = {view: _VIEW_REDUCERS[view](plan, scans, started) for view in views}
+    for view, result in results.items():
+        result["_decided_early"] = triage.decided_in(view)
+    return results
+
+def fix_analyze_ai_capabilities(texts, time_budget=None, provider_catalog=None):
+    """
+    Fixed version of analyze_ai_capabilities function to correctly calculate confidence levels
     
-    # If we found no evidence at all, there might be an extraction problem
-    if not any(analysis["_evidence"].values()):
-        logger.warning("No evidence found in any document! This suggests an extraction or pattern matching problem.")
-        analysis["concerns"].append("Analysis could not find relevant information in the provided documents.")
+    Results are memoised for MEMO_TTLS["analysis"] seconds, so analyzing the
+    same text again with the same rules returns at once.
     
-    # Log pattern locations for debugging
-    if pattern_locations:
-        logger.info("Pattern locations for debugging:")
-        for pattern, locations in pattern_locations.items():
-            logger.info(f"  {pattern}: {locations[:5]}")
+    Args:
+        texts: Dictionary mapping document types to their text content
+        time_budget: Seconds allowed per document (defaults to DOCUMENT_TIME_BUDGET,
+            0 disables the limit). A document that runs over keeps the findings
+            made so far and is listed in "_timed_out_documents".
+        provider_catalog: ProviderCatalog used to identify third-party AI
+            providers (defaults to the shared catalog)
     
-    # Add document insights summary to output
-    analysis["_document_insights"] = document_insights
+    Returns:
+        Dictionary containing comprehensive analysis results
+    """
+    memo = _memo["analysis"]
+    # Debug logging reports each match as it is found, so it always rescans
+    if memo.ttl <= 0 or analysis_logger.isEnabledFor(logging.DEBUG):
+        return analyze_documents(texts, ("full",), time_budget, provider_catalog)["full"]
+    
+    plan = get_execution_plan()
+    if time_budget is None:
+        time_budget = DOCUMENT_TIME_BUDGET
+    if provider_catalog is None:
+        provider_catalog = get_provider_catalog()
     
+    # The result is memoised under the hash of each document's text; streams
+    # are read whole to be hashed, if they are short enough to hold
+    texts = {doc_type: text if isinstance(text, str) or not text else _read_stream(text, ANALYSIS_CACHE_MAX_CHARS)
+             for doc_type, text in texts.items()}
+    if not all(isinstance(text, str) or not text for text in texts.values()):
+        return analyze_documents(texts, ("full",), time_budget, provider_catalog, plan)["full"]
+    key = json.dumps([_code_hash(), plan.compiled["rule_hash"], REGEX_ENGINE, provider_catalog.fingerprint, time_budget,
+                      [[doc_type, hashlib.sha256((text or "").encode("utf-8", "surrogatepass")).hexdigest()]
+                       for doc_type, text in texts.items()]])
+    
+    found, analysis = memo.get(key)
+    if found:
+        analysis_logger.info("Reusing memoised analysis of %d documents", len(texts))
+        return analysis
+    analysis = analyze_documents(texts, ("full",), time_budget, provider_catalog, plan)["full"]
+    # Analyses cut short by the time budget are not memoised
+    if "_timed_out_documents" not in analysis:
+        memo.put(key, analysis)
     return analysis
+
+def triage_ai_capabilities(texts, time_budget=None, provider_catalog=None):
+    """
+    Quick version of fix_analyze_ai_capabilities for triaging vendors.
+    
+    Each aspect with a "saturation" rule stops scanning once its flags and
+    confidence can't change any more, and the whole analysis stops when the
+    time budget is spent. The flags and confidence of decided aspects are
+    those of a full analysis; details such as the opt-out method or the
+    retention period only cover the text scanned before the aspect was
+    decided.
+    
+    Args:
+        texts: Dictionary mapping document types to their text content
+        time_budget: Seconds allowed for all documents together (defaults to
+            TRIAGE_TIME_BUDGET, 0 disables the limit). Documents cut short
+            or not reached are listed in "_timed_out_documents".
+        provider_catalog: ProviderCatalog used to identify third-party AI
+            providers (defaults to the shared catalog)
+    
+    Returns:
+        Dictionary containing the analysis results, with the aspects decided
+        early and the document that decided them in "_decided_early"
+    """
+    return analyze_documents(texts, ("full",), provider_catalog=provider_catalog,
+                             triage=True, triage_budget=time_budget)["full"]
+
+def document_features(texts, time_budget=None, provider_catalog=None):
+    """
+    Numeric feature vectors of vendor documents, for scoring with other models.
+    
+    The counts are taken while the documents are scanned, in the layout
+    described by feature_schema(); stacking the vectors of many documents
+    gives a matrix to score in one operation.
+    
+    Args:
+        texts: Dictionary mapping document types to their text content
+        time_budget: Seconds allowed per document (defaults to DOCUMENT_TIME_BUDGET,
+            0 disables the limit)
+        provider_catalog: ProviderCatalog used to identify third-party AI
+            providers (defaults to the shared catalog)
+    
+    Returns:
+        Dictionary mapping each document type to a float64 NumPy array
+        (all zeros for empty documents)
+    """
+    return analyze_documents(texts, ("features",), time_budget, provider_catalog)["features"]
+
+# Findings of fix_analyze_ai_capabilities that are not portfolio columns
+_PORTFOLIO_SKIPPED = ("confidence_levels", "document_coverage")
+
+def analyze_portfolio(frame, time_budget=None, provider_catalog=None, workers=None):
+    """
+    Analyze the documents of many vendors in one batch.
+    
+    The documents of every vendor are scanned together, spread over the
+    analysis process pool, and each vendor's scans are then merged as
+    fix_analyze_ai_capabilities would merge them. Pattern hit counts and
+    the share of hits found in an AI context are aggregated across the
+    portfolio as frames.
+    
+    Args:
+        frame: pandas DataFrame with "vendor", "doc_type" and "text" columns,
+            one row per document. Rows with the same vendor and document type
+            are joined into one document.
+        time_budget: Seconds allowed per document (defaults to DOCUMENT_TIME_BUDGET,
+            0 disables the limit)
+        provider_catalog: ProviderCatalog used to identify third-party AI
+            providers (defaults to the shared catalog)
+        workers: Processes to scan documents with (defaults to ANALYSIS_WORKERS
+            for portfolios of at least PARALLEL_MIN_CHARS)
+    
+    Returns:
+        DataFrame indexed by vendor, in order of first appearance, with each
+        finding of fix_analyze_ai_capabilities as a column, plus
+        "confidence.<key>" per confidence level, "hits.<aspect>" per
+        evidence-backed aspect's pattern matches and "ai_context.<aspect>"
+        for the share of those matches accepted as evidence
+    """
+    # Imported on first use, so that reviews of single vendors start without it
+    import pandas as pd
+    
+    started = time.perf_counter()
+    missing = {"vendor", "doc_type", "text"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"Portfolio frame is missing columns: {sorted(missing)}")
+    
+    plan = get_execution_plan()
+    if time_budget is None:
+        time_budget = DOCUMENT_TIME_BUDGET
+    if provider_catalog is None:
+        provider_catalog = get_provider_catalog()
+    
+    documents = (frame.assign(text=frame["text"].fillna("").astype(str))
+                 .groupby(["vendor", "doc_type"], sort=False)["text"].agg("\n\n".join))
+    scans = _scan_documents(plan, {key: (key[1], text) for key, text in documents.items()},
+                            ("full",), time_budget, provider_catalog, workers)
+    
+    # Merge each vendor's scans in document order
+    vendor_scans = {}
+    for (vendor, doc_type), partial in scans.items():
+        vendor_scans.setdefault(vendor, {})[doc_type] = partial
+    analyses = {vendor: _reduce_full(plan, vendor_scans[vendor], started) for vendor in vendor_scans}
+    
+    # Built as objects so that unknown findings stay None rather than NaN;
+    # only the columns that are always True or False become booleans
+    findings = pd.DataFrame(
+        [{key: value for key, value in analysis.items() if not key.startswith("_") and key not in _PORTFOLIO_SKIPPED}
+         for analysis in analyses.values()],
+        index=list(analyses), dtype=object)
+    findings = findings.astype({column: bool for column in findings.columns
+                                if all(isinstance(value, bool) for value in findings[column])})
+    findings["timed_out_documents"] = [analysis.get("_timed_out_documents", []) for analysis in analyses.values()]
+    confidence = pd.DataFrame.from_dict({vendor: analysis["confidence_levels"] for vendor, analysis in analyses.items()},
+                                        orient="index").add_prefix("confidence.")
+    
+    # Pattern hits and accepted evidence per vendor and aspect
+    evidence_keys = {aspect["name"]: aspect["evidence"] for aspect in plan.views["full"] if "evidence" in aspect}
+    hits = pd.DataFrame([(vendor, aspect, count) for (vendor, _), partial in scans.items() if partial
+                         for aspect, count in partial["match_counts"].items()],
+                        columns=["vendor", "aspect", "hits"])
+    hits = (hits.pivot_table(index="vendor", columns="aspect", values="hits", aggfunc="sum")
+            .reindex(index=findings.index, columns=list(evidence_keys)).fillna(0).astype(int))
+    evidence = pd.DataFrame.from_dict(
+        {vendor: {name: sum(analysis["_evidence_counts"][key].values()) for name, key in evidence_keys.items()}
+         for vendor, analysis in analyses.items()},
+        orient="index")
+    ai_context = (evidence / hits.where(hits > 0)).fillna(0.0)
+    
+    result = pd.concat([findings, confidence, hits.add_prefix("hits."), ai_context.add_prefix("ai_context.")], axis=1)
+    result.index.name = "vendor"
+    return result
+
 def is_context_ai_related(context, default_to_true=False):
     """
     Improved function to determine if a context is AI-related, with an option
@@ -1802,6 +3812,60 @@ def is_context_ai_related(context, default_to_true=False):
     
     return False
 
+# Evidence key behind each confidence level
+CONFIDENCE_EVIDENCE_KEYS = {
+    "opt_out": "opt_out_available",
+    "enterprise": "enterprise_opt_out",
+    "ai_native": "native_ai",
+    "third_party": "third_party_providers",
+    "data_retention": "data_retention",
+    "model_training": "model_training",
+    "model_sharing": "model_sharing",
+    "contractual": "contractual_protections"
+}
+
+def evidence_count_matrix(analysis):
+    """
+    Evidence key x document type counts of an analysis.
+    
+    Analyses made by fix_analyze_ai_capabilities carry the matrix in
+    "_evidence_counts"; for others it is rebuilt from the "[doc_type]"
+    prefixes of the evidence.
+    
+    Args:
+        analysis: The analysis results dictionary
+    
+    Returns:
+        Dictionary mapping evidence keys to {doc_type: count}
+    """
+    if "_evidence_counts" in analysis:
+        return analysis["_evidence_counts"]
+    
+    matrix = {}
+    for evidence_key, evidence_list in analysis.get("_evidence", {}).items():
+        counts = matrix.setdefault(evidence_key, {})
+        for evidence in evidence_list:
+            doc_type = evidence[1:evidence.find(']')] if evidence.startswith('[') and ']' in evidence else None
+            counts[doc_type] = counts.get(doc_type, 0) + 1
+    return matrix
+
+def rescore_confidence(analysis, formula=_evidence_confidence):
+    """
+    Recompute an analysis' confidence levels with another formula, from its
+    evidence counts alone.
+    
+    Args:
+        analysis: The analysis results dictionary
+        formula: Function of (evidence count, document type count) returning
+            a confidence between 0 and 1
+    
+    Returns:
+        Dictionary mapping each confidence key to its new level
+    """
+    evidence_counts = evidence_count_matrix(analysis)
+    return {confidence_key: count_confidence(evidence_counts.get(evidence_key, {}), formula) or 0.0
+            for evidence_key, confidence_key in CONFIDENCE_EVIDENCE_KEYS.items()}
+
 def direct_confidence_fix(analysis):
     """
     Direct fix for confidence levels when they're all zero despite evidence being collected.
@@ -1813,46 +3877,22 @@ def direct_confidence_fix(analysis):
     Returns:
         The updated analysis with corrected confidence levels
     """
+    evidence_counts = evidence_count_matrix(analysis)
+    
     # Check if we have evidence but zero confidence
-    has_evidence = any(len(items) > 0 for key, items in analysis.get("_evidence", {}).items())
+    has_evidence = any(evidence_counts.values())
     all_zero_confidence = all(value == 0.0 for value in analysis.get("confidence_levels", {}).values())
     
     if has_evidence and all_zero_confidence:
         print("Fixing zero confidence levels with direct fix...")
         
-        # Dictionary to map evidence keys to confidence keys
-        confidence_map = {
-            "opt_out": "opt_out_available",
-            "enterprise": "enterprise_opt_out", 
-            "ai_native": "native_ai",
-            "third_party": "third_party_providers",
-            "data_retention": "data_retention",
-            "model_training": "model_training",
-            "model_sharing": "model_sharing",
-            "contractual": "contractual_protections"
-        }
-        
-        # Calculate confidence levels directly from evidence
-        for evidence_key, confidence_key in confidence_map.items():
-            if evidence_key in analysis["_evidence"]:
-                evidence_list = analysis["_evidence"][evidence_key]
-                evidence_count = len(evidence_list)
-                
-                # Get unique document types
-                doc_types = set()
-                for evidence in evidence_list:
-                    if evidence.startswith('[') and ']' in evidence:
-                        doc_type = evidence[1:evidence.find(']')]
-                        doc_types.add(doc_type)
-                
-                doc_count = len(doc_types)
-                
-                # Calculate confidence based on evidence and document counts
-                if evidence_count > 0:
-                    # More evidence and document types = higher confidence
-                    confidence = min(1.0, (0.3 * evidence_count + 0.7 * doc_count) / 3)
-                    analysis["confidence_levels"][confidence_key] = confidence
-                    print(f"  {confidence_key}: {confidence:.2f} (based on {evidence_count} items from {doc_count} docs)")
+        # Calculate confidence levels directly from the evidence counts
+        for evidence_key, confidence_key in CONFIDENCE_EVIDENCE_KEYS.items():
+            counts = evidence_counts.get(evidence_key, {})
+            confidence = count_confidence(counts)
+            if confidence is not None:
+                analysis["confidence_levels"][confidence_key] = confidence
+                print(f"  {confidence_key}: {confidence:.2f} (based on {sum(counts.values())} items from {len(counts)} docs)")
     
     # Special case for "native_ai" inference from third-party providers
     if analysis.get("third_party_providers") and analysis["confidence_levels"].get("third_party_providers", 0) > 0:
@@ -1863,30 +3903,529 @@ def direct_confidence_fix(analysis):
     
     return analysis
 
-def review_vendor(vendor_url):
-    # Get document URLs
-    doc_urls = get_vendor_documentation(vendor_url)
+# Documents a review pipeline fetches at once, and items each of its queues holds
+PIPELINE_FETCH_WORKERS = int(os.environ.get("AI_REVIEW_FETCH_WORKERS", "8"))
+PIPELINE_QUEUE_SIZE = int(os.environ.get("AI_REVIEW_PIPELINE_QUEUE_SIZE", "16"))
+
+def _put_unless_stopped(outbox: queue.Queue, item, stop: threading.Event):
+    """Put an item on a bounded queue, waiting for room until stop is set"""
+    while not stop.is_set():
+        try:
+            outbox.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+def _pipeline_stage(work, inbox: queue.Queue, outbox: queue.Queue, threads: int, stop: threading.Event):
+    """
+    Start threads that call work(item, emit) for each item of inbox, emit
+    putting results on outbox. A None item ends the stage: the last thread
+    to finish passes it on to outbox.
+    """
+    running = [threads]
+    lock = threading.Lock()
     
-    # Extract text
-    doc_texts = {}
-    for doc_type, url in doc_urls.items():
-        if url:
+    def emit(item):
+        _put_unless_stopped(outbox, item, stop)
+    
+    def run():
+        while not stop.is_set():
             try:
-                doc_texts[doc_type] = extract_document_text(url)
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                # Leave the end marker for the other threads of the stage
+                inbox.put(None)
+                break
+            work(item, emit)
+        with lock:
+            running[0] -= 1
+            if not running[0]:
+                emit(None)
+    
+    for _ in range(threads):
+        threading.Thread(target=run, daemon=True).start()
+
+def review_pipeline(vendor_urls, time_budget=None, fetch_workers=None, queue_size=None):
+    """
+    Review vendors in overlapping stages connected by bounded queues.
+    
+    Discovery passes each document on to fetching as soon as it is found,
+    fetched pages go straight to extraction, and extracted text straight to
+    analysis, so network waits and analysis overlap and the run takes about
+    as long as its slowest stage. Each document is scanned on its own; a
+    vendor's scans are merged, in the order get_vendor_documentation lists
+    its documents, once the last one is in, so the result is the one
+    review_vendor has always given. Extracted text and scans are memoised
+    like those of extract_document_text and fix_analyze_ai_capabilities.
+    
+    Args:
+        vendor_urls: Vendor URLs to review
+        time_budget: Seconds allowed per document (defaults to DOCUMENT_TIME_BUDGET)
+        fetch_workers: Threads discovering and fetching documents (defaults
+            to PIPELINE_FETCH_WORKERS)
+        queue_size: Items each queue between stages holds (defaults to
+            PIPELINE_QUEUE_SIZE)
+    
+    Yields:
+        (vendor URL, analysis) as each vendor completes, or (vendor URL,
+        exception) for a vendor whose documents could not be discovered
+    """
+    started = time.perf_counter()
+    vendor_urls = list(vendor_urls)
+    plan = get_execution_plan()
+    provider_catalog = get_provider_catalog()
+    if time_budget is None:
+        time_budget = DOCUMENT_TIME_BUDGET
+    fetch_workers = fetch_workers or PIPELINE_FETCH_WORKERS
+    queue_size = queue_size or PIPELINE_QUEUE_SIZE
+    memo = _memo["analysis"]
+    cache = ScanCache("")
+    disk_cache = ScanCache(ANALYSIS_CACHE_DIR)
+    # Large documents are scanned in the shared pool; batch workers, whose
+    # ANALYSIS_WORKERS is 1, scan everything in the analysis thread
+    scan_workers = ANALYSIS_WORKERS or os.cpu_count() or 1
+    
+    stop = threading.Event()
+    vendors, to_fetch, to_extract, to_analyze = (queue.Queue(queue_size) for _ in range(4))
+    results = queue.SimpleQueue()
+    
+    def discover(index, emit):
+        try:
+            documents = iter_vendor_documentation(vendor_urls[index])
+            while True:
+                try:
+                    doc_type, url = next(documents)
+                except StopIteration as end:
+                    results.put(("documents", index, end.value))
+                    return
+                emit((index, doc_type, url))
+        except Exception as e:
+            logger.error("Error finding documents for %s: %s", vendor_urls[index], e)
+            results.put(("error", index, e))
+    
+    def fetch(item, emit):
+        index, doc_type, url = item
+        found, text = _memo["extraction"].get(url)
+        if found:
+            logger.info("Reusing extraction result for %s", url)
+            emit((index, doc_type, url, None, text))
+            return
+        logger.info("Extracting text from %s", url)
+        try:
+            emit((index, doc_type, url, _fetch_document(url), None))
+        except Exception as e:
+            logger.error("Error extracting text from %s: %s", url, e)
+            emit((index, doc_type, url, None, ""))
+    
+    def extract(item, emit):
+        index, doc_type, url, html, text = item
+        if text is None:
+            try:
+                text = _document_text(html)
+                logger.info("Extracted %d characters from %s", len(text), url)
+                if text:
+                    _memo["extraction"].put(url, text)
             except Exception as e:
-                print(f"Error extracting {doc_type}: {str(e)}")
+                logger.error("Error extracting text from %s: %s", url, e)
+                text = ""
+        emit((index, doc_type, text))
     
-    # Run the analysis
-    analysis = fix_analyze_ai_capabilities(doc_texts)
+    def scanned(index, doc_type, key, future):
+        """Pass on a scan from the pool, in the pool's result thread"""
+        try:
+            scan, records = future.result()
+        except Exception as e:
+            logger.error("Error analyzing %s of %s: %s", doc_type, vendor_urls[index], e)
+            results.put(("error", index, e))
+            return
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        if not scan["timed_out"]:
+            memo.put(key, scan)
+            if disk_cache.directory:
+                disk_cache.put(key, scan)
+        results.put(("scan", index, doc_type, scan))
     
-    # Apply the direct confidence fix
-    analysis = direct_confidence_fix(analysis)
+    def analyze(item, emit):
+        index, doc_type, text = item
+        scan = None
+        try:
+            if text:
+                # Scans are memoised by content; debug logging always rescans
+                key = cache.key(plan, provider_catalog, doc_type, text, ("full",))
+                found = False
+                debug = analysis_logger.isEnabledFor(logging.DEBUG)
+                if not debug:
+                    found, scan = memo.get(key)
+                if not found and scan_workers > 1 and len(text) >= PARALLEL_MIN_CHARS:
+                    scan = disk_cache.get(key) if disk_cache.directory and not debug else None
+                    if scan is None:
+                        # The analysis stage moves on while the pool scans the document
+                        future = _get_analysis_pool(scan_workers).submit(
+                            _scan_in_worker, plan.compiled, REGEX_ENGINE, analysis_logger.getEffectiveLevel(),
+                            provider_catalog, doc_type, text, ("full",), time_budget)
+                        future.add_done_callback(lambda future: scanned(index, doc_type, key, future))
+                        return
+                elif not found:
+                    scan = _scan_documents(plan, {doc_type: (doc_type, text)}, ("full",), time_budget,
+                                           provider_catalog, 1)[doc_type]
+                if not found and scan and not scan["timed_out"]:
+                    memo.put(key, scan)
+        except Exception as e:
+            logger.error("Error analyzing %s of %s: %s", doc_type, vendor_urls[index], e)
+            results.put(("error", index, e))
+            return
+        results.put(("scan", index, doc_type, scan))
+    
+    _pipeline_stage(discover, vendors, to_fetch, min(fetch_workers, max(len(vendor_urls), 1)), stop)
+    _pipeline_stage(fetch, to_fetch, to_extract, fetch_workers, stop)
+    _pipeline_stage(extract, to_extract, to_analyze, 1, stop)
+    _pipeline_stage(analyze, to_analyze, queue.Queue(), 1, stop)
+    
+    def feed():
+        for index in range(len(vendor_urls)):
+            _put_unless_stopped(vendors, index, stop)
+        _put_unless_stopped(vendors, None, stop)
+    threading.Thread(target=feed, daemon=True).start()
+    
+    # Merge each vendor once its document list and every document's scan are in
+    documents = {}
+    scans = {index: {} for index in range(len(vendor_urls))}
+    finished = set()
+    try:
+        while len(finished) < len(vendor_urls):
+            event = results.get()
+            kind, index = event[0], event[1]
+            if index in finished:
+                continue
+            if kind == "error":
+                finished.add(index)
+                yield vendor_urls[index], event[2]
+                continue
+            if kind == "documents":
+                documents[index] = event[2]
+            else:
+                scans[index][event[2]] = event[3]
+            if index not in documents:
+                continue
+            doc_types = [doc_type for doc_type, url in documents[index].items() if url]
+            if all(doc_type in scans[index] for doc_type in doc_types):
+                analysis = _reduce_full(plan, {doc_type: scans[index][doc_type] for doc_type in doc_types}, started)
+                finished.add(index)
+                yield vendor_urls[index], direct_confidence_fix(analysis)
+    finally:
+        stop.set()
+
+def review_vendor(vendor_url, triage=False):
+    # A triage reads the documents in order, so what one settles stops the scan of the next
+    if triage:
+        doc_urls = get_vendor_documentation(vendor_url)
+        
+        # Extract text as it is analyzed, so large documents never sit in memory whole
+        doc_texts = {}
+        for doc_type, url in doc_urls.items():
+            if url:
+                doc_texts[doc_type] = iter_document_text(url)
+        
+        return direct_confidence_fix(triage_ai_capabilities(doc_texts))
     
+    # Otherwise each document is fetched, extracted and analyzed as soon as it is found
+    [(_, analysis)] = review_pipeline([vendor_url])
+    if isinstance(analysis, Exception):
+        raise analysis
     return analysis
 
+# Connections an async review session opens at once, in all and per host
+ASYNC_CONNECTION_LIMIT = int(os.environ.get("AI_REVIEW_ASYNC_CONNECTIONS", "100"))
+ASYNC_CONNECTIONS_PER_HOST = int(os.environ.get("AI_REVIEW_ASYNC_CONNECTIONS_PER_HOST", "8"))
+
+class _FetchedPage(namedtuple("_FetchedPage", "url status_code text")):
+    """A page fetched by the async API, with the requests.Response attributes discovery uses"""
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+@asynccontextmanager
+async def review_session(limit: int = ASYNC_CONNECTION_LIMIT, limit_per_host: int = ASYNC_CONNECTIONS_PER_HOST):
+    """
+    Open a connection pool to share between async review calls.
+    
+    Args:
+        limit: Connections open at once
+        limit_per_host: Connections open at once to any one host
+    """
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        yield session
+
+@asynccontextmanager
+async def _session_scope(session):
+    """Use the caller's session, or a session of our own for one call"""
+    if session is not None:
+        yield session
+        return
+    async with review_session() as session:
+        yield session
+
+async def _async_get(session, url: str, timeout: float, headers: Optional[Dict[str, str]] = None):
+    """Fetch a URL without blocking the event loop"""
+    async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        return _FetchedPage(str(response.url), response.status, await response.text(errors="replace"))
+
+async def _async_fetch_steps(steps, session):
+    """Run discovery steps (see _fetch_steps) with non-blocking requests and return their result"""
+    reply, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(reply)
+        except StopIteration as end:
+            return end.value
+        reply, error = None, None
+        if step[0] == "fetch":
+            try:
+                reply = await _async_get(session, step[1], step[2])
+            except Exception as e:
+                error = e
+
+async def async_scrape_vendor_documentation(vendor_url: str, session=None) -> Dict[str, Optional[str]]:
+    """
+    Async version of scrape_vendor_documentation.
+    
+    Args:
+        vendor_url: The base URL for the vendor's website
+        session: Connection pool from review_session() (defaults to one for this call)
+    
+    Returns:
+        Dictionary mapping document types to URLs
+    """
+    async with _session_scope(session) as session:
+        return await _async_fetch_steps(_scrape_steps(vendor_url), session)
+
+async def async_get_vendor_documentation(vendor_url: str, session=None) -> Dict[str, Optional[str]]:
+    """
+    Async version of get_vendor_documentation.
+    
+    Args:
+        vendor_url: The vendor's URL
+        session: Connection pool from review_session() (defaults to one for this call)
+    
+    Returns:
+        Dictionary of document types mapped to their URLs
+    """
+    async with _session_scope(session) as session:
+        return await _async_fetch_steps(_vendor_documentation_steps(vendor_url), session)
+
+async def async_extract_document_text(url: str, session=None) -> str:
+    """
+    Async version of extract_document_text; parsing runs in a thread.
+    
+    Args:
+        url: URL of the document to extract text from
+        session: Connection pool from review_session() (defaults to one for this call)
+    
+    Returns:
+        Cleaned text content
+    """
+    found, text = _memo["extraction"].get(url)
+    if found:
+        logger.info("Reusing extraction result for %s", url)
+        return text
+    logger.info("Extracting text from %s", url)
+    
+    try:
+        async with _session_scope(session) as session:
+            response = await _async_get(session, url, 15, _FETCH_HEADERS)
+        response.raise_for_status()
+        text = await asyncio.to_thread(_document_text, response.text)
+        logger.info("Extracted %d characters from %s", len(text), url)
+    except Exception as e:
+        logger.error("Error extracting text from %s: %s", url, e)
+        return ""
+    if text:
+        _memo["extraction"].put(url, text)
+    return text
+
+async def async_review_vendor(vendor_url: str, triage: bool = False, session=None) -> Dict[str, Any]:
+    """
+    Async version of review_vendor.
+    
+    The vendor's documents are fetched concurrently and analyzed in a
+    thread, so the event loop keeps serving other reviews meanwhile.
+    
+    Args:
+        vendor_url: The vendor's URL
+        triage: Run a triage review (see triage_ai_capabilities)
+        session: Connection pool from review_session() (defaults to one for this call)
+    
+    Returns:
+        The review_vendor analysis
+    """
+    async with _session_scope(session) as session:
+        doc_urls = await async_get_vendor_documentation(vendor_url, session)
+        doc_urls = {doc_type: url for doc_type, url in doc_urls.items() if url}
+        texts = await asyncio.gather(*(async_extract_document_text(url, session) for url in doc_urls.values()))
+    
+    analyze = triage_ai_capabilities if triage else fix_analyze_ai_capabilities
+    analysis = await asyncio.to_thread(analyze, dict(zip(doc_urls, texts)))
+    return direct_confidence_fix(analysis)
+
+async def async_review_vendors(vendor_urls, triage: bool = False, concurrency: int = 100,
+                               session=None) -> Dict[str, Any]:
+    """
+    Review many vendors concurrently on one event loop.
+    
+    Args:
+        vendor_urls: Vendor URLs to review
+        triage: Run triage reviews
+        concurrency: Vendors reviewed at once
+        session: Connection pool from review_session() (defaults to one for all the reviews)
+    
+    Returns:
+        Dictionary mapping each vendor URL to its analysis, or to the
+        exception its review raised
+    """
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def review(vendor_url):
+        async with slots:
+            return await async_review_vendor(vendor_url, triage, session)
+    
+    async with _session_scope(session) as session:
+        vendor_urls = list(dict.fromkeys(vendor_urls))
+        results = await asyncio.gather(*(review(vendor_url) for vendor_url in vendor_urls), return_exceptions=True)
+    return dict(zip(vendor_urls, results))
+
+# Processes a batch review runs vendors in; 0 uses the CPU count
+BATCH_WORKERS = int(os.environ.get("AI_REVIEW_BATCH_WORKERS", "0"))
 
+def _init_batch_worker():
+    """Start a batch worker, which scans each vendor's documents itself rather than in a pool of its own"""
+    global ANALYSIS_WORKERS
+    _init_scan_worker()
+    ANALYSIS_WORKERS = 1
 
+def _review_record(vendor_url: str, triage: bool) -> Dict[str, Any]:
+    """Review one vendor for a batch, reporting a failure in the record instead of raising it"""
+    started = time.perf_counter()
+    record = {"url": vendor_url, "analysis": None, "error": None}
+    try:
+        record["analysis"] = review_vendor(vendor_url, triage)
+    except Exception as e:
+        logger.error("Error reviewing %s: %s", vendor_url, e)
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed"] = round(time.perf_counter() - started, 3)
+    return record
 
+def _review_in_worker(vendor_url: str, triage: bool, level: int):
+    """Review one vendor in a batch worker; returns its record and log records"""
+    logger.setLevel(level)
+    record = _review_record(vendor_url, triage)
+    records = []
+    while not _worker_log_queue.empty():
+        records.append(_worker_log_queue.get_nowait())
+    return record, records
 
+def read_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the vendor records of a batch checkpoint, the latest one for each URL.
+    
+    A line cut short by an interrupted run is ignored.
+    """
+    records = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record["url"]] = record
+    except FileNotFoundError:
+        pass
+    return records
 
-        
\ No newline at end of file
+def review_vendors(vendor_urls, checkpoint_path=None, workers=None, triage=False):
+    """
+    Review many vendors across a process pool.
+    
+    Each vendor is reviewed by review_vendor() in a worker process, and its
+    record is appended to the checkpoint file as a JSON line as soon as it
+    completes. Vendors already reviewed in the checkpoint are not reviewed
+    again, so a crashed or interrupted batch run again with the same
+    checkpoint resumes where it stopped; vendors that failed are retried.
+    
+    Args:
+        vendor_urls: Vendor URLs to review
+        checkpoint_path: JSON Lines checkpoint file (None keeps no checkpoint)
+        workers: Processes to review with (defaults to BATCH_WORKERS, 1
+            reviews in process)
+        triage: Run triage reviews (see triage_ai_capabilities)
+    
+    Returns:
+        Tuple of the records of the vendors in order, each with its "url",
+        "analysis", "error" and "elapsed" seconds, and the throughput of
+        the run: "vendors", "resumed", "reviewed", "failed", "elapsed"
+        seconds and "vendors_per_minute"
+    """
+    started = time.perf_counter()
+    vendor_urls = list(dict.fromkeys(vendor_urls))
+    done = {url: record for url, record in read_checkpoint(checkpoint_path).items()
+            if not record["error"]} if checkpoint_path else {}
+    pending = [url for url in vendor_urls if url not in done]
+    resumed = len(vendor_urls) - len(pending)
+    if resumed:
+        logger.info("Resuming batch: %d of %d vendors already reviewed", resumed, len(vendor_urls))
+    
+    if workers is None:
+        workers = BATCH_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, len(pending)))
+    
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    
+    def complete(record):
+        done[record["url"]] = record
+        if checkpoint:
+            checkpoint.write(json.dumps(record) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        logger.info("Reviewed %s (%d/%d)%s", record["url"], len(done), len(vendor_urls),
+                    f": {record['error']}" if record["error"] else "")
+    
+    try:
+        if workers == 1:
+            for url in pending:
+                complete(_review_record(url, triage))
+        else:
+            level = logger.getEffectiveLevel()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker) as pool:
+                futures = [pool.submit(_review_in_worker, url, triage, level) for url in pending]
+                try:
+                    for future in as_completed(futures):
+                        record, records = future.result()
+                        for log_record in records:
+                            logging.getLogger(log_record.name).handle(log_record)
+                        complete(record)
+                except BaseException:
+                    # Interrupted: the reviews still running are lost, the rest never start
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+    finally:
+        if checkpoint:
+            checkpoint.close()
+    
+    elapsed = time.perf_counter() - started
+    records = [done[url] for url in vendor_urls]
+    stats = {
+        "vendors": len(vendor_urls),
+        "resumed": resumed,
+        "reviewed": len(pending),
+        "failed": sum(1 for record in records if record["error"]),
+        "elapsed": round(elapsed, 3),
+        "vendors_per_minute": round(len(pending) * 60 / elapsed, 2) if elapsed and pending else 0.0,
+    }
+    logger.info("Batch complete: %d vendors reviewed in %.1fs (%.2f per minute), %d resumed, %d failed",
+                stats["reviewed"], elapsed, stats["vendors_per_minute"], resumed, stats["failed"])
+    return records, stats
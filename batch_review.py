@@ -0,0 +1,107 @@
+# batch_review.py
+"""
+Review a list of vendors in one run.
+
+Reads vendor URLs from a CSV file (a "url" column, or the first column) or a
+JSON file (a list of URLs, or of objects with a "url" like TEST_VENDORS),
+reviews them across a process pool and writes the findings as JSON or CSV.
+Each completed vendor is checkpointed, so running the same command again
+after a crash or Ctrl-C resumes where the run stopped.
+
+    python batch_review.py vendors.csv --output results.csv --workers 8
+"""
+import argparse
+import csv
+import json
+import logging
+import sys
+
+from ai_review import configure_logging, review_vendors
+
+def load_vendor_list(path):
+    """
+    Load vendor URLs from a CSV or JSON file.
+    
+    Args:
+        path: CSV file with a "url" column (otherwise the first column holds
+            the URLs), or JSON file with a list of URLs or of {"url": ...}
+            objects
+    
+    Returns:
+        List of vendor URLs, in file order
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".json"):
+            entries = json.load(f)
+            return [entry["url"] if isinstance(entry, dict) else entry for entry in entries]
+        
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "url" in header:
+        column = header.index("url")
+        return [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+    return [row[0].strip() for row in rows]
+
+def write_results(records, stats, path):
+    """
+    Write batch review records as JSON (with the run's throughput) or, for
+    a .csv path, as one row per vendor with its public findings.
+    """
+    if not path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stats": stats, "vendors": records}, f, indent=2)
+        return
+    
+    # Imported for CSV output only, so that queue and shard processes start without it
+    import pandas as pd
+    
+    rows = []
+    for record in records:
+        row = {"url": record["url"], "error": record["error"], "elapsed": record["elapsed"]}
+        # Evidence and other underscore keys are only in the JSON output
+        findings = {key: value for key, value in (record["analysis"] or {}).items() if not key.startswith("_")}
+        row.update(pd.json_normalize(findings).iloc[0].to_dict() if findings else {})
+        rows.append(row)
+    frame = pd.DataFrame(rows)
+    for column in frame.columns:
+        frame[column] = frame[column].map(lambda value: "; ".join(map(str, value)) if isinstance(value, list) else value)
+    frame.to_csv(path, index=False)
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Review a list of vendors for AI capabilities")
+    parser.add_argument("vendors", help="CSV or JSON file listing vendor URLs")
+    parser.add_argument("--output", default="batch_results.json",
+                        help="Results file; .csv writes one row per vendor, anything else JSON")
+    parser.add_argument("--checkpoint", help="Checkpoint file (defaults to the output path + .checkpoint.jsonl)")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to AI_REVIEW_BATCH_WORKERS or the CPU count)")
+    parser.add_argument("--triage", action="store_true", help="Run quick triage reviews")
+    parser.add_argument("--log-file", default="ai_review.log", help="Log file")
+    return parser.parse_args()
+
+def main():
+    """Main entry point for batch reviews"""
+    args = parse_args()
+    configure_logging(logging.INFO, log_file=args.log_file, console=False)
+    
+    vendor_urls = load_vendor_list(args.vendors)
+    checkpoint = args.checkpoint or args.output + ".checkpoint.jsonl"
+    print(f"Reviewing {len(vendor_urls)} vendors (checkpoint: {checkpoint})")
+    
+    try:
+        records, stats = review_vendors(vendor_urls, checkpoint, args.workers, args.triage)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; completed vendors are saved in {checkpoint}. Run the same command to resume.")
+        return 130
+    
+    write_results(records, stats, args.output)
+    print(f"Reviewed {stats['reviewed']} vendors in {stats['elapsed']:.1f}s "
+          f"({stats['vendors_per_minute']:.2f} per minute); {stats['resumed']} resumed from the checkpoint, "
+          f"{stats['failed']} failed")
+    print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 # debug_evidence.py
-from ai_review import get_vendor_documentation, extract_document_text, fix_analyze_ai_capabilities
+from ai_review import get_vendor_documentation, extract_document_text, fix_analyze_ai_capabilities, configure_logging, get_execution_plan
 
 def debug_evidence_collection(vendor_url):
     print(f"Debugging evidence collection for {vendor_url}")
@@ -32,28 +32,18 @@ def debug_evidence_collection(vendor_url):
     # Analyze with specific debugging
     print("\nRunning analysis with explicit pattern matching debug...")
     
-    # Define common patterns from the analysis function
-    patterns = {
-        "opt_out": r'opt[-\s]?out|disable|turn off|deactivate',
-        "enterprise": r'enterprise|admin|administrator|organization|tenant',
-        "ai_native": r'built[-\s]?in|native|proprietary|our (own|model)',
-        "third_party": r'third[-\s]?party|partner|OpenAI|Azure|Google|AWS',
-        "data_retention": r'retain|store|save|keep|preserve',
-        "model_training": r'train|learn|improve|enhance',
-        "model_sharing": r'share|distribute|provide to|made available',
-        "contractual": r'contract|agreement|prohibit|restrict|prevent'
-    }
+    # Use the same rules as the analysis: the aspects that apply to each document
+    plan = get_execution_plan()
     
     # Check direct pattern matches in documents
-    import re
     for doc_type, text in doc_texts.items():
         if not text:
             continue
             
         print(f"\nChecking pattern matches in {doc_type}:")
-        for pattern_name, pattern in patterns.items():
-            matches = list(re.finditer(pattern, text, re.IGNORECASE))
-            print(f"  {pattern_name}: {len(matches)} matches")
+        for aspect in plan.aspects("full", doc_type):
+            matches = list(plan.patterns[aspect["pattern"]].finditer(text))
+            print(f"  {aspect['name']}: {len(matches)} matches")
             
             # Show first match context if found
             if matches:
@@ -83,4 +73,5 @@ def debug_evidence_collection(vendor_url):
     return analysis
 
 if __name__ == "__main__":
+    configure_logging()
     debug_evidence_collection("https://www.microsoft.com")
\ No newline at end of file
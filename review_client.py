@@ -0,0 +1,95 @@
+# review_client.py
+"""
+Lightweight client for the review daemon.
+
+Sends review requests over the daemon's Unix socket, so each run pays for
+neither importing the analyzer nor connecting to vendor sites afresh:
+
+    python review_daemon.py &
+    python review_client.py https://www.microsoft.com --triage
+
+Only the standard library is imported here, keeping the client's own
+startup in the milliseconds.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Unix socket the daemon listens on
+DAEMON_SOCKET = os.environ.get("AI_REVIEW_SOCKET") or os.path.join(tempfile.gettempdir(), f"ai_review-{os.getuid()}.sock")
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon could not serve a request"""
+
+def send_request(request, socket_path=None, timeout=None):
+    """
+    Send one request to the review daemon and wait for its reply.
+    
+    Args:
+        request: Request object, such as {"op": "review", "url": ..., "triage": False}
+        socket_path: The daemon's socket (defaults to DAEMON_SOCKET)
+        timeout: Seconds to wait for the reply (None waits until it arrives)
+    
+    Returns:
+        The reply's result
+    
+    Raises:
+        OSError: If no daemon is listening on the socket
+        DaemonError: If the daemon failed to serve the request
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or DAEMON_SOCKET)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as replies:
+            reply = json.loads(replies.readline() or b"null")
+    if not reply:
+        raise DaemonError("The daemon closed the connection without replying")
+    if not reply["ok"]:
+        raise DaemonError(reply["error"])
+    return reply["result"]
+
+def review(vendor_url, triage=False, socket_path=None, timeout=None):
+    """Review a vendor in the daemon, returning the same analysis as review_vendor"""
+    return send_request({"op": "review", "url": vendor_url, "triage": triage}, socket_path, timeout)
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Review a vendor through the review daemon")
+    parser.add_argument("url", nargs="?", help="Vendor URL to review")
+    parser.add_argument("--triage", action="store_true", help="Run a quick triage review")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="The daemon's Unix socket")
+    parser.add_argument("--timeout", type=float, help="Seconds to wait for the result")
+    parser.add_argument("--stats", action="store_true", help="Print the daemon's statistics instead")
+    parser.add_argument("--shutdown", action="store_true", help="Stop the daemon")
+    return parser.parse_args()
+
+def main():
+    """Main entry point for the review client"""
+    args = parse_args()
+    if args.shutdown:
+        request = {"op": "shutdown"}
+    elif args.stats or not args.url:
+        request = {"op": "stats"}
+    else:
+        request = {"op": "review", "url": args.url, "triage": args.triage}
+    
+    try:
+        result = send_request(request, args.socket, args.timeout)
+    except TimeoutError:
+        print(f"No reply from the review daemon within {args.timeout}s", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"No review daemon on {args.socket} ({e}); start one with: python review_daemon.py", file=sys.stderr)
+        return 2
+    except DaemonError as e:
+        print(f"Review failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
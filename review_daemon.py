@@ -0,0 +1,164 @@
+# review_daemon.py
+"""
+Long-running review daemon.
+
+Imports the analyzer, compiles its patterns and opens a connection pool
+once, then serves reviews to review_client.py over a Unix socket. Memoised
+discovery, extraction and analysis results stay warm between requests, so
+a repeat review returns in milliseconds.
+
+    python review_daemon.py --socket /tmp/ai_review.sock
+
+Each request is one JSON line ({"op": "review", "url": ..., "triage": false},
+{"op": "stats"} or {"op": "shutdown"}), answered by one JSON line with
+"ok" and either "result" or "error". A connection may send several.
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_review import (
+    PIPELINE_FETCH_WORKERS,
+    configure_logging,
+    get_execution_plan,
+    get_provider_catalog,
+    memo_stats,
+    review_vendor,
+    set_host_concurrency,
+    set_http_session,
+)
+from review_client import DAEMON_SOCKET
+
+logger = logging.getLogger("ai_review.daemon")
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serve the JSON-line requests of one client connection"""
+    
+    def handle(self):
+        for line in self.rfile:
+            started = time.perf_counter()
+            try:
+                request = json.loads(line)
+                reply = {"ok": True, "result": self.server.dispatch(request)}
+            except Exception as e:
+                logger.error("Request %r failed: %s", line[:200], e)
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            reply["elapsed"] = round(time.perf_counter() - started, 6)
+            self.wfile.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+class ReviewDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix socket server that reviews vendors with warm patterns, connection
+    pools and memo caches.
+    
+    Args:
+        socket_path: Path of the socket to listen on; a stale socket left by
+            a daemon that did not shut down cleanly is replaced
+    
+    Raises:
+        RuntimeError: If another daemon is already listening on the path
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str = DAEMON_SOCKET):
+        _remove_stale_socket(socket_path)
+        self.socket_path = socket_path
+        self.started = time.time()
+        self.requests = 0
+        self._count_lock = threading.Lock()
+        super().__init__(socket_path, _RequestHandler)
+        # Only the daemon's user may send it requests
+        os.chmod(socket_path, 0o600)
+        self.session = warm_up()
+    
+    def dispatch(self, request):
+        """Serve one request, returning its result"""
+        with self._count_lock:
+            self.requests += 1
+        op = request.get("op")
+        if op == "review":
+            return review_vendor(request["url"], bool(request.get("triage", False)))
+        if op == "stats":
+            return {"pid": os.getpid(), "uptime": round(time.time() - self.started, 3),
+                    "requests": self.requests, "memo": memo_stats()}
+        if op == "shutdown":
+            # shutdown() waits for serve_forever, which waits for this handler
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"pid": os.getpid()}
+        raise ValueError(f"Unknown op: {op!r}")
+    
+    def server_close(self):
+        super().server_close()
+        set_http_session(None)
+        self.session.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+def _remove_stale_socket(socket_path: str):
+    """Remove a socket file nobody listens on, refusing to replace a live daemon"""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f"A review daemon is already listening on {socket_path}")
+
+def warm_up() -> requests.Session:
+    """
+    Compile the analyzer's patterns, load the provider catalog and open the
+    connection pool that reviews share.
+    
+    Returns:
+        The shared session, installed with set_http_session
+    """
+    started = time.perf_counter()
+    get_execution_plan()
+    get_provider_catalog()
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=64, pool_maxsize=PIPELINE_FETCH_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    set_http_session(session)
+    logger.info("Warmed up in %.3fs", time.perf_counter() - started)
+    return session
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Serve vendor reviews over a Unix socket")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="Unix socket to listen on")
+    parser.add_argument("--per-host", type=int, default=0,
+                        help="Requests sent to any one vendor host at once (0 leaves them unbounded)")
+    parser.add_argument("--log-file", default="ai_review.log", help="Log file")
+    return parser.parse_args()
+
+def main():
+    """Main entry point for the review daemon"""
+    args = parse_args()
+    configure_logging(logging.INFO, log_file=args.log_file, console=False)
+    set_host_concurrency(args.per_host)
+    
+    daemon = ReviewDaemon(args.socket)
+    print(f"Review daemon listening on {args.socket} (pid {os.getpid()})")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+
+if __name__ == "__main__":
+    main()
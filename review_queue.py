@@ -0,0 +1,371 @@
+# review_queue.py
+"""
+Durable vendor review queue on a local SQLite database.
+
+Any number of worker processes, on this machine or others sharing the
+filesystem, pull reviews from one database file. No broker is needed.
+Workers lease a job for a limited time and keep renewing the lease while
+the review runs. A worker that dies simply lets its lease expire, and the
+job goes to another worker. Failed reviews are retried with exponential
+backoff, and jobs that keep failing are moved to the dead-letter state
+for inspection.
+
+    python review_queue.py enqueue vendors.csv --db reviews.db --priority 5
+    python review_queue.py work --db reviews.db --workers 8
+    python review_queue.py stats --db reviews.db
+    python review_queue.py results --db reviews.db --output results.csv
+    python review_queue.py requeue --db reviews.db
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ai_review import _init_batch_worker, configure_logging, review_vendor
+from batch_review import load_vendor_list, write_results
+
+logger = logging.getLogger("ai_review.queue")
+
+# Seconds a worker holds a job before another worker may take it over
+QUEUE_LEASE_SECONDS = float(os.environ.get("AI_REVIEW_QUEUE_LEASE", "300"))
+
+# Attempts at a job before it is dead-lettered
+QUEUE_MAX_ATTEMPTS = int(os.environ.get("AI_REVIEW_QUEUE_MAX_ATTEMPTS", "3"))
+
+# Delay before the first retry, doubled for each later one
+QUEUE_BACKOFF_SECONDS = float(os.environ.get("AI_REVIEW_QUEUE_BACKOFF", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    triage INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    result TEXT,
+    elapsed REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, available_at, id);
+"""
+
+class ReviewQueue:
+    """
+    Vendor review jobs in a SQLite database shared by worker processes.
+    
+    Jobs are "queued", "leased", "done" or "dead". Workers lease the ready
+    job with the highest priority (oldest first among equals). Leases expire
+    unless they are renewed, and only the job's current lease holder may
+    complete or fail it.
+    
+    Args:
+        path: Database file; created with its schema if missing
+        lease_seconds: Seconds a lease lasts unless renewed
+        max_attempts: Attempts at a job before it is dead-lettered
+        backoff: Seconds before the first retry, doubled for each later one
+    """
+    
+    def __init__(self, path: str, lease_seconds: float = QUEUE_LEASE_SECONDS,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS, backoff: float = QUEUE_BACKOFF_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        # Autocommit mode; writes take the database lock with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL lets workers read while another one writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+    
+    def _write(self, statements):
+        """Run (sql, parameters) pairs in one write transaction, returning their row counts"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                counts = [self._db.execute(sql, parameters).rowcount for sql, parameters in statements]
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return counts
+    
+    def enqueue(self, vendor_urls, priority: int = 0, triage: bool = False) -> int:
+        """
+        Add review jobs for vendors.
+        
+        Args:
+            vendor_urls: Vendor URLs to review
+            priority: Higher priorities are leased first
+            triage: Run triage reviews
+        
+        Returns:
+            Number of jobs added
+        """
+        now = time.time()
+        insert = ("INSERT INTO jobs (url, triage, priority, available_at, created, updated) "
+                  "VALUES (?, ?, ?, ?, ?, ?)")
+        return sum(self._write([(insert, (url, int(triage), priority, now, now, now)) for url in vendor_urls]))
+    
+    def lease(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next ready job: the queued job (or expired lease) with the
+        highest priority whose retry time has come.
+        
+        Expired leases count as failed attempts, so a job that keeps killing
+        its workers is dead-lettered rather than retried forever.
+        
+        Args:
+            worker: Identifier of the leasing worker
+        
+        Returns:
+            The job's id, url, triage flag, priority and attempt number, or
+            None if no job is ready
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'dead', error = 'Lease expired', lease_owner = NULL, updated = ? "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts))
+                row = self._db.execute(
+                    "SELECT id, url, triage, priority, attempts FROM jobs "
+                    "WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY priority DESC, available_at, id LIMIT 1", (now, now)).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                        "lease_expires = ?, updated = ? WHERE id = ?",
+                        (worker, now + self.lease_seconds, now, row["id"]))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        if row is None:
+            return None
+        return {"id": row["id"], "url": row["url"], "triage": bool(row["triage"]), "priority": row["priority"],
+                "attempt": row["attempts"] + 1}
+    
+    def renew(self, job_id: int, worker: str) -> bool:
+        """Extend a worker's lease on a job; False if the worker no longer holds it"""
+        now = time.time()
+        [count] = self._write([("UPDATE jobs SET lease_expires = ?, updated = ? "
+                                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                (now + self.lease_seconds, now, job_id, worker))])
+        return count == 1
+    
+    def complete(self, job_id: int, worker: str, analysis: Dict[str, Any], elapsed: float = None) -> bool:
+        """Store a job's result; False if the worker's lease was lost to another worker"""
+        [count] = self._write([("UPDATE jobs SET status = 'done', result = ?, elapsed = ?, error = NULL, "
+                                "lease_owner = NULL, updated = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                (json.dumps(analysis, default=str), elapsed, time.time(), job_id, worker))])
+        return count == 1
+    
+    def fail(self, job_id: int, worker: str, error: str) -> Optional[str]:
+        """
+        Record a failed attempt at a job, scheduling a retry after an
+        exponential backoff or dead-lettering the job after its last attempt.
+        
+        Returns:
+            The job's new status ("queued" or "dead"), or None if the worker's
+            lease was lost to another worker
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                   (job_id, worker)).fetchone()
+        if row is None:
+            return None
+        if row["attempts"] >= self.max_attempts:
+            status, available_at = "dead", now
+        else:
+            # Jitter keeps workers from retrying a struggling site in lockstep
+            delay = self.backoff * 2 ** (row["attempts"] - 1)
+            status, available_at = "queued", now + delay * random.uniform(0.8, 1.2)
+        [count] = self._write([("UPDATE jobs SET status = ?, available_at = ?, error = ?, lease_owner = NULL, "
+                                "updated = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                (status, available_at, error, now, job_id, worker))])
+        return status if count == 1 else None
+    
+    def requeue(self, job_ids: Optional[List[int]] = None) -> int:
+        """Return dead-lettered jobs (all, or those listed) to the queue with fresh attempts"""
+        now = time.time()
+        sql = "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated = ? WHERE status = 'dead'"
+        if job_ids is None:
+            return self._write([(sql, (now, now))])[0]
+        return sum(self._write([(sql + " AND id = ?", (now, now, job_id)) for job_id in job_ids]))
+    
+    def pending(self) -> int:
+        """Number of jobs not yet done or dead"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')").fetchone()[0]
+    
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+    
+    def jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Jobs in id order, all of them or those with one status.
+        
+        Returns:
+            Job dictionaries; "analysis" holds a done job's result
+        """
+        sql = "SELECT * FROM jobs" + (" WHERE status = ?" if status else "") + " ORDER BY id"
+        with self._lock:
+            rows = self._db.execute(sql, (status,) if status else ()).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["triage"] = bool(job["triage"])
+            job["analysis"] = json.loads(job.pop("result")) if job["result"] else None
+            jobs.append(job)
+        return jobs
+    
+    def close(self):
+        self._db.close()
+
+def run_worker(path: str, worker: Optional[str] = None, wait: bool = False, poll: float = 1.0,
+               lease_seconds: float = QUEUE_LEASE_SECONDS) -> int:
+    """
+    Review vendors from a queue until it is drained.
+    
+    While a review runs, a background thread renews its lease every third of
+    the lease time, so long reviews are not taken over by other workers.
+    
+    Args:
+        path: Queue database file
+        worker: Worker identifier (defaults to host:pid)
+        wait: Keep polling for new jobs instead of returning once no job is
+            queued or leased
+        poll: Seconds between polls while no job is ready
+        lease_seconds: Seconds a lease lasts unless renewed
+    
+    Returns:
+        Number of jobs this worker completed
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    queue = ReviewQueue(path, lease_seconds=lease_seconds)
+    completed = 0
+    try:
+        while True:
+            job = queue.lease(worker)
+            if job is None:
+                if not wait and queue.pending() == 0:
+                    return completed
+                time.sleep(poll)
+                continue
+            
+            logger.info("Worker %s reviewing %s (attempt %d)", worker, job["url"], job["attempt"])
+            done = threading.Event()
+            
+            def renew_lease():
+                while not done.wait(lease_seconds / 3):
+                    if not queue.renew(job["id"], worker):
+                        logger.warning("Worker %s lost its lease on %s", worker, job["url"])
+                        return
+            
+            renewer = threading.Thread(target=renew_lease, daemon=True)
+            renewer.start()
+            started = time.perf_counter()
+            try:
+                analysis = review_vendor(job["url"], job["triage"])
+            except Exception as e:
+                done.set()
+                status = queue.fail(job["id"], worker, f"{type(e).__name__}: {e}")
+                logger.error("Review of %s failed (%s): %s", job["url"], status or "lease lost", e)
+            else:
+                done.set()
+                if queue.complete(job["id"], worker, analysis, round(time.perf_counter() - started, 3)):
+                    completed += 1
+            renewer.join()
+    finally:
+        queue.close()
+
+def run_workers(path: str, workers: int, wait: bool = False, lease_seconds: float = QUEUE_LEASE_SECONDS) -> int:
+    """
+    Run worker processes on a queue until it is drained.
+    
+    Returns:
+        Number of jobs the workers completed
+    """
+    # Create the schema before the workers race to
+    ReviewQueue(path).close()
+    # Pool workers are daemonic and cannot start an analysis pool of their own
+    with multiprocessing.Pool(workers, initializer=_init_batch_worker) as pool:
+        return sum(pool.starmap(run_worker, [(path, None, wait, 1.0, lease_seconds)] * workers))
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Queue vendor reviews for worker processes")
+    parser.add_argument("--db", default="reviews.db", help="Queue database file")
+    parser.add_argument("--log-file", default="ai_review.log", help="Log file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    enqueue = commands.add_parser("enqueue", help="Queue reviews of the vendors in a CSV or JSON file")
+    enqueue.add_argument("vendors", help="CSV or JSON file listing vendor URLs")
+    enqueue.add_argument("--priority", type=int, default=0, help="Higher priorities are reviewed first")
+    enqueue.add_argument("--triage", action="store_true", help="Run quick triage reviews")
+    
+    work = commands.add_parser("work", help="Review queued vendors")
+    work.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    work.add_argument("--wait", action="store_true", help="Keep waiting for new jobs once the queue is drained")
+    
+    commands.add_parser("stats", help="Count jobs by status")
+    
+    results = commands.add_parser("results", help="Write the finished reviews")
+    results.add_argument("--output", default="queue_results.json",
+                         help="Results file; .csv writes one row per vendor, anything else JSON")
+    
+    requeue = commands.add_parser("requeue", help="Retry dead-lettered jobs")
+    requeue.add_argument("ids", nargs="*", type=int, help="Job ids (all dead jobs by default)")
+    return parser.parse_args()
+
+def main():
+    """Main entry point for the review queue"""
+    args = parse_args()
+    configure_logging(logging.INFO, log_file=args.log_file, console=False)
+    
+    if args.command == "enqueue":
+        queue = ReviewQueue(args.db)
+        print(f"Queued {queue.enqueue(load_vendor_list(args.vendors), args.priority, args.triage)} reviews")
+    elif args.command == "work":
+        started = time.perf_counter()
+        completed = run_workers(args.db, args.workers, args.wait)
+        elapsed = time.perf_counter() - started
+        print(f"Reviewed {completed} vendors in {elapsed:.1f}s ({completed / elapsed * 60:.2f} per minute)")
+    elif args.command == "stats":
+        print(json.dumps(ReviewQueue(args.db).stats(), indent=2))
+    elif args.command == "results":
+        queue = ReviewQueue(args.db)
+        records = [{"url": job["url"], "analysis": job["analysis"], "error": job["error"], "elapsed": job["elapsed"]}
+                   for job in queue.jobs() if job["status"] in ("done", "dead")]
+        write_results(records, queue.stats(), args.output)
+        print(f"Results written to {args.output}")
+    elif args.command == "requeue":
+        print(f"Requeued {ReviewQueue(args.db).requeue(args.ids or None)} jobs")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+# review_service.py
+"""
+Local HTTP/JSON service for shared vendor reviews.
+
+Teams asking for the same vendor within minutes share one review: requests
+for a vendor already being reviewed join its job, and finished reviews are
+served from a cache along with their age.
+
+    python review_service.py --port 8080 --max-age 3600 --per-host 2
+
+Endpoints:
+    POST /reviews              {"url": ..., "triage": false, "max_age": s, "refresh": false}
+                               200 with a fresh cached result, else 202 with the job
+    GET  /reviews/<job>        Job status
+    GET  /reviews/<job>/result 200 with the result, 202 while running, 502 if it failed,
+                               410 once the result has left the cache
+    GET  /results?url=...      Latest cached result for a vendor, fresh or not
+    GET  /status               Jobs, cached results and memo statistics
+"""
+import argparse
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from ai_review import configure_logging, memo_stats, review_vendor, set_host_concurrency
+
+logger = logging.getLogger("ai_review.service")
+
+# Seconds a cached review is served as fresh
+SERVICE_MAX_AGE = 3600
+
+# Finished jobs kept for status requests
+SERVICE_MAX_JOBS = 1000
+
+# Vendor results kept in the cache, least recently used dropped first
+SERVICE_MAX_RESULTS = 1000
+
+def vendor_key(vendor_url: str) -> str:
+    """Normalise a vendor URL so that requests for the same vendor coalesce"""
+    if not vendor_url.startswith(('http://', 'https://')):
+        vendor_url = 'https://' + vendor_url
+    parsed = urlparse(vendor_url)
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host + parsed.path.rstrip('/')
+
+def _timestamp(seconds: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat() if seconds else None
+
+def _max_age(value: Any) -> Optional[float]:
+    """
+    Validate a client's max_age.
+    
+    Args:
+        value: None, or seconds as a JSON number
+    
+    Returns:
+        None, or the seconds as a float
+    
+    Raises:
+        ValueError: If the value is not a finite number of seconds of at least 0
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f'"max_age" must be a number of seconds of at least 0, not {value!r}')
+    return float(value)
+
+def _flag(request: Dict[str, Any], name: str) -> bool:
+    """
+    Validate an optional true/false field of a client's request.
+    
+    Raises:
+        ValueError: If the field is present but not a JSON boolean
+    """
+    value = request.get(name, False)
+    if not isinstance(value, bool):
+        raise ValueError(f'"{name}" must be true or false, not {value!r}')
+    return value
+
+class ReviewService:
+    """
+    Vendor reviews shared between callers.
+    
+    Each vendor, by normalised URL and review kind, has at most one job in
+    flight; a request for a vendor under review joins its job instead of
+    starting another crawl. Finished reviews are cached, up to
+    SERVICE_MAX_RESULTS vendors, and served while they are younger than the
+    caller's max_age. Per-host request limits are set with
+    set_host_concurrency.
+    
+    Args:
+        workers: Reviews run at once
+        max_age: Seconds a cached review is served as fresh by default
+    """
+    
+    def __init__(self, workers: int = 4, max_age: float = SERVICE_MAX_AGE):
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="review")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[tuple, str] = {}
+        self._results: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.coalesced = 0
+    
+    def submit(self, vendor_url: str, triage: bool = False, max_age: Optional[float] = None,
+               refresh: bool = False) -> Dict[str, Any]:
+        """
+        Request a review of a vendor.
+        
+        Args:
+            vendor_url: The vendor's URL
+            triage: Run a triage review
+            max_age: Seconds a cached review may be old to be served (defaults
+                to the service's max_age)
+            refresh: Review again even if a fresh result is cached
+        
+        Returns:
+            The cached result view (with "cached": True), or the view of the
+            job reviewing the vendor (with "coalesced" telling whether it was
+            already running)
+        """
+        key = (vendor_key(vendor_url), bool(triage))
+        with self._lock:
+            if not refresh:
+                cached = self._result_view(key, max_age)
+                if cached and cached["fresh"]:
+                    return dict(cached, cached=True)
+            
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                self.coalesced += 1
+                return dict(self._job_view(self._jobs[job_id]), coalesced=True)
+            
+            job_id = uuid.uuid4().hex[:12]
+            job = {"job": job_id, "url": vendor_url, "triage": bool(triage), "key": key, "status": "queued",
+                   "submitted": time.time(), "started": None, "finished": None, "error": None}
+            self._jobs[job_id] = job
+            self._in_flight[key] = job_id
+            self._trim_jobs()
+        self._executor.submit(self._run, job)
+        return dict(self._job_view(job), coalesced=False)
+    
+    def _run(self, job: Dict[str, Any]):
+        """Review a job's vendor and cache the result"""
+        job["status"], job["started"] = "running", time.time()
+        try:
+            analysis = review_vendor(job["url"], job["triage"])
+        except Exception as e:
+            logger.error("Review of %s failed: %s", job["url"], e)
+            with self._lock:
+                job["status"], job["error"], job["finished"] = "failed", f"{type(e).__name__}: {e}", time.time()
+                self._in_flight.pop(job["key"], None)
+            return
+        with self._lock:
+            job["status"], job["finished"] = "done", time.time()
+            self._results[job["key"]] = {"url": job["url"], "analysis": analysis, "reviewed_at": job["finished"],
+                                         "job": job["job"]}
+            self._results.move_to_end(job["key"])
+            while len(self._results) > SERVICE_MAX_RESULTS:
+                self._results.popitem(last=False)
+            self._in_flight.pop(job["key"], None)
+    
+    def _trim_jobs(self):
+        """Forget the oldest finished jobs beyond SERVICE_MAX_JOBS"""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= SERVICE_MAX_JOBS:
+                break
+            if self._jobs[job_id]["status"] in ("done", "failed"):
+                del self._jobs[job_id]
+    
+    def _job_view(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {"job": job["job"], "url": job["url"], "triage": job["triage"], "status": job["status"],
+                "submitted": _timestamp(job["submitted"]), "started": _timestamp(job["started"]),
+                "finished": _timestamp(job["finished"]), "error": job["error"]}
+    
+    def _result_view(self, key: tuple, max_age: Optional[float]) -> Optional[Dict[str, Any]]:
+        cached = self._results.get(key)
+        if cached is None:
+            return None
+        self._results.move_to_end(key)
+        max_age = self.max_age if max_age is None else max_age
+        age = time.time() - cached["reviewed_at"]
+        return {"url": cached["url"], "job": cached["job"], "reviewed_at": _timestamp(cached["reviewed_at"]),
+                "age": round(age, 3), "max_age": max_age, "fresh": age < max_age, "analysis": cached["analysis"]}
+    
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the view of a job, or None for an unknown one"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._job_view(job) if job else None
+    
+    def job_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the result view of a finished job's vendor, or None if it has none"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "done":
+                return None
+            return self._result_view(job["key"], None)
+    
+    def result(self, vendor_url: str, triage: bool = False, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the latest cached result view of a vendor, fresh or not, or None"""
+        with self._lock:
+            return self._result_view((vendor_key(vendor_url), bool(triage)), max_age)
+    
+    def status(self) -> Dict[str, Any]:
+        """Return counts of jobs by status, cached results and memo statistics"""
+        with self._lock:
+            jobs = {}
+            for job in self._jobs.values():
+                jobs[job["status"]] = jobs.get(job["status"], 0) + 1
+            return {"jobs": jobs, "in_flight": len(self._in_flight), "coalesced": self.coalesced,
+                    "cached_results": len(self._results), "memo": memo_stats()}
+    
+    def close(self):
+        """Stop accepting reviews and wait for the running ones"""
+        self._executor.shutdown(wait=True)
+
+class _ReviewHandler(BaseHTTPRequestHandler):
+    """JSON endpoints of a ReviewService"""
+    
+    service: ReviewService = None
+    
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _send_result(self, result: Dict[str, Any]):
+        # Freshness also goes in the standard HTTP caching headers
+        self._send(200, result, {"Age": str(int(result["age"])), "Cache-Control": f"max-age={int(result['max_age'])}"})
+    
+    def do_POST(self):
+        if urlparse(self.path).path != "/reviews":
+            return self._send(404, {"error": "Not found"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            vendor_url = request["url"]
+        except (ValueError, KeyError, TypeError):
+            return self._send(400, {"error": 'Expected a JSON body with a "url"'})
+        if not isinstance(vendor_url, str) or not vendor_url.strip():
+            return self._send(400, {"error": f'"url" must be a non-empty string, not {vendor_url!r}'})
+        try:
+            max_age = _max_age(request.get("max_age"))
+            triage, refresh = _flag(request, "triage"), _flag(request, "refresh")
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        
+        response = self.service.submit(vendor_url, triage, max_age, refresh)
+        if response.get("cached"):
+            return self._send_result(response)
+        self._send(202, response, {"Location": f"/reviews/{response['job']}"})
+    
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split("/") if part]
+        
+        if parts == ["status"]:
+            return self._send(200, self.service.status())
+        
+        if parts == ["results"]:
+            query = parse_qs(parsed.query)
+            if "url" not in query:
+                return self._send(400, {"error": 'Expected a "url" query parameter'})
+            try:
+                max_age = _max_age(float(query["max_age"][0])) if "max_age" in query else None
+            except ValueError:
+                return self._send(400, {"error": f'"max_age" must be a number of seconds of at least 0, not {query["max_age"][0]!r}'})
+            result = self.service.result(query["url"][0], query.get("triage", ["false"])[0].lower() in ("1", "true"),
+                                         max_age)
+            return self._send_result(result) if result else self._send(404, {"error": "No review of this vendor"})
+        
+        if len(parts) in (2, 3) and parts[0] == "reviews" and parts[2:] in ([], ["result"]):
+            job = self.service.job(parts[1])
+            if job is None:
+                return self._send(404, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return self._send(200, job)
+            if job["status"] == "failed":
+                return self._send(502, job)
+            if job["status"] != "done":
+                return self._send(202, job)
+            result = self.service.job_result(parts[1])
+            return self._send_result(result) if result else self._send(410, dict(job, error="Result no longer cached"))
+        
+        self._send(404, {"error": "Not found"})
+    
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+def make_server(service: ReviewService, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    """Create an HTTP server for a ReviewService (port 0 picks a free port)"""
+    handler = type("ReviewHandler", (_ReviewHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Serve shared vendor reviews over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=4, help="Reviews run at once")
+    parser.add_argument("--max-age", type=float, default=SERVICE_MAX_AGE,
+                        help="Seconds a cached review is served as fresh")
+    parser.add_argument("--per-host", type=int, default=2, help="Requests sent to any one vendor host at once")
+    parser.add_argument("--log-file", default="ai_review.log", help="Log file")
+    return parser.parse_args()
+
+def main():
+    """Main entry point for the review service"""
+    args = parse_args()
+    configure_logging(logging.INFO, log_file=args.log_file, console=False)
+    set_host_concurrency(args.per_host)
+    
+    service = ReviewService(args.workers, args.max_age)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving vendor reviews on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    main()
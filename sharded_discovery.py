@@ -0,0 +1,357 @@
+# sharded_discovery.py
+"""
+Domain-sharded vendor discovery.
+
+A coordinator runs the discovery of scrape_vendor_documentation for many
+vendors at once. It sends each page request to the fetch worker that owns
+the page's host, chosen by consistent hashing. Every host is fetched by
+exactly one worker, so its per-host limit and its pooled connections live
+in that worker alone. Workers do not follow redirects: they return them to
+the coordinator, which sends the next hop to the shard of its own host, as
+it does links found on other hosts. Adding or removing a worker moves only
+about 1/n of the hosts.
+
+Workers started by the coordinator as local processes:
+
+    python sharded_discovery.py discover vendors.csv --local 4 --output documents.json
+
+or running on other machines:
+
+    AI_REVIEW_SHARD_KEY=secret python sharded_discovery.py worker --address 0.0.0.0:7001
+    AI_REVIEW_SHARD_KEY=secret python sharded_discovery.py discover vendors.csv --workers host1:7001,host2:7001
+"""
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import count
+from multiprocessing.connection import Client, Listener, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_review import _FetchedPage, _http_get, _scrape_steps, configure_logging, set_host_concurrency, set_http_session
+from batch_review import load_vendor_list
+
+logger = logging.getLogger("ai_review.shards")
+
+# Points each worker has on the hash ring; more points spread hosts more evenly
+SHARD_REPLICAS = 100
+
+# Page fetches each worker runs at once
+SHARD_FETCH_THREADS = int(os.environ.get("AI_REVIEW_SHARD_THREADS", "16"))
+
+# Requests each worker sends to any one host at once
+SHARD_HOST_CONCURRENCY = int(os.environ.get("AI_REVIEW_SHARD_HOST_CONCURRENCY", "2"))
+
+# Redirects followed for one page request, as many as requests follows
+SHARD_MAX_REDIRECTS = requests.models.DEFAULT_REDIRECT_LIMIT
+
+def shard_key(url: str) -> str:
+    """The host a URL is sharded by"""
+    return urlparse(url).netloc.lower()
+
+def _parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+    
+    Each node is placed at `replicas` points on the ring, and a key belongs
+    to the node of the first point at or after the key's hash. Adding or
+    removing a node therefore only moves the keys next to its own points.
+    
+    Args:
+        nodes: Initial node names
+        replicas: Points per node
+    """
+    
+    def __init__(self, nodes=(), replicas: int = SHARD_REPLICAS):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+    
+    def add(self, node: str):
+        """Place a node on the ring"""
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point not in self._owners:
+                insort(self._points, point)
+            self._owners[point] = node
+    
+    def remove(self, node: str):
+        """Take a node off the ring; its keys pass to the following nodes"""
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect_left(self._points, point))
+    
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(set(self._owners.values()))
+    
+    def node_for(self, key: str) -> str:
+        """The node a key belongs to"""
+        if not self._points:
+            raise LookupError("The hash ring has no nodes")
+        index = bisect_left(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+def _serve_connection(conn, pool: ThreadPoolExecutor, stop: threading.Event, address, authkey: bytes):
+    """
+    Fetch the pages a coordinator asks for, replying as each completes.
+    
+    A redirect is not followed, since its target may belong to another
+    shard: the reply carries its absolute Location for the coordinator.
+    """
+    send_lock = threading.Lock()
+    
+    def fetch(request_id, url, timeout):
+        try:
+            response = _http_get(url, timeout=timeout, allow_redirects=False)
+            location = urljoin(response.url, response.headers["Location"]) if response.is_redirect else None
+            reply = (request_id, _FetchedPage(response.url, response.status_code, response.text), None, location)
+        except Exception as e:
+            reply = (request_id, None, f"{type(e).__name__}: {e}", None)
+        try:
+            with send_lock:
+                conn.send(reply)
+        except OSError:
+            logger.warning("Coordinator went away before the reply for %s", url)
+    
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "fetch":
+                pool.submit(fetch, *message[1:])
+            elif message[0] == "stop":
+                stop.set()
+                # Wake the accept() the serving loop is blocked in
+                Client(address, authkey=authkey).close()
+                break
+    except EOFError:
+        pass
+
+def serve_shard(address, authkey: bytes, threads: int = SHARD_FETCH_THREADS,
+                per_host: int = SHARD_HOST_CONCURRENCY, on_ready=None):
+    """
+    Run a fetch worker until a coordinator sends it "stop".
+    
+    Args:
+        address: (host, port) to listen on; port 0 picks a free one
+        authkey: Key coordinators must present
+        threads: Page fetches run at once
+        per_host: Requests sent to any one host at once
+        on_ready: Called with the (host, port) the worker listens on
+    """
+    set_host_concurrency(per_host)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=64, pool_maxsize=threads)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    set_http_session(session)
+    
+    stop = threading.Event()
+    with Listener(address, authkey=authkey) as listener, ThreadPoolExecutor(threads) as pool:
+        address = listener.address
+        logger.info("Fetch worker %d listening on %s:%d", os.getpid(), *address)
+        if on_ready:
+            on_ready(address)
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # A client with the wrong key, or one that hung up at once
+                logger.warning("Rejected a connection: %s", e)
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, pool, stop, address, authkey),
+                             daemon=True).start()
+    session.close()
+
+def _run_local_shard(authkey, threads, per_host, addresses):
+    serve_shard(("127.0.0.1", 0), authkey, threads, per_host, on_ready=addresses.put)
+
+@contextmanager
+def local_shards(workers: int, threads: int = SHARD_FETCH_THREADS, per_host: int = SHARD_HOST_CONCURRENCY):
+    """
+    Start fetch workers as local processes.
+    
+    Yields:
+        The workers' "host:port" addresses and the key to connect with
+    """
+    authkey = os.urandom(16)
+    addresses = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_run_local_shard, args=(authkey, threads, per_host, addresses),
+                                         daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        yield [f"{host}:{port}" for host, port in (addresses.get(timeout=30) for _ in processes)], authkey
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join(timeout=5)
+
+class ShardedDiscovery:
+    """
+    Coordinator sending the page requests of vendor discovery to the fetch
+    workers that own their hosts.
+    
+    Args:
+        addresses: The workers' "host:port" addresses
+        authkey: Key the workers expect
+        replicas: Points per worker on the hash ring
+    """
+    
+    def __init__(self, addresses: List[str], authkey: bytes, replicas: int = SHARD_REPLICAS):
+        self.ring = HashRing(addresses, replicas)
+        self.authkey = authkey
+        self._connections = {address: Client(_parse_address(address), authkey=authkey) for address in addresses}
+        self._addresses = {conn: address for address, conn in self._connections.items()}
+        # Hosts each worker was sent, to check and report the sharding
+        self.shard_hosts: Dict[str, set] = defaultdict(set)
+    
+    def discover(self, vendor_urls) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Discover the documentation of many vendors, as scrape_vendor_documentation.
+        
+        Every vendor's discovery advances whenever one of its pages arrives,
+        so slow hosts hold up only their own vendors. Redirects are followed
+        hop by hop, each hop fetched by the worker owning its host.
+        
+        Args:
+            vendor_urls: Vendor URLs
+        
+        Returns:
+            Dictionary mapping each vendor URL to its document URLs
+        """
+        steps = {vendor_url: _scrape_steps(vendor_url) for vendor_url in dict.fromkeys(vendor_urls)}
+        results = {}
+        pending = {}
+        request_ids = count()
+        
+        def request(vendor_url, url, timeout, redirects=0):
+            """Send a page request to the worker owning the page's host"""
+            host = shard_key(url)
+            address = self.ring.node_for(host)
+            self.shard_hosts[address].add(host)
+            request_id = next(request_ids)
+            pending[request_id] = (vendor_url, timeout, redirects)
+            self._connections[address].send(("fetch", request_id, url, timeout))
+        
+        def advance(vendor_url, reply=None, error=None):
+            """Run a vendor's discovery up to its next page request or its end"""
+            while True:
+                try:
+                    step = steps[vendor_url].throw(error) if error is not None else steps[vendor_url].send(reply)
+                except StopIteration as end:
+                    results[vendor_url] = end.value
+                    return
+                reply, error = None, None
+                if step[0] == "fetch":
+                    request(vendor_url, step[1], step[2])
+                    return
+        
+        for vendor_url in steps:
+            advance(vendor_url)
+        while pending:
+            for conn in wait(list(self._addresses)):
+                try:
+                    request_id, page, error, location = conn.recv()
+                except EOFError:
+                    raise RuntimeError(f"Fetch worker {self._addresses[conn]} disconnected")
+                vendor_url, timeout, redirects = pending.pop(request_id)
+                if location is None:
+                    advance(vendor_url, page, requests.RequestException(error) if error else None)
+                elif redirects >= SHARD_MAX_REDIRECTS:
+                    advance(vendor_url, error=requests.TooManyRedirects(f"Exceeded {SHARD_MAX_REDIRECTS} redirects."))
+                else:
+                    request(vendor_url, location, timeout, redirects + 1)
+        return {vendor_url: results[vendor_url] for vendor_url in steps}
+    
+    def stop_workers(self):
+        """Ask every worker to shut down"""
+        for conn in self._connections.values():
+            conn.send(("stop",))
+    
+    def close(self):
+        for conn in self._connections.values():
+            conn.close()
+
+@contextmanager
+def _remote_shards(addresses: str):
+    """Yield the addresses of running workers and the key from AI_REVIEW_SHARD_KEY"""
+    yield [address.strip() for address in addresses.split(",")], os.environ.get("AI_REVIEW_SHARD_KEY", "").encode("utf-8")
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Discover vendor documentation across host-sharded fetch workers")
+    parser.add_argument("--log-file", default="ai_review.log", help="Log file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    worker = commands.add_parser("worker", help="Run a fetch worker (the key comes from AI_REVIEW_SHARD_KEY)")
+    worker.add_argument("--address", default="127.0.0.1:7001", help="host:port to listen on")
+    worker.add_argument("--threads", type=int, default=SHARD_FETCH_THREADS, help="Page fetches run at once")
+    worker.add_argument("--per-host", type=int, default=SHARD_HOST_CONCURRENCY,
+                        help="Requests sent to any one host at once")
+    
+    discover = commands.add_parser("discover", help="Discover the documentation of a list of vendors")
+    discover.add_argument("vendors", help="CSV or JSON file listing vendor URLs")
+    workers = discover.add_mutually_exclusive_group(required=True)
+    workers.add_argument("--workers", help="Comma-separated host:port addresses of running workers")
+    workers.add_argument("--local", type=int, help="Start this many local worker processes")
+    discover.add_argument("--per-host", type=int, default=SHARD_HOST_CONCURRENCY,
+                          help="Requests each local worker sends to any one host at once")
+    discover.add_argument("--output", default="documents.json", help="JSON file for the document URLs")
+    return parser.parse_args()
+
+def main():
+    """Main entry point for sharded discovery"""
+    args = parse_args()
+    configure_logging(logging.INFO, log_file=args.log_file, console=False)
+    
+    if args.command == "worker":
+        if not os.environ.get("AI_REVIEW_SHARD_KEY"):
+            print("Set AI_REVIEW_SHARD_KEY to the key coordinators will use", file=sys.stderr)
+            return 2
+        serve_shard(_parse_address(args.address), os.environ["AI_REVIEW_SHARD_KEY"].encode("utf-8"),
+                    args.threads, args.per_host)
+        return 0
+    
+    vendor_urls = load_vendor_list(args.vendors)
+    with (local_shards(args.local, per_host=args.per_host) if args.local
+          else _remote_shards(args.workers)) as (addresses, authkey):
+        discovery = ShardedDiscovery(addresses, authkey)
+        try:
+            documents = discovery.discover(vendor_urls)
+        finally:
+            discovery.close()
+    
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(documents, f, indent=2)
+    found = sum(1 for urls in documents.values() for url in urls.values() if url)
+    print(f"Found {found} documents for {len(documents)} vendors across {len(addresses)} workers; "
+          f"written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,87 @@
 # test_ai_review.py
 
 import argparse
+import asyncio
 import json
 import re
 import time
 import sys
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import requests
+import aiohttp
+
 # Import primary functions (assuming they're in ai_review.py)
+import ai_review
 from ai_review import (
     scrape_vendor_documentation,
     extract_document_text,
-    analyze_ai_capabilities
+    analyze_ai_capabilities,
+    fix_analyze_ai_capabilities,
+    configure_logging,
+    shutdown_logging,
+    set_regex_engine,
+    re2,
+    MAX_CAPTURE_CHARS,
+    SentenceIndex,
+    ProviderCatalog,
+    ExecutionPlan,
+    analyze_documents,
+    load_analysis_rules,
+    compile_rules,
+    rules_hash,
+    get_execution_plan,
+    get_provider_catalog,
+    DocumentScan,
+    FoldedText,
+    triage_ai_capabilities,
+    direct_confidence_fix,
+    evidence_count_matrix,
+    rescore_confidence,
+    analyze_portfolio,
+    document_features,
+    feature_schema,
+    save_feature_schema,
+    iter_document_text,
+    StageCache,
+    memo_stats,
+    clear_memo,
+    review_vendors,
+    review_pipeline,
+    review_vendor,
+    get_vendor_documentation,
+    review_session,
+    async_scrape_vendor_documentation,
+    async_get_vendor_documentation,
+    async_extract_document_text,
+    async_review_vendor,
+    async_review_vendors,
+    set_host_concurrency,
+    shutdown_analysis_pool,
+    VendorRegistry,
+    get_vendor_registry,
+    set_vendor_registry,
+    NegationIndex,
+    yaml
 )
 
 # Import test data
+from batch_review import load_vendor_list, write_results
+import review_service
+from review_service import ReviewService, make_server
+from review_daemon import ReviewDaemon
+from review_client import DaemonError, review as daemon_review, send_request
+from review_queue import ReviewQueue, run_workers
+from sharded_discovery import HashRing, ShardedDiscovery, local_shards, shard_key
 from test_vendors import (
     TEST_VENDORS,
     SYNTHETIC_SAMPLES,
@@ -24,6 +90,61 @@ from test_vendors import (
     get_combined_synthetic_test
 )
 
+@contextmanager
+def local_site(pages, delay=0.0, load=None, redirects=None):
+    """
+    Serve HTML pages from a local stand-in vendor site.
+    
+    Args:
+        pages: Dictionary mapping paths to HTML; other paths return 404
+        delay: Seconds each response takes, like a remote site's latency
+        load: Optional dictionary in which the site keeps its "active" and
+            "peak" numbers of requests being served at once
+        redirects: Optional dictionary mapping paths to the URLs they
+            redirect to with a 301
+    
+    Yields:
+        The site's base URL and the list of paths requested so far
+    """
+    served = []
+    redirects = redirects or {}
+    load = {} if load is None else load
+    load.update(active=0, peak=0)
+    lock = threading.Lock()
+    
+    class Page(BaseHTTPRequestHandler):
+        def do_GET(self):
+            served.append(self.path)
+            with lock:
+                load["active"] += 1
+                load["peak"] = max(load["peak"], load["active"])
+            time.sleep(delay)
+            with lock:
+                load["active"] -= 1
+            if self.path in redirects:
+                self.send_response(301)
+                self.send_header("Location", redirects[self.path])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = pages.get(self.path, "").encode("utf-8")
+            self.send_response(200 if self.path in pages else 404)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", served
+    finally:
+        server.shutdown()
+        server.server_close()
+
 def create_test_directory():
     """Create a directory for test outputs"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -342,10 +463,981 @@ def test_execution_time():
     print(f"  Analysis: {analysis_time:.2f}s")
     print(f"  End-to-end: {end_to_end_time:.2f}s")
 
+def test_sentence_index():
+    """Test mapping match offsets to their enclosing sentence and paragraph"""
+    print("\n==== Testing Sentence Index ====")
+    
+    text = ("We retain data for 30 days. Our contracts prohibit partners from training models!\n\n"
+            "Models are never shared. Is that clear? Yes")
+    index = SentenceIndex(text)
+    
+    offset = text.find("prohibit")
+    start, end = index.sentence_span(offset)
+    print(f"Sentence for 'prohibit': {text[start:end]!r}")
+    assert text[start:end] == "Our contracts prohibit partners from training models!"
+    
+    # Clipping keeps the sentence within a context window
+    start, end = index.sentence_span(offset, offset - 5, offset + 20)
+    assert text[start:end] == text[offset - 5:offset + 20]
+    
+    start, end = index.paragraph_span(text.find("never"))
+    print(f"Paragraph for 'never': {text[start:end]!r}")
+    assert text[start:end] == "Models are never shared. Is that clear? Yes"
+    
+    start, end = index.sentence_span(len(text) - 1)
+    assert text[start:end] == "Yes"
+    
+    # Sentence-based details come from the sentence holding the match
+    analysis = fix_analyze_ai_capabilities({
+        "ai_ethics": "Our AI is fair. We publish bias audits for every machine learning model. Contact us."
+    })
+    print(f"Ethical considerations: {analysis['ethical_considerations']}")
+    assert analysis["ethical_considerations"] == [
+        "Our AI is fair.",
+        "We publish bias audits for every machine learning model."
+    ]
+
+def test_logging_events():
+    """Test that analysis logs summaries at INFO and per-match detail only at DEBUG"""
+    print("\n==== Testing Logging Events ====")
+    
+    # Importing ai_review must not attach any real handlers
+    review_logger = logging.getLogger("ai_review")
+    assert all(isinstance(h, logging.NullHandler) for h in review_logger.handlers)
+    
+    texts = {"privacy_policy": "You can disable cookies in your browser. " + "Cookies expire. " * 10 +
+                               "Admins can turn off AI features for the organization."}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = Path(tmp) / "review.log"
+        
+        configure_logging(logging.INFO, log_file=str(log_file), console=False)
+        fix_analyze_ai_capabilities(texts)
+        shutdown_logging()
+        info_log = log_file.read_text()
+        
+        configure_logging(logging.DEBUG, log_file=str(log_file), console=False)
+        fix_analyze_ai_capabilities(texts)
+        shutdown_logging()
+        debug_log = log_file.read_text()[len(info_log):]
+    
+    review_logger.setLevel(logging.NOTSET)
+    print(info_log)
+    assert "Analyzed privacy_policy" in info_log
+    assert "Analysis complete" in info_log
+    assert "Skipping non-AI-related" not in info_log
+    assert "Skipping non-AI-related opt-out context in privacy_policy" in debug_log
+
+def test_regex_engine_and_budget():
+    """Test the linear-time regex backend, bounded captures and the time budget"""
+    print("\n==== Testing Regex Engine and Time Budget ====")
+    
+    # Text with no sentence punctuation, like a table or PDF dump
+    pathological = "AI tools like chat, search and insight " * 2000
+    analysis = fix_analyze_ai_capabilities({"ai_trust": pathological})
+    longest = max(len(feature) for feature in analysis["ai_features"])
+    print(f"Longest captured feature: {longest} chars")
+    assert longest <= MAX_CAPTURE_CHARS
+    
+    # A tiny budget stops the scan and reports the document
+    analysis = fix_analyze_ai_capabilities({"privacy_policy": pathological * 5}, time_budget=0.01)
+    print(f"Timed out documents: {analysis.get('_timed_out_documents')}")
+    assert analysis["_timed_out_documents"] == ["privacy_policy"]
+    assert any("time budget" in concern for concern in analysis["concerns"])
+    
+    # Both engines must agree on the synthetic samples
+    if re2 is not None:
+        texts = {"privacy_policy": get_combined_synthetic_test("third_party_with_protection"),
+                 "ai_ethics": SYNTHETIC_SAMPLES["native_ai"]}
+        try:
+            set_regex_engine("re")
+            expected = fix_analyze_ai_capabilities(texts)
+            set_regex_engine("re2")
+            actual = fix_analyze_ai_capabilities(texts)
+        finally:
+            set_regex_engine("auto")
+        assert json.dumps(actual, sort_keys=True) == json.dumps(expected, sort_keys=True)
+        print("re and re2 engines agree")
+
+def test_provider_catalog():
+    """Test alias matching and canonical names in the provider catalog"""
+    print("\n==== Testing Provider Catalog ====")
+    
+    catalog = ProviderCatalog.load()
+    text = ("We use GPT-4o via Azure, models from Hugging Face, and Claude. "
+            "Googleplex and GPT-4x are not provider names.")
+    found = catalog.find(text)
+    print(f"Providers found: {found}")
+    assert found == ["OpenAI", "Azure", "Anthropic", "HuggingFace"]
+    
+    # A large catalog loaded from disk still maps aliases to canonical names
+    providers = [{"name": f"Vendor{i}", "aliases": [f"Model {i}"]} for i in range(5000)]
+    providers.append({"name": "Acme AI", "aliases": ["AcmeGPT"]})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "providers.json"
+        path.write_text(json.dumps({"providers": providers}))
+        catalog = ProviderCatalog.load(str(path))
+    
+    assert catalog.find("Powered by AcmeGPT and Model 4999.") == ["Vendor4999", "Acme AI"]
+    
+    analysis = fix_analyze_ai_capabilities(
+        {"subprocessors": "Our AI assistant is powered by AcmeGPT, a third-party model."},
+        provider_catalog=catalog
+    )
+    print(f"Third-party providers: {analysis['third_party_providers']}")
+    assert analysis["third_party_providers"] == ["Acme AI"]
+    assert analysis["native_ai"] is False
+
+def test_analysis_views():
+    """Test that one scan builds both analysis views and that rules are validated"""
+    print("\n==== Testing Analysis Views ====")
+    
+    texts = {
+        "privacy_policy": ("Administrators can opt out of AI features in the admin console. "
+                           "We share data with OpenAI, a third-party AI provider, under a contract "
+                           "that prohibits using customer data to train models."),
+        "terms_of_service": "",
+    }
+    
+    views = analyze_documents(texts)
+    assert set(views) == {"full", "legacy"}
+    assert views["full"] == fix_analyze_ai_capabilities(texts)
+    assert views["legacy"] == analyze_ai_capabilities(texts)
+    
+    print(f"Full view providers: {views['full']['third_party_providers']}")
+    print(f"Legacy view providers: {views['legacy']['third_party_providers']}")
+    assert views["full"]["third_party_providers"] == ["OpenAI"]
+    assert views["full"]["contractual_protections"] is True
+    assert views["full"]["opt_out_method"] == "admin_console"
+    assert views["legacy"]["third_party_providers"] == ["OpenAI"]
+    assert views["legacy"]["enterprise_opt_out"] is True
+    assert "_evidence" not in views["legacy"]
+    
+    # Rule sets are checked when the plan is compiled
+    rules = load_analysis_rules()
+    rules["views"]["full"][0]["pattern"] = "no_such_pattern"
+    try:
+        compile_rules(rules)
+    except ValueError as e:
+        print(f"Invalid rule rejected: {e}")
+    else:
+        raise AssertionError("ExecutionPlan accepted an unknown pattern")
+
+def test_rule_files():
+    """Test loading tuned rules from a file and the compiled-plan cache"""
+    print("\n==== Testing Rule Files ====")
+    
+    texts = {"privacy_policy": "Administrators can opt out of AI features in the admin console."}
+    assert fix_analyze_ai_capabilities(texts)["opt_out_available"] is True
+    
+    # Tune the rules without touching code: stop reading opt-outs from privacy policies
+    rules = load_analysis_rules()
+    for aspect in rules["views"]["full"]:
+        if aspect["name"] == "opt_out":
+            aspect["doc_types"].remove("privacy_policy")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if yaml is not None:
+            path = Path(tmp) / "rules.yaml"
+            path.write_text(yaml.safe_dump(rules))
+        else:
+            path = Path(tmp) / "rules.json"
+            path.write_text(json.dumps(rules))
+        tuned = load_analysis_rules(str(path))
+        assert tuned == rules
+        
+        cache_dir = Path(tmp) / "cache"
+        plan = ExecutionPlan.from_rules(tuned, str(cache_dir))
+        cache_file = cache_dir / f"plan-{rules_hash(tuned)}.json"
+        print(f"Compiled plan cached: {cache_file.name}")
+        assert cache_file.exists()
+        assert plan.rule_hash == rules_hash(tuned)
+        
+        # A second process would load the cached plan instead of recompiling
+        cached = ExecutionPlan.from_rules(tuned, str(cache_dir))
+        assert cached.compiled == plan.compiled
+        assert rules_hash(tuned) != rules_hash(load_analysis_rules())
+        
+        analysis = analyze_documents(texts, ("full",), plan=cached)["full"]
+        assert analysis["opt_out_available"] is False
+        assert analysis["_evidence"]["opt_out"] == []
+
+def test_streaming_analysis():
+    """Test that analyzing a document in chunks finds the same as analyzing it whole"""
+    print("\n==== Testing Streaming Analysis ====")
+    
+    texts = {
+        "privacy_policy": get_combined_synthetic_test("third_party_with_protection"),
+        "terms_of_service": get_combined_synthetic_test("enterprise_opt_out_native"),
+        "ai_ethics": "",
+    }
+    whole = analyze_documents(texts, time_budget=0)
+    
+    for size in (7, 64, 500):
+        chunked = {doc_type: [text[i:i + size] for i in range(0, len(text), size)]
+                   for doc_type, text in texts.items()}
+        streamed = analyze_documents(chunked, time_budget=0)
+        print(f"{size}-character chunks: {len(streamed['full']['third_party_providers'])} providers, "
+              f"{len(streamed['legacy']['concerns'])} legacy concerns")
+        assert streamed == whole
+    
+    # Sentence boundaries are tracked as the text arrives
+    text = texts["privacy_policy"]
+    index = SentenceIndex(final=False)
+    for i in range(0, len(text), 64):
+        index.extend(text[:i + 64], final=i + 64 >= len(text))
+    assert index.sentence_starts == SentenceIndex(text).sentence_starts
+    assert index.paragraph_starts == SentenceIndex(text).paragraph_starts
+
+def test_parallel_analysis():
+    """Test that scanning documents in worker processes gives the in-process result"""
+    print("\n==== Testing Parallel Analysis ====")
+    
+    # The contractual protection covers a provider named in another document
+    texts = {
+        "privacy_policy": get_combined_synthetic_test("enterprise_opt_out_native"),
+        "ai_policy": "Our assistant is built on OpenAI models.",
+        "terms_of_service": "",
+        "data_processing": get_combined_synthetic_test("third_party_with_protection"),
+    }
+    
+    in_process = analyze_documents(texts, time_budget=0, workers=1)
+    parallel = analyze_documents(texts, time_budget=0, workers=2)
+    print(f"Providers: {parallel['full']['third_party_providers']}, "
+          f"contractual protections: {parallel['full']['contractual_protections']}")
+    assert parallel == in_process
+
+def test_ai_prefilter():
+    """Test that the AI-term pre-filter skips AI-free text without changing results"""
+    print("\n==== Testing AI Pre-filter ====")
+    
+    plan = get_execution_plan()
+    admin_guide = ("Administrators can opt out of email digests in the admin console. "
+                   "Contact support to maintain these settings.")
+    scan = DocumentScan(plan, "admin_guide", get_provider_catalog())
+    scan.feed(admin_guide, final=True)
+    print(f"AI-free admin guide: {scan.ai_free}")
+    assert scan.ai_free
+    
+    # Every window gets the same answer as the AI pattern, including ones
+    # that cut a word containing a term ("Dubai", "email") at the edge
+    text = admin_guide + " Our AI assistant uses machine learning, built in Dubai."
+    scan = DocumentScan(plan, "admin_guide", get_provider_catalog())
+    scan.feed(text, final=True)
+    assert not scan.ai_free
+    for start in range(0, len(text), 3):
+        for end in range(start, len(text) + 1, 4):
+            expected = plan.ai_pattern.search(text[start:end]) is not None
+            assert scan.is_ai_related(start, end) == expected, (start, end)
+    
+    analysis = fix_analyze_ai_capabilities({"admin_guide": admin_guide})
+    assert analysis["opt_out_available"] is False
+    assert analysis["_evidence"]["opt_out"] == []
+
+def test_folded_text():
+    """Test the casefolded, whitespace-collapsed view and its offset map"""
+    print("\n==== Testing Folded Text ====")
+    
+    text = "Report a Data\n\n  Breach to the STRASSE office. Maße apply."
+    view = FoldedText(text)
+    print(f"Folded view: {view.text!r}")
+    assert view.text == "report a data breach to the strasse office. masse apply."
+    
+    # Offsets map back to the original text
+    start = view.text.find("data breach")
+    assert text[view.to_text(start):view.to_text(start + len("data breach"))] == "Data\n\n  Breach"
+    assert text[view.to_text(view.text.find("apply"))] == "a"
+    assert view.slice(text.find("Maße"), text.find(" apply")) == "masse"
+    
+    # Literal checks see through case and line breaks
+    analysis = analyze_ai_capabilities({
+        "privacy_policy": "We notify customers of any Data\nBreach within 72 hours."
+    })
+    print(f"Concerns: {analysis['concerns']}")
+    assert analysis["concerns"] == ["Potential concern: We notify customers of any Data\nBreach within 72 hours."]
+
+def test_triage_mode():
+    """Test that triage stops decided aspects early with the full analysis' answers"""
+    print("\n==== Testing Triage Mode ====")
+    
+    opt_out = "Administrators can opt out of AI features in the admin console. " * 20
+    texts = {
+        "privacy_policy": opt_out + get_combined_synthetic_test("third_party_with_protection"),
+        "terms_of_service": opt_out,
+    }
+    full = direct_confidence_fix(fix_analyze_ai_capabilities(texts, time_budget=0))
+    triage = direct_confidence_fix(triage_ai_capabilities(texts, time_budget=0))
+    print(f"Decided early: {triage['_decided_early']}, "
+          f"opt-out evidence {len(triage['_evidence']['opt_out'])} of {len(full['_evidence']['opt_out'])}")
+    
+    # Eight items from one document saturate the opt-out confidence; the
+    # terms of service are not scanned for opt-outs at all
+    assert triage["_decided_early"] == {"opt_out": "privacy_policy"}
+    assert len(triage["_evidence"]["opt_out"]) == 8
+    for key in ("opt_out_available", "enterprise_opt_out", "native_ai", "third_party_providers",
+                "model_sharing", "contractual_protections"):
+        assert triage[key] == full[key], key
+    assert triage["confidence_levels"] == full["confidence_levels"]
+    assert triage["confidence_levels"]["enterprise_opt_out"] == 1.0
+    assert "_decided_early" not in full
+    
+    # A spent budget lists every document as cut short
+    triage = triage_ai_capabilities(texts, time_budget=1e-9)
+    print(f"Timed out: {triage['_timed_out_documents']}")
+    assert sorted(triage["_timed_out_documents"]) == sorted(texts)
+
+def test_evidence_counts():
+    """Test that confidence is scored from the evidence count matrix alone"""
+    print("\n==== Testing Evidence Counts ====")
+    
+    texts = {
+        "privacy_policy": get_combined_synthetic_test("third_party_with_protection"),
+        "terms_of_service": get_combined_synthetic_test("enterprise_opt_out_native"),
+    }
+    analysis = fix_analyze_ai_capabilities(texts, time_budget=0)
+    counts = analysis["_evidence_counts"]
+    print(f"Evidence counts: { {key: row for key, row in counts.items() if row} }")
+    
+    # The matrix agrees with the evidence it summarises
+    for key, evidence in analysis["_evidence"].items():
+        assert sum(counts[key].values()) == len(evidence), key
+    stripped = {key: value for key, value in analysis.items() if key != "_evidence_counts"}
+    assert evidence_count_matrix(stripped) == counts
+    
+    # Rescoring and the direct fix never look at the evidence text
+    analysis["_evidence"] = {key: [] for key in analysis["_evidence"]}
+    levels = rescore_confidence(analysis)
+    assert levels["enterprise_opt_out"] == analysis["confidence_levels"]["enterprise_opt_out"] > 0
+    assert rescore_confidence(analysis, lambda evidence, doc_types: doc_types / 2)["opt_out_available"] == 1.0
+    analysis["confidence_levels"] = dict.fromkeys(analysis["confidence_levels"], 0.0)
+    assert direct_confidence_fix(analysis)["confidence_levels"]["opt_out_available"] == levels["opt_out_available"]
+
+def test_portfolio_analysis():
+    """Test that a portfolio frame gives each vendor's fix_analyze_ai_capabilities findings"""
+    print("\n==== Testing Portfolio Analysis ====")
+    
+    vendors = {
+        "Acme": {
+            "privacy_policy": get_combined_synthetic_test("third_party_with_protection"),
+            "terms_of_service": get_combined_synthetic_test("enterprise_opt_out_native"),
+        },
+        "Globex": {"privacy_policy": "We never use customer data for anything but support."},
+    }
+    rows = [(vendor, doc_type, text) for vendor, texts in vendors.items() for doc_type, text in texts.items()]
+    frame = pd.DataFrame(rows + [("Initech", "privacy_policy", None)], columns=["vendor", "doc_type", "text"])
+    
+    portfolio = analyze_portfolio(frame, time_budget=0, workers=1)
+    print(portfolio[["opt_out_available", "native_ai", "confidence.enterprise_opt_out", "hits.opt_out"]])
+    assert list(portfolio.index) == ["Acme", "Globex", "Initech"]
+    
+    for vendor, texts in vendors.items():
+        analysis = fix_analyze_ai_capabilities(texts, time_budget=0)
+        for key in ("opt_out_available", "opt_out_method", "native_ai", "third_party_providers",
+                    "contractual_protections", "concerns"):
+            assert portfolio.loc[vendor, key] == analysis[key], (vendor, key)
+        for key, level in analysis["confidence_levels"].items():
+            assert portfolio.loc[vendor, f"confidence.{key}"] == level, (vendor, key)
+    assert portfolio.loc["Acme", "hits.opt_out"] > 0
+    assert portfolio.loc["Acme", "ai_context.opt_out"] == 1.0
+    assert portfolio.loc["Initech", "hits.opt_out"] == 0
+    
+    # Scanning the portfolio in worker processes changes nothing
+    assert analyze_portfolio(frame, time_budget=0, workers=2).equals(portfolio)
+
+def test_document_features():
+    """Test the per-document feature vectors and their saved schema"""
+    print("\n==== Testing Document Features ====")
+    
+    texts = {
+        "privacy_policy": get_combined_synthetic_test("third_party_with_protection"),
+        "admin_guide": "Administrators can opt out of email digests in the admin console.",
+        "ai_ethics": "",
+    }
+    schema = feature_schema()
+    features = document_features(texts, time_budget=0)
+    named = {doc_type: dict(zip(schema["features"], vector)) for doc_type, vector in features.items()}
+    print(f"{len(schema['features'])} features; privacy policy: "
+          f"{ {name: value for name, value in named['privacy_policy'].items() if value} }")
+    
+    assert all(vector.shape == (len(schema["features"]),) and vector.dtype == np.float64 for vector in features.values())
+    assert not features["ai_ethics"].any()
+    
+    # Counts agree with the full analysis of the same scan
+    both = analyze_documents(texts, ("full", "features"), time_budget=0)
+    assert all(np.array_equal(both["features"][doc_type], features[doc_type]) for doc_type in texts)
+    assert named["privacy_policy"]["ai_hits.third_party"] == len(both["full"]["_evidence"]["third_party"])
+    assert named["privacy_policy"]["chars"] == len(texts["privacy_policy"])
+    
+    # AI-free documents still count their matches, none of them AI-proximate
+    assert named["admin_guide"]["hits.opt_out"] == 1
+    assert named["admin_guide"]["ai_hits.opt_out"] == named["admin_guide"]["ai_mentions"] == 0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "features.json"
+        save_feature_schema(str(path))
+        assert json.loads(path.read_text()) == schema
+
+def test_scan_cache():
+    """Test that cached document scans give the result of a full rescan"""
+    print("\n==== Testing Scan Cache ====")
+    
+    texts = {
+        "privacy_policy": get_combined_synthetic_test("enterprise_opt_out_native"),
+        "ai_policy": "Our assistant is built on OpenAI models.",
+        "terms_of_service": "",
+        "data_processing": get_combined_synthetic_test("third_party_with_protection"),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = analyze_documents(texts, time_budget=0, cache_dir=tmp)
+        stored = set(Path(tmp).iterdir())
+        warm = analyze_documents(texts, time_budget=0, cache_dir=tmp)
+        print(f"{len(stored)} scans cached; warm result unchanged: {warm == cold}")
+        assert len(stored) == 3
+        assert warm == cold == analyze_documents(texts, time_budget=0, cache_dir="")
+        
+        # Streams are cached by their content
+        policy = texts["privacy_policy"]
+        streamed = dict(texts, privacy_policy=(policy[i:i + 50] for i in range(0, len(policy), 50)))
+        assert analyze_documents(streamed, time_budget=0, cache_dir=tmp) == cold
+        assert set(Path(tmp).iterdir()) == stored
+        
+        # Only the changed document is rescanned
+        texts["terms_of_service"] = "Our product integrates with Anthropic's models to provide AI capabilities."
+        changed = analyze_documents(texts, time_budget=0, cache_dir=tmp)
+        assert len(set(Path(tmp).iterdir()) - stored) == 1
+        assert changed == analyze_documents(texts, time_budget=0, cache_dir="")
+        assert "Anthropic" in changed["full"]["third_party_providers"]
+
+def test_review_memo():
+    """Test the memoised discovery, extraction and analysis results"""
+    print("\n==== Testing Review Memo ====")
+    
+    clear_memo()
+    texts = {"privacy_policy": get_combined_synthetic_test("enterprise_opt_out_native"),
+             "ai_policy": "Our assistant is built on OpenAI models."}
+    first = fix_analyze_ai_capabilities(texts, time_budget=0)
+    first["concerns"].append("Reviewed by hand")
+    second = fix_analyze_ai_capabilities(texts, time_budget=0)
+    streamed = fix_analyze_ai_capabilities(dict(texts, ai_policy=iter(["Our assistant is built ", "on OpenAI models."])),
+                                           time_budget=0)
+    print(f"Analysis memo: {memo_stats()['analysis']}")
+    assert memo_stats()["analysis"]["hits"] == 2
+    assert second == streamed == analyze_documents(texts, ("full",), time_budget=0)["full"]
+    assert "Reviewed by hand" not in second["concerns"]  # changing a result leaves the memoised one alone
+    fix_analyze_ai_capabilities(dict(texts, ai_policy="Our assistant is built on Anthropic models."), time_budget=0)
+    assert memo_stats()["analysis"]["misses"] == 2
+    
+    # Streams replay memoised extractions without fetching the URL again
+    page = "<html><body><main><p>Users can opt out of AI   training.</p></main></body></html>"
+    with local_site({"/privacy": page}) as (base_url, served):
+        url = f"{base_url}/privacy"
+        text = extract_document_text(url)
+        assert "".join(iter_document_text(url, chunk_chars=8)) == extract_document_text(url) == text
+        assert served == ["/privacy"]
+        assert memo_stats()["extraction"]["hits"] == 2
+    
+    # A discovery that found nothing, as when the site is down, is retried
+    pages = {}
+    with local_site(pages) as (base_url, served):
+        assert not any(get_vendor_documentation(base_url).values())
+        assert memo_stats()["discovery"]["hits"] == 0
+        pages.update({"/": '<html><body><footer><a href="/privacy">Privacy</a></footer></body></html>',
+                      "/privacy": page})
+        assert get_vendor_documentation(base_url)["privacy_policy"] == f"{base_url}/privacy"
+        assert get_vendor_documentation(base_url)["privacy_policy"] == f"{base_url}/privacy"
+        assert memo_stats()["discovery"]["hits"] == 1 and served.count("/") == 2
+    
+    url = "https://example.invalid/privacy"
+    with tempfile.TemporaryDirectory() as tmp:
+        # The persistent tier serves later caches; entries expire after the TTL
+        StageCache("discovery", 60, directory=tmp).put("example.com", {"privacy_policy": url})
+        assert StageCache("discovery", 60, directory=tmp).get("example.com") == (True, {"privacy_policy": url})
+        short = StageCache("discovery", 0.05, max_entries=1)
+        short.put("a", 1)
+        short.put("b", 2)
+        assert short.get("a") == (False, None)
+        time.sleep(0.06)
+        assert short.get("b") == (False, None)
+        assert short.stats()["misses"] == 2
+    clear_memo()
+
+def test_batch_review():
+    """Test that a batch review checkpoints each vendor and resumes where it stopped"""
+    print("\n==== Testing Batch Review ====")
+    
+    policy = get_combined_synthetic_test("enterprise_opt_out_native")
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a></footer></body></html>',
+             "/privacy": f"<html><body><main><p>{policy}</p></main></body></html>"}
+    with local_site(pages) as (first, first_served), local_site(pages) as (second, _), \
+            tempfile.TemporaryDirectory() as tmp:
+        checkpoint = str(Path(tmp) / "batch.checkpoint.jsonl")
+        records, stats = review_vendors([first], checkpoint, workers=1)
+        assert stats["reviewed"] == 1 and records[0]["analysis"]["opt_out_available"]
+        
+        # A run killed mid-write leaves a partial line; the next run resumes
+        with open(checkpoint, "a", encoding="utf-8") as f:
+            f.write('{"url": "' + second)
+        served_before = len(first_served)
+        records, stats = review_vendors([first, second], checkpoint, workers=2)
+        print(f"Resumed batch: {stats}")
+        assert (stats["resumed"], stats["reviewed"], stats["failed"]) == (1, 1, 0)
+        assert len(first_served) == served_before
+        assert [record["url"] for record in records] == [first, second]
+        assert records[1]["analysis"] == records[0]["analysis"]
+        
+        # Vendor lists and results round-trip through the CLI's files
+        csv_list = Path(tmp) / "vendors.csv"
+        csv_list.write_text(f"name,url\nFirst,{first}\nSecond,{second}\n")
+        json_list = Path(tmp) / "vendors.json"
+        json_list.write_text(json.dumps([first, {"name": "Second", "url": second}]))
+        assert load_vendor_list(str(csv_list)) == load_vendor_list(str(json_list)) == [first, second]
+        
+        write_results(records, stats, str(Path(tmp) / "results.csv"))
+        frame = pd.read_csv(Path(tmp) / "results.csv")
+        assert list(frame["url"]) == [first, second] and frame["opt_out_available"].all()
+        write_results(records, stats, str(Path(tmp) / "results.json"))
+        assert json.loads((Path(tmp) / "results.json").read_text())["stats"] == stats
+
+def test_review_pipeline():
+    """Test that the overlapped review pipeline matches a sequential review in less time"""
+    print("\n==== Testing Review Pipeline ====")
+    
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer></body></html>',
+             "/privacy": f"<main><p>{get_combined_synthetic_test('enterprise_opt_out_native')}</p></main>",
+             "/terms": f"<main><p>{get_combined_synthetic_test('third_party_with_protection')}</p></main>"}
+    with local_site(pages, delay=0.05) as (first, _), local_site(pages, delay=0.05) as (second, _), \
+            local_site(pages, delay=0.05) as (third, _):
+        vendor_urls = [first, second, third]
+        
+        clear_memo()
+        started = time.perf_counter()
+        pipelined = dict(review_pipeline(vendor_urls))
+        pipeline_time = time.perf_counter() - started
+        
+        clear_memo()
+        started = time.perf_counter()
+        sequential = {}
+        for vendor_url in vendor_urls:
+            doc_urls = get_vendor_documentation(vendor_url)
+            doc_texts = {doc_type: extract_document_text(url) for doc_type, url in doc_urls.items() if url}
+            sequential[vendor_url] = direct_confidence_fix(fix_analyze_ai_capabilities(doc_texts))
+        sequential_time = time.perf_counter() - started
+        
+        print(f"Pipeline {pipeline_time:.2f}s, sequential {sequential_time:.2f}s")
+        assert pipelined == sequential
+        assert pipeline_time < sequential_time / 1.5
+        assert review_vendor(second) == sequential[second]
+        
+        # Large documents are scanned in the analysis pool, with the same result
+        workers, min_chars = ai_review.ANALYSIS_WORKERS, ai_review.PARALLEL_MIN_CHARS
+        ai_review.ANALYSIS_WORKERS, ai_review.PARALLEL_MIN_CHARS = 2, 1
+        try:
+            shutdown_analysis_pool()
+            clear_memo()
+            assert dict(review_pipeline(vendor_urls)) == sequential
+            assert ai_review._analysis_pool is not None
+        finally:
+            ai_review.ANALYSIS_WORKERS, ai_review.PARALLEL_MIN_CHARS = workers, min_chars
+            shutdown_analysis_pool()
+    clear_memo()
+
+def test_async_api():
+    """Test that the async API gives the results of the sync functions"""
+    print("\n==== Testing Async API ====")
+    
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer></body></html>',
+             "/privacy": f"<main><p>{get_combined_synthetic_test('enterprise_opt_out_native')}</p></main>",
+             "/terms": f"<main><p>{get_combined_synthetic_test('third_party_with_protection')}</p></main>"}
+    
+    async def review_all(vendor_urls):
+        async with review_session() as session:
+            assert isinstance(session, aiohttp.ClientSession)
+            documents = await async_scrape_vendor_documentation(vendor_urls[0], session)
+            missing = await async_extract_document_text(f"{vendor_urls[0]}/missing", session)
+            reviews = await async_review_vendors(vendor_urls, session=session)
+        return documents, missing, reviews
+    
+    with local_site(pages) as (first, _), local_site(pages) as (second, _):
+        clear_memo()
+        # Every request goes through aiohttp, never the blocking client
+        blocking_get = ai_review._http_get
+        ai_review._http_get = None
+        try:
+            documents, missing, reviews = asyncio.run(review_all([first, second]))
+        finally:
+            ai_review._http_get = blocking_get
+        print(f"Async documents: {documents}")
+        assert memo_stats()["extraction"]["hits"] == 0
+        
+        clear_memo()
+        assert documents == get_vendor_documentation(first)
+        assert missing == ""
+        assert reviews == {first: review_vendor(first), second: review_vendor(second)}
+        
+        # Calls without a session open one of their own
+        clear_memo()
+        assert asyncio.run(async_get_vendor_documentation(second)) == get_vendor_documentation(second)
+        assert asyncio.run(async_extract_document_text(f"{second}/privacy")) == extract_document_text(f"{second}/privacy")
+        assert asyncio.run(async_review_vendor(second, triage=True))["opt_out_available"]
+    clear_memo()
+
+def test_review_service():
+    """Test that the review service shares in-flight reviews and bounds per-host requests"""
+    print("\n==== Testing Review Service ====")
+    
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer></body></html>',
+             "/privacy": f"<main><p>{get_combined_synthetic_test('enterprise_opt_out_native')}</p></main>",
+             "/terms": f"<main><p>{get_combined_synthetic_test('third_party_with_protection')}</p></main>"}
+    
+    service = ReviewService(workers=4, max_age=3600)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with local_site(pages, delay=0.2) as (site, served):
+            clear_memo()
+            # Teams asking for the same vendor at once share one review
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                replies = list(pool.map(lambda url: requests.post(f"{api}/reviews", json={"url": url}),
+                                        [site, f"{site}/", site, f"{site}/"]))
+            assert [reply.status_code for reply in replies] == [202] * 4
+            jobs = [reply.json() for reply in replies]
+            assert len({job["job"] for job in jobs}) == 1
+            assert sum(job["coalesced"] for job in jobs) == 3
+            
+            job_id = jobs[0]["job"]
+            while (reply := requests.get(f"{api}/reviews/{job_id}/result")).status_code == 202:
+                time.sleep(0.05)
+            assert reply.status_code == 200
+            result = reply.json()
+            print(f"Vendor site served {served.count('/')} home page request(s) for {len(jobs)} review requests")
+            assert served.count("/") == 1
+            clear_memo()
+            assert result["analysis"] == review_vendor(site)
+            assert result["fresh"] and result["reviewed_at"] and result["max_age"] == 3600
+            
+            # Fresh results are served from the cache with their age
+            cached = requests.post(f"{api}/reviews", json={"url": site})
+            assert cached.status_code == 200 and cached.json()["cached"]
+            assert cached.json()["job"] == job_id and "Age" in cached.headers
+            assert cached.headers["Cache-Control"] == "max-age=3600"
+            stale = requests.get(f"{api}/results", params={"url": site, "max_age": 0}).json()
+            assert not stale["fresh"] and stale["job"] == job_id
+            refresh = requests.post(f"{api}/reviews", json={"url": site, "max_age": 0})
+            assert refresh.status_code == 202 and refresh.json()["job"] != job_id
+            while requests.get(f"{api}/reviews/{refresh.json()['job']}").json()["status"] != "done":
+                time.sleep(0.05)
+            
+            status = requests.get(f"{api}/status").json()
+            print(f"Service status: {status['jobs']}, coalesced {status['coalesced']}")
+            assert status["coalesced"] == 3 and status["jobs"] == {"done": 2} and status["cached_results"] == 1
+            assert requests.get(f"{api}/reviews/unknown").status_code == 404
+            assert requests.post(f"{api}/reviews", json={}).status_code == 400
+            
+            # Malformed fields are rejected rather than failing the request
+            for max_age in ("60", True, -1):
+                assert requests.post(f"{api}/reviews", json={"url": site, "max_age": max_age}).status_code == 400
+            for body in ({"url": 123}, {"url": ["x"]}, {"url": " "}, {"url": site, "triage": "no"},
+                         {"url": site, "refresh": 1}):
+                assert requests.post(f"{api}/reviews", json=body).status_code == 400, body
+            for max_age in ("abc", "nan", "-1"):
+                assert requests.get(f"{api}/results", params={"url": site, "max_age": max_age}).status_code == 400
+            
+            # The result cache is bounded, dropping the least recently used vendor
+            max_results = review_service.SERVICE_MAX_RESULTS
+            review_service.SERVICE_MAX_RESULTS = 2
+            try:
+                jobs = [requests.post(f"{api}/reviews", json={"url": site, "triage": True}).json()["job"]]
+                while requests.get(f"{api}/reviews/{jobs[0]}").json()["status"] != "done":
+                    time.sleep(0.05)
+                assert requests.get(f"{api}/results", params={"url": site}).status_code == 200
+                jobs.append(requests.post(f"{api}/reviews", json={"url": site.replace("127.0.0.1", "localhost")}).json()["job"])
+                while requests.get(f"{api}/reviews/{jobs[1]}").json()["status"] != "done":
+                    time.sleep(0.05)
+                assert requests.get(f"{api}/status").json()["cached_results"] == 2
+                assert requests.get(f"{api}/results", params={"url": site}).status_code == 200
+                assert requests.get(f"{api}/results", params={"url": site, "triage": True}).status_code == 404
+                assert requests.get(f"{api}/reviews/{jobs[0]}/result").status_code == 410
+            finally:
+                review_service.SERVICE_MAX_RESULTS = max_results
+        
+        # Per-host limits keep concurrent fetches from piling onto one vendor
+        load = {}
+        with local_site(pages, delay=0.2, load=load) as (site, _):
+            for limit, peak in ((0, 3), (1, 1)):
+                clear_memo()
+                set_host_concurrency(limit)
+                with ThreadPoolExecutor(max_workers=3) as pool:
+                    list(pool.map(extract_document_text, [f"{site}/", f"{site}/privacy", f"{site}/terms"]))
+                print(f"Per-host limit {limit}: peak of {load['peak']} requests at once")
+                assert load["peak"] == peak
+                load["peak"] = 0
+    finally:
+        set_host_concurrency(0)
+        server.shutdown()
+        server.server_close()
+        service.close()
+        clear_memo()
+
+def test_review_daemon():
+    """Test that the review daemon serves warm reviews to the client"""
+    print("\n==== Testing Review Daemon ====")
+    
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer></body></html>',
+             "/privacy": f"<main><p>{get_combined_synthetic_test('enterprise_opt_out_native')}</p></main>",
+             "/terms": f"<main><p>{get_combined_synthetic_test('third_party_with_protection')}</p></main>"}
+    
+    with tempfile.TemporaryDirectory() as temp_dir, local_site(pages) as (site, served):
+        socket_path = str(Path(temp_dir) / "daemon.sock")
+        try:
+            send_request({"op": "stats"}, socket_path)
+            assert False, "Expected no daemon to be listening"
+        except OSError:
+            pass
+        
+        # A socket left by a daemon that crashed is replaced
+        Path(socket_path).touch()
+        clear_memo()
+        daemon = ReviewDaemon(socket_path)
+        server = threading.Thread(target=daemon.serve_forever, daemon=True)
+        server.start()
+        try:
+            try:
+                ReviewDaemon(socket_path)
+                assert False, "Expected the live daemon's socket to be kept"
+            except RuntimeError:
+                pass
+            
+            first = daemon_review(site, socket_path=socket_path)
+            fetched = len(served)
+            start = time.perf_counter()
+            again = daemon_review(site, socket_path=socket_path)
+            warm = time.perf_counter() - start
+            print(f"Warm repeat review took {warm * 1000:.1f}ms, fetching {len(served) - fetched} pages")
+            assert again == first and len(served) == fetched
+            assert daemon_review(site, triage=True, socket_path=socket_path)["opt_out_available"]
+            
+            try:
+                send_request({"op": "unknown"}, socket_path)
+                assert False, "Expected the unknown op to fail"
+            except DaemonError as e:
+                assert "Unknown op" in str(e)
+            
+            stats = send_request({"op": "stats"}, socket_path)
+            assert stats["requests"] == 5 and stats["memo"]["analysis"]["hits"] >= 1
+            send_request({"op": "shutdown"}, socket_path)
+            server.join(timeout=5)
+            assert not server.is_alive()
+        finally:
+            daemon.server_close()
+        assert not Path(socket_path).exists()
+        
+        clear_memo()
+        assert first == json.loads(json.dumps(review_vendor(site), default=str))
+    clear_memo()
+
+def test_review_queue():
+    """Test the job queue's priorities, leases, retries and dead-lettering, and its worker processes"""
+    print("\n==== Testing Review Queue ====")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = ReviewQueue(str(Path(temp_dir) / "jobs.db"), max_attempts=2, backoff=0.2)
+        assert queue.enqueue(["https://a.example", "https://b.example"]) == 2
+        queue.enqueue(["https://urgent.example"], priority=5)
+        
+        # Higher priorities first, then the oldest; a failed job waits out its backoff
+        urgent = queue.lease("w1")
+        assert urgent["url"] == "https://urgent.example" and urgent["attempt"] == 1
+        assert queue.fail(urgent["id"], "w1", "Timeout") == "queued"
+        job = queue.lease("w1")
+        assert job["url"] == "https://a.example"
+        assert queue.complete(job["id"], "w1", {"ai_capabilities": True})
+        time.sleep(0.3)
+        retry = queue.lease("w2")
+        assert retry["id"] == urgent["id"] and retry["attempt"] == 2
+        assert queue.fail(retry["id"], "w1", "Timeout") is None
+        assert queue.fail(retry["id"], "w2", "Timeout") == "dead"
+        job = queue.lease("w1")
+        assert job["url"] == "https://b.example" and queue.lease("w1") is None
+        assert queue.complete(job["id"], "w1", {"ai_capabilities": False})
+        print(f"Queue after retries: {queue.stats()}")
+        assert queue.stats() == {"dead": 1, "done": 2}
+        assert [job["analysis"] for job in queue.jobs("done")] == [{"ai_capabilities": True}, {"ai_capabilities": False}]
+        
+        queue.close()
+        
+        # An expired lease goes to another worker, and the first can no longer finish the job
+        queue = ReviewQueue(str(Path(temp_dir) / "leases.db"), lease_seconds=0.2, max_attempts=2)
+        queue.enqueue(["https://slow.example"])
+        job = queue.lease("w1")
+        assert queue.renew(job["id"], "w1")
+        time.sleep(0.3)
+        taken_over = queue.lease("w2")
+        assert taken_over["id"] == job["id"] and taken_over["attempt"] == 2
+        assert not queue.complete(job["id"], "w1", {}) and not queue.renew(job["id"], "w1")
+        
+        # A job whose leases keep expiring is dead-lettered once it has used its attempts
+        time.sleep(0.3)
+        assert queue.lease("w3") is None
+        [dead] = queue.jobs("dead")
+        assert dead["error"] == "Lease expired" and dead["attempts"] == 2
+        assert queue.requeue() == 1 and queue.stats() == {"queued": 1}
+        assert queue.lease("w3")["attempt"] == 1
+        queue.close()
+    
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer></body></html>',
+             "/privacy": f"<main><p>{get_combined_synthetic_test('enterprise_opt_out_native')}</p></main>",
+             "/terms": f"<main><p>{get_combined_synthetic_test('third_party_with_protection')}</p></main>"}
+    
+    with tempfile.TemporaryDirectory() as temp_dir, local_site(pages) as (first, _), local_site(pages) as (second, _):
+        path = str(Path(temp_dir) / "reviews.db")
+        queue = ReviewQueue(path)
+        queue.enqueue([first, second])
+        queue.enqueue([first], triage=True, priority=1)
+        clear_memo()
+        completed = run_workers(path, 2)
+        print(f"Two workers completed {completed} reviews: {queue.stats()}")
+        assert completed == 3 and queue.stats() == {"done": 3}
+        
+        reviews = {(job["url"], job["triage"]): job["analysis"] for job in queue.jobs()}
+        clear_memo()
+        for (url, triage), analysis in reviews.items():
+            assert analysis == json.loads(json.dumps(review_vendor(url, triage), default=str)), url
+        queue.close()
+        
+        # Workers scan large documents themselves, since they cannot start an analysis pool
+        queue = ReviewQueue(str(Path(temp_dir) / "large.db"))
+        queue.enqueue([first])
+        workers, min_chars = ai_review.ANALYSIS_WORKERS, ai_review.PARALLEL_MIN_CHARS
+        ai_review.ANALYSIS_WORKERS, ai_review.PARALLEL_MIN_CHARS = 2, 1
+        try:
+            clear_memo()
+            assert run_workers(queue.path, 1) == 1, queue.jobs("dead")
+        finally:
+            ai_review.ANALYSIS_WORKERS, ai_review.PARALLEL_MIN_CHARS = workers, min_chars
+        clear_memo()
+        [job] = queue.jobs("done")
+        assert job["analysis"] == reviews[(first, False)]
+        queue.close()
+    clear_memo()
+
+def test_sharded_discovery():
+    """Test that sharded discovery gives each host one worker and finds the documents of a local crawl"""
+    print("\n==== Testing Sharded Discovery ====")
+    
+    hosts = [f"vendor{i}.example" for i in range(1000)]
+    ring = HashRing(["a:1", "b:1", "c:1"])
+    owners = {host: ring.node_for(host) for host in hosts}
+    spread = {node: sum(owner == node for owner in owners.values()) for node in ring.nodes}
+    print(f"Hosts per node: {spread}")
+    assert min(spread.values()) > 200
+    
+    # Adding a node only moves hosts to it, and removing it moves them back
+    ring.add("d:1")
+    moved = [host for host in hosts if ring.node_for(host) != owners[host]]
+    assert all(ring.node_for(host) == "d:1" for host in moved) and 150 < len(moved) < 350
+    ring.remove("d:1")
+    assert all(ring.node_for(host) == owners[host] for host in hosts)
+    
+    pages = {"/": '<html><body><footer><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer></body></html>',
+             "/privacy": "<main><p>Privacy policy</p></main>",
+             "/terms": "<main><p>Terms of service</p></main>"}
+    loads = [{} for _ in range(4)]
+    with ExitStack() as stack:
+        sites = [stack.enter_context(local_site(pages, delay=0.05, load=load))[0] for load in loads]
+        # A vendor whose home page redirects to another host, which links back to every document,
+        # so the redirect is the only request the other host gets
+        landing = {}
+        moved_to, moved_to_served = stack.enter_context(local_site(landing))
+        moved, _ = stack.enter_context(local_site(pages, redirects={"/": f"{moved_to}/"}))
+        landing["/"] = (f'<footer><a href="{moved}/privacy">Privacy</a> <a href="{moved}/ai-trust">AI Trust</a> '
+                        f'<a href="{moved}/terms">Terms</a> <a href="{moved}/data-processing">Data Processing</a></footer>')
+        # Two vendors on each host: their requests share the host's one worker and its limit
+        vendor_urls = sites + [f"{site}/" for site in sites] + [moved]
+        with local_shards(3, per_host=1) as (addresses, authkey):
+            discovery = ShardedDiscovery(addresses, authkey)
+            try:
+                documents = discovery.discover(vendor_urls)
+            finally:
+                discovery.stop_workers()
+                discovery.close()
+        
+        print(f"Hosts per worker: {dict((address, len(hosts)) for address, hosts in discovery.shard_hosts.items())}")
+        fetched = [host for hosts in discovery.shard_hosts.values() for host in hosts]
+        assert sorted(fetched) == sorted(shard_key(site) for site in sites + [moved, moved_to])
+        # The redirect was followed by the worker owning the other host, not the one that got it
+        assert moved_to_served == ["/"]
+        assert shard_key(moved_to) in discovery.shard_hosts[discovery.ring.node_for(shard_key(moved_to))]
+        assert all(load["peak"] == 1 for load in loads)
+        for vendor_url in vendor_urls:
+            assert documents[vendor_url] == scrape_vendor_documentation(vendor_url), vendor_url
+        assert documents[sites[0]]["privacy_policy"] == f"{sites[0]}/privacy"
+        assert documents[moved]["privacy_policy"] == f"{moved}/privacy"
+
+def test_vendor_registry():
+    """Test that known vendors resolve by whole domain labels, for exact and parent domains"""
+    print("\n==== Testing Vendor Registry ====")
+    
+    registry = get_vendor_registry()
+    cases = {
+        "https://aws.amazon.com": "aws.amazon.com",
+        "https://docs.aws.amazon.com/guide": "aws.amazon.com",
+        "https://www.amazon.com/": "amazon.com",
+        "HTTPS://Privacy.Microsoft.com:443/en-us": "microsoft.com",
+        "zoom.us": "zoom.us",
+        "https://notmicrosoft.com": None,
+        "https://microsoft.com.example.org": None,
+        "https://example.com/?ref=google.com": None,
+    }
+    for url, domain in cases.items():
+        print(f"{url} -> {registry.match(url)}")
+        assert registry.match(url) == domain, url
+    assert registry.lookup("https://aws.amazon.com")[1]["privacy_policy"] == "https://aws.amazon.com/privacy/"
+    
+    # Discovery uses the registry, and a replaced registry takes effect at once
+    with tempfile.TemporaryDirectory() as temp_dir, local_site({"/": "<html></html>"}) as (site, served):
+        path = Path(temp_dir) / "vendors.json"
+        path.write_text(json.dumps({"vendors": {"127.0.0.1": {"privacy_policy": f"{site}/privacy"}}}))
+        try:
+            set_vendor_registry(str(path))
+            assert isinstance(get_vendor_registry(), VendorRegistry)
+            assert get_vendor_documentation(site)["privacy_policy"] == f"{site}/privacy"
+            assert served == []
+        finally:
+            set_vendor_registry(None)
+        assert get_vendor_documentation(site)["privacy_policy"] is None and served
+    clear_memo()
+
+def test_negation_scope():
+    """Test negation scopes and the findings they turn off"""
+    print("\n==== Testing Negation Scope ====")
+    
+    plan = get_execution_plan()
+    text = ("We do not sell or share data, including but not limited to model outputs, "
+            "with any partner. Notifications are shared daily. Transfer to AI vendors is prohibited.")
+    index = NegationIndex(text, plan.patterns)
+    for word, negated in (("share", True), ("model outputs", False), ("shared daily", False), ("Transfer", True)):
+        print(f"{word!r} negated: {index.is_negated(text.find(word))}")
+        assert index.is_negated(text.find(word)) == negated, word
+    assert index.negation(text.find("share")) == (text.find("not"), text.find("not") + 3)
+    
+    cases = {
+        "We do not share customer data with AI model providers.": {"model_sharing": False},
+        "Our notification service shares AI model insights with partners.": {"model_sharing": True},
+        "Users cannot opt out of the AI assistant.": {"opt_out_available": False},
+        "Users can opt out of the AI assistant.": {"opt_out_available": True},
+        "We never use customer data to train our AI models.": {"model_training": False},
+        "We use customer data to train our AI models.": {"model_training": True},
+    }
+    for text, expected in cases.items():
+        analysis = fix_analyze_ai_capabilities({"privacy_policy": text}, time_budget=0)
+        for key, value in expected.items():
+            assert analysis[key] == value, (text, key)
+
 def parse_args():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="Test AI capability review tool")
-    parser.add_argument("--test", choices=["synthetic", "vendors", "keyword", "time", "all"], 
+    parser.add_argument("--test", choices=["synthetic", "units", "vendors", "keyword", "time", "all"], 
                        default="all", help="Test type to run")
     parser.add_argument("--vendor", help="Specific vendor to test")
     parser.add_argument("--doc-type", help="Specific document type to test")
@@ -357,6 +1449,7 @@ def parse_args():
 def main():
     """Main entry point for testing"""
     args = parse_args()
+    configure_logging()
     
     print("==== AI Capability Review Tool Testing ====")
     print(f"Date/Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -364,6 +1457,33 @@ def main():
     if args.test == "synthetic" or args.test == "all":
         test_synthetic_samples()
     
+    if args.test == "units" or args.test == "all":
+        test_sentence_index()
+        test_logging_events()
+        test_regex_engine_and_budget()
+        test_provider_catalog()
+        test_analysis_views()
+        test_rule_files()
+        test_streaming_analysis()
+        test_parallel_analysis()
+        test_ai_prefilter()
+        test_folded_text()
+        test_triage_mode()
+        test_evidence_counts()
+        test_portfolio_analysis()
+        test_document_features()
+        test_scan_cache()
+        test_review_memo()
+        test_batch_review()
+        test_review_pipeline()
+        test_async_api()
+        test_review_service()
+        test_review_daemon()
+        test_review_queue()
+        test_sharded_discovery()
+        test_vendor_registry()
+        test_negation_scope()
+    
     if args.test == "vendors" or args.test == "all":
         if args.vendor:
             vendor = get_test_vendor_by_name(args.vendor)
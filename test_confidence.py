@@ -1,4 +1,4 @@
-from ai_review import get_vendor_documentation, extract_document_text, fix_analyze_ai_capabilities
+from ai_review import get_vendor_documentation, extract_document_text, fix_analyze_ai_capabilities, configure_logging
 
 def test_vendor(vendor_url):
     # Get documents
@@ -25,4 +25,5 @@ def test_vendor(vendor_url):
     return analysis
 
 if __name__ == "__main__":
+    configure_logging()
     test_vendor("https://www.microsoft.com")
\ No newline at end of file
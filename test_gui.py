@@ -3,7 +3,7 @@ from tkinter import ttk, scrolledtext
 import threading
 import json
 from datetime import datetime
-from ai_review import scrape_vendor_documentation, extract_document_text, analyze_ai_capabilities, get_vendor_documentation
+from ai_review import scrape_vendor_documentation, extract_document_text, analyze_ai_capabilities, get_vendor_documentation, configure_logging
 
 # Import your functions or define them here
 # from ai_review import scrape_vendor_documentation, extract_document_text, analyze_ai_capabilities
@@ -201,6 +201,7 @@ class AIReviewTestGUI:
         self.status_var.set(f"Results saved to {filename}")
 
 if __name__ == "__main__":
+    configure_logging()
     root = tk.Tk()
     app = AIReviewTestGUI(root)
     root.mainloop()
\ No newline at end of file